@@ -18,9 +18,47 @@ class Settings(BaseSettings):
             secret_key (str): the secret key to encode and decode jwt's
             algorithm (str): used to encode and decode jwt's
             access_token_expire_minutes (int): the number of minutes for the token to live
+            admin_token (str): the token the admin routes need in the X-Admin-Token header, empty disables them
             images_dir (Path): path to the images
+            image_manifest_watch (bool): whether the image manifest is rebuilt when the images directory changes
+            image_cache_max_bytes (int): the most image bytes held in memory
+            image_cache_max_item_bytes (int): the largest image that is held in memory
+            image_cache_ttl (float): seconds an image held in memory is served before its file is checked again
+            poster_bundle_cache_max_bytes (int): the most bytes of poster bundles held in memory
+            poster_bundle_max_images (int): the most images one poster bundle holds
+            placeholder_width (int): the width of the placeholders painted before the film images load
+            image_variants_dir (Path): path to the resized and re-encoded images
+            image_variants_max_bytes (int): the most bytes the resized and re-encoded images take on disk
             films_dir (Path): path to the films
+            segments_dir (Path): path to the segment index files of the films
             chunk_size (int): chunk size to send the film part
+            film_read_block_size (int): the size and alignment of the film reads when the server has no sendfile
+            chunk_initial_size (int): bytes served for the first open ended range request of a client
+            chunk_max_size (int): the most bytes served for an open ended range request
+            chunk_growth_factor (int): how much the open ended chunk grows while a client plays sequentially
+            chunk_policy_clients (int): the number of clients whose chunk size is remembered
+            film_io_concurrency (int): the most film file operations running at once on the threads of a worker
+            egress_rate_limit (int): the most film bytes per second a worker sends, 0 for no limit
+            stream_rate_limit (int): the most film bytes per second one client gets, 0 for no limit
+            stream_rate_clients (int): the number of clients whose stream rate bucket is kept
+            egress_burst (int): the film bytes a rate limit lets through at once after being idle
+            mmap_cache_enabled (bool): whether the most requested films are served from memory maps
+            mmap_cache_max_bytes (int): the most film bytes that are memory mapped at once
+            mmap_cache_min_requests (int): the requests a film needs before it is memory mapped
+            segment_target_duration (float): the seconds of film the segment indexer puts in one segment
+            film_index_watch (bool): whether the film index is refreshed when the films directory changes
+            film_metadata_ttl (float): seconds the cached size and etag of a film are used before the file is checked again
+            search_mode (str): where searches run, the in-memory index or the database [index, database]
+            search_page_size (int): the number of search results of a page when the client does not ask for one
+            search_max_page_size (int): the most search results of a page
+            search_history_mode (str): how searches are added to the history, in the request or by a write behind queue [sync, deferred]
+            search_history_batch_size (int): the queued searches that make the write behind queue flush
+            search_history_flush_interval (float): the most seconds a search waits in the write behind queue
+            search_history_max_backlog (int): the most searches the write behind queue holds while the database is unavailable
+            search_cache_max_entries (int): the most searches whose results are cached, 0 disables the cache
+            search_cache_ttl (float): seconds the cached results of a search are served
+            search_fuzzy_threshold (float): the lowest title similarity of a typo tolerant search result
+            search_fuzzy_limit (int): the most results of a typo tolerant search
             oauth2_scheme (OAuth2PasswordBearer): the default url to get tokens
             pwd_context (CryptContext): algorithm and context to encrypt passwords
     """
@@ -34,9 +72,47 @@ class Settings(BaseSettings):
     algorithm: str = os.getenv("ALGORITHM", "HS256")
     access_token_expire_minutes: int = int(
         os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "10"))
+    admin_token: str = os.getenv("ADMIN_TOKEN", "")
     images_dir: Path = Path(f"{static_media_directory}/images")
+    image_manifest_watch: bool = os.getenv("IMAGE_MANIFEST_WATCH", "false").lower() == "true"
+    image_cache_max_bytes: int = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(64*1024*1024)))
+    image_cache_max_item_bytes: int = int(os.getenv("IMAGE_CACHE_MAX_ITEM_BYTES", str(512*1024)))
+    image_cache_ttl: float = float(os.getenv("IMAGE_CACHE_TTL", "10"))
+    poster_bundle_cache_max_bytes: int = int(os.getenv("POSTER_BUNDLE_CACHE_MAX_BYTES", str(64*1024*1024)))
+    poster_bundle_max_images: int = 200
+    placeholder_width: int = 16
+    image_variants_dir: Path = Path(os.getenv("IMAGE_VARIANTS_DIRECTORY", f"{static_media_directory}/image_variants"))
+    image_variants_max_bytes: int = int(os.getenv("IMAGE_VARIANTS_MAX_BYTES", str(256*1024*1024)))
     films_dir: Path = Path(f"{static_media_directory}/films")
+    segments_dir: Path = Path(f"{static_media_directory}/segments")
     recommender_dir: Path = Path(f"{recommender_file_directory}/artifacts")
     chunk_size: int = 64*1024
+    film_read_block_size: int = int(os.getenv("FILM_READ_BLOCK_SIZE", str(1024*1024)))
+    chunk_initial_size: int = int(os.getenv("CHUNK_INITIAL_SIZE", str(1024*1024)))
+    chunk_max_size: int = int(os.getenv("CHUNK_MAX_SIZE", str(16*1024*1024)))
+    chunk_growth_factor: int = 2
+    chunk_policy_clients: int = 4096
+    film_io_concurrency: int = int(os.getenv("FILM_IO_CONCURRENCY", "16"))
+    egress_rate_limit: int = int(os.getenv("EGRESS_RATE_LIMIT", "0"))
+    stream_rate_limit: int = int(os.getenv("STREAM_RATE_LIMIT", "0"))
+    stream_rate_clients: int = 4096
+    egress_burst: int = int(os.getenv("EGRESS_BURST", str(4*1024*1024)))
+    mmap_cache_enabled: bool = os.getenv("MMAP_CACHE_ENABLED", "false").lower() == "true"
+    mmap_cache_max_bytes: int = int(os.getenv("MMAP_CACHE_MAX_BYTES", str(1024*1024*1024)))
+    mmap_cache_min_requests: int = 2
+    segment_target_duration: float = float(os.getenv("SEGMENT_TARGET_DURATION", "6"))
+    film_index_watch: bool = os.getenv("FILM_INDEX_WATCH", "false").lower() == "true"
+    film_metadata_ttl: float = float(os.getenv("FILM_METADATA_TTL", "2"))
+    search_mode: str = os.getenv("SEARCH_MODE", "index")
+    search_page_size: int = int(os.getenv("SEARCH_PAGE_SIZE", "20"))
+    search_max_page_size: int = 100
+    search_history_mode: str = os.getenv("SEARCH_HISTORY_MODE", "sync")
+    search_history_batch_size: int = int(os.getenv("SEARCH_HISTORY_BATCH_SIZE", "100"))
+    search_history_flush_interval: float = float(os.getenv("SEARCH_HISTORY_FLUSH_INTERVAL", "1"))
+    search_history_max_backlog: int = int(os.getenv("SEARCH_HISTORY_MAX_BACKLOG", "10000"))
+    search_cache_max_entries: int = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "1024"))
+    search_cache_ttl: float = float(os.getenv("SEARCH_CACHE_TTL", "60"))
+    search_fuzzy_threshold: float = float(os.getenv("SEARCH_FUZZY_THRESHOLD", "0.3"))
+    search_fuzzy_limit: int = int(os.getenv("SEARCH_FUZZY_LIMIT", "20"))
     oauth2_scheme: OAuth2PasswordBearer = OAuth2PasswordBearer(tokenUrl="login")
     pwd_context: CryptContext = CryptContext(schemes=["bcrypt"], deprecated="auto")
\ No newline at end of file
@@ -2,6 +2,7 @@ from typing import Annotated
 from fastapi import Depends
 from sqlmodel import Session, SQLModel, create_engine
 from .config import Settings
+from ..search.database import create_search_tables
 from ..data.film_data import *
 from ..data.example_data import *
 from ..models.film_models import *
@@ -37,9 +38,12 @@ def drop_all_tables():
 
 def create_db_and_tables():
     """
-        Create the database tables
+        Create the database tables and the search structures of the film table
     """
     SQLModel.metadata.create_all(engine)
+    # the film table may already exist, so its search structures are checked on every start
+    with engine.begin() as connection:
+        create_search_tables(connection)
 
 
 def create_example_data(session: SessionDep):
@@ -0,0 +1,124 @@
+import hashlib
+import io
+import json
+import threading
+import zipfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional, Tuple
+from .manifest import ImageEntry
+from ..core.config import Settings
+
+settings = Settings()
+
+
+def bundle_etag(images: List[ImageEntry], names: List[str], width: Optional[int], image_format: Optional[str]) -> str:
+    """
+        Get the strong etag of a bundle, it changes when any of its images changes
+
+        Parameters:
+            images (List[ImageEntry]): the manifest entries of the images in the bundle
+            names (List[str]): the image names of the entries
+            width (Optional[int]): the breakpoint width of the variants, None for the originals
+            image_format (Optional[str]): the format of the variants, None for the originals
+
+        Returns:
+            str: the etag
+    """
+    version = "|".join(f"{name}:{image.etag}" for name, image in zip(names, images))
+    return f'"{hashlib.sha1(f"{version}|{width}|{image_format}".encode()).hexdigest()[:24]}"'
+
+
+def build_bundle(files: List[Tuple[str, Path, str]], missing: List[str]) -> bytes:
+    """
+        Pack images into a zip bundle keyed by image name
+
+        The images are stored without compression, they are compressed already. The bundle
+        also holds index.json with the content type of every image and the names that were
+        not found.
+
+        Parameters:
+            files (List[Tuple[str, Path, str]]): the image name, file and content type of every image
+            missing (List[str]): the requested names that are not images
+
+        Returns:
+            bytes: the zip file
+    """
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_STORED) as bundle:
+        for name, path, _ in files:
+            bundle.write(path, arcname=name)
+        index = {"images": {name: media_type for name, _, media_type in files}, "missing": missing}
+        bundle.writestr("index.json", json.dumps(index))
+    return output.getvalue()
+
+
+class PosterBundleCache:
+    """
+        Bounded least recently used cache of the poster bundles
+
+        A bundle is kept with the etag of the images it was built from. A request compares that
+        with the etag of the current manifest entries, so a bundle is used until any of its
+        images changes without touching the disk.
+
+        Attributes:
+            max_bytes (int): the most bundle bytes held
+            hits (int): the bundles served from the cache
+            misses (int): the bundles that had to be built
+    """
+
+    def __init__(self, max_bytes: int = settings.poster_bundle_cache_max_bytes):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.cached_bytes = 0
+        self._bundles: "OrderedDict[str, Tuple[str, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def cached(self, key: str, etag: str) -> Optional[bytes]:
+        """
+            Get a bundle if it was built from the current images
+
+            Parameters:
+                key (str): the image names and variant parameters of the bundle
+                etag (str): the etag of the current images
+
+            Returns:
+                Optional[bytes]: the bundle, None if it has to be built
+        """
+        with self._lock:
+            entry = self._bundles.get(key)
+            if entry is None or entry[0] != etag:
+                self.misses += 1
+                return None
+            self._bundles.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def store(self, key: str, etag: str, bundle: bytes) -> None:
+        """
+            Keep a bundle and drop the least recently used ones that no longer fit
+        """
+        if len(bundle) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._bundles.pop(key, None)
+            if old is not None:
+                self.cached_bytes -= len(old[1])
+            self._bundles[key] = (etag, bundle)
+            self.cached_bytes += len(bundle)
+            while self.cached_bytes > self.max_bytes:
+                _, (_, evicted) = self._bundles.popitem(last=False)
+                self.cached_bytes -= len(evicted)
+
+    def stats(self) -> dict:
+        """
+            Get the counters of the cache
+
+            Returns:
+                dict: the hits, misses, number of bundles and their bytes
+        """
+        return {"hits": self.hits, "misses": self.misses, "bundles": len(self._bundles), "bytes": self.cached_bytes}
+
+
+poster_bundles = PosterBundleCache()
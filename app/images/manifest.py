@@ -0,0 +1,169 @@
+import logging
+import mimetypes
+import os
+import threading
+from email.utils import formatdate
+from pathlib import Path
+from types import MappingProxyType
+from typing import Mapping, Optional
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
+from ..core.config import Settings
+
+settings = Settings()
+
+
+class ImageEntry(BaseModel):
+    """
+        The file information of an image that can be served
+
+        Attributes:
+            path (Path): the resolved path of the image file
+            size (int): the size of the image file
+            mtime_ns (int): the modification time of the image file
+            media_type (str): the content type of the image
+            etag (str): the strong etag of this version of the image file
+            last_modified (str): the modification time formatted for http headers
+    """
+    path: Path
+    size: int
+    mtime_ns: int
+    media_type: str
+    etag: str
+    last_modified: str
+
+
+def image_entry(path: Path, stat_result: os.stat_result) -> ImageEntry:
+    """
+        Build the entry of an image file
+
+        Parameters:
+            path (Path): the resolved path of the image file
+            stat_result (os.stat_result): the stat of the image file
+
+        Returns:
+            ImageEntry: the entry with the etag of this version of the file
+    """
+    suffix = path.suffix.lstrip(".")
+    return ImageEntry(
+        path=path,
+        size=stat_result.st_size,
+        mtime_ns=stat_result.st_mtime_ns,
+        media_type=mimetypes.guess_type(path.name)[0] or f"image/{suffix}",
+        etag=f'"{stat_result.st_ino:x}-{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"',
+        last_modified=formatdate(stat_result.st_mtime, usegmt=True)
+    )
+
+
+class ImageManifest:
+    """
+        Immutable map of the image names that can be served, built from the images directory
+
+        Only the regular files directly in images_dir are listed, so a lookup is one dict
+        access and a name with a path in it, a sibling directory like images2 or a file that
+        does not exist is turned away without a syscall. refresh builds a new map and swaps it
+        in, so readers never see one that is half built.
+
+        Attributes:
+            images_dir (Path): the directory of the images
+            ready (bool): whether the manifest was built
+            refreshes (int): the number of times the manifest was built
+    """
+
+    def __init__(self, images_dir: Path = settings.images_dir):
+        self.images_dir = Path(images_dir)
+        self.ready = False
+        self.refreshes = 0
+        self._entries: Mapping[str, ImageEntry] = MappingProxyType({})
+        self._lock = threading.Lock()
+
+    def lookup(self, image_name: str) -> Optional[ImageEntry]:
+        """
+            Get an image of the manifest
+
+            Parameters:
+                image_name (str): the file name of the image
+
+            Returns:
+                Optional[ImageEntry]: the image, None if it is not in the images directory
+        """
+        return self._entries.get(image_name)
+
+    def revalidate(self, image_name: str) -> Optional[ImageEntry]:
+        """
+            Get an image of the manifest after checking it against the file on disk
+
+            The manifest is only rebuilt by the watcher or the admin route, so a file that was
+            replaced in between would still be served under its old etag. One stat tells if the
+            size, modification time or inode changed and the entry is then rebuilt in place.
+
+            Parameters:
+                image_name (str): the file name of the image
+
+            Returns:
+                Optional[ImageEntry]: the current image, None if it is not in the images directory
+        """
+        image = self._entries.get(image_name)
+        if image is None:
+            return None
+        try:
+            current = image_entry(image.path, os.stat(image.path))
+        except FileNotFoundError:
+            current = None
+        if current == image:
+            return image
+
+        with self._lock:
+            entries = dict(self._entries)
+            if current is None:
+                entries.pop(image_name, None)
+            else:
+                entries[image_name] = current
+            self._entries = MappingProxyType(entries)
+        return current
+
+    def refresh(self) -> None:
+        """
+            Rebuild the manifest from the images directory
+        """
+        entries = {}
+        try:
+            with os.scandir(self.images_dir) as found:
+                for entry in found:
+                    if not entry.is_file():
+                        continue
+                    entries[entry.name] = image_entry(Path(entry.path).resolve(), entry.stat())
+        except FileNotFoundError:
+            logging.info(f"[INFO]: images directory {self.images_dir} does not exist")
+
+        with self._lock:
+            self._entries = MappingProxyType(entries)
+            self.ready = True
+            self.refreshes += 1
+
+    async def watch(self) -> None:
+        """
+            Refresh the manifest whenever the images directory changes, needs the watchfiles package
+        """
+        try:
+            from watchfiles import awatch
+        except ImportError:
+            logging.info("[INFO]: watchfiles is not installed, the image manifest is only refreshed by the admin route")
+            return
+        if not self.images_dir.is_dir():
+            return
+
+        async for _ in awatch(self.images_dir):
+            await run_in_threadpool(self.refresh)
+
+    def stats(self) -> dict:
+        """
+            Get the counters of the manifest
+
+            Returns:
+                dict: the number of images and of refreshes
+        """
+        return {"images": len(self._entries), "refreshes": self.refreshes}
+
+
+image_manifest = ImageManifest()
@@ -0,0 +1,163 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from email.utils import formatdate
+from pathlib import Path
+from typing import Optional
+from pydantic import BaseModel
+from ..core.config import Settings
+
+settings = Settings()
+
+
+class CachedImage(BaseModel):
+    """
+        The bytes and response headers of a small image held in memory
+
+        Attributes:
+            content (bytes): the bytes of the image
+            media_type (str): the content type of the image
+            etag (str): the strong etag of the image
+            last_modified (str): the modification time of the original formatted for http headers
+            source (Path): the original the image was made from, checked when the entry is revalidated
+            source_size (int): the size of the original
+            source_mtime_ns (int): the modification time of the original
+            checked_at (float): the monotonic time the original was last checked
+    """
+    content: bytes
+    media_type: str
+    etag: str
+    last_modified: str
+    source: Path
+    source_size: int
+    source_mtime_ns: int
+    checked_at: float
+
+
+class ImageMemoryCache:
+    """
+        Bounded least recently used cache of the bytes of small images
+
+        The same few posters are asked for all the time, so the ones under max_item_bytes are
+        kept in memory with their etag, last modified and content type. For revalidate_after
+        seconds an entry is served without touching the disk, after that one stat of the
+        original checks it did not change. cached is safe on the event loop, load reads files
+        and is meant to run on a worker thread.
+
+        Attributes:
+            max_bytes (int): the most image bytes held
+            max_item_bytes (int): the largest image that is held
+            revalidate_after (float): the seconds an entry is used without checking the original
+            hits (int): the requests answered from memory
+            misses (int): the requests that had to read the image
+            not_modified (int): the hits answered with a 304
+    """
+
+    def __init__(self, max_bytes: int = settings.image_cache_max_bytes,
+                 max_item_bytes: int = settings.image_cache_max_item_bytes,
+                 revalidate_after: float = settings.image_cache_ttl):
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes
+        self.revalidate_after = revalidate_after
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.cached_bytes = 0
+        self._entries: "OrderedDict[str, CachedImage]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def cached(self, key: str) -> Optional[CachedImage]:
+        """
+            Get an image if it can be served without touching the disk
+
+            Parameters:
+                key (str): the name of the image and its variant parameters
+
+            Returns:
+                Optional[CachedImage]: the image, None if load has to be called
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry.checked_at >= self.revalidate_after:
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def load(self, key: str, source: Path, path: Path, media_type: str, etag: Optional[str] = None) -> Optional[CachedImage]:
+        """
+            Check or read an image and keep it when it is small enough
+
+            Parameters:
+                key (str): the name of the image and its variant parameters
+                source (Path): the original image, its changes invalidate the entry
+                path (Path): the file to serve, the original or a variant of it
+                media_type (str): the content type of the file
+                etag (Optional[str]): the etag of the file, built from the original when None
+
+            Returns:
+                Optional[CachedImage]: the image, None if it is too large to be held in memory
+        """
+        stat_result = os.stat(source)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.source_size == stat_result.st_size and entry.source_mtime_ns == stat_result.st_mtime_ns:
+                entry.checked_at = now
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        if os.stat(path).st_size > self.max_item_bytes:
+            return None
+        entry = CachedImage(
+            content=Path(path).read_bytes(),
+            media_type=media_type,
+            etag=etag or f'"{stat_result.st_ino:x}-{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"',
+            last_modified=formatdate(stat_result.st_mtime, usegmt=True),
+            source=source,
+            source_size=stat_result.st_size,
+            source_mtime_ns=stat_result.st_mtime_ns,
+            checked_at=now
+        )
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.cached_bytes -= len(old.content)
+            self._entries[key] = entry
+            self.cached_bytes += len(entry.content)
+            while self.cached_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.cached_bytes -= len(evicted.content)
+        return entry
+
+    def count_not_modified(self) -> None:
+        """
+            Count a request answered with a 304
+        """
+        with self._lock:
+            self.not_modified += 1
+
+    def stats(self) -> dict:
+        """
+            Get the counters of the cache
+
+            Returns:
+                dict: the hits, misses, 304 answers, hit ratio, number of images and their bytes
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self.cached_bytes
+        }
+
+
+image_cache = ImageMemoryCache()
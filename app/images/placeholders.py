@@ -0,0 +1,91 @@
+import base64
+import io
+import logging
+from pathlib import Path
+from sqlmodel import Session, select
+from .manifest import ImageManifest, image_manifest
+from ..core.config import Settings
+from ..models.film_models import Film, FilmPlaceholder
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - pillow is optional
+    Image = ImageOps = None
+
+settings = Settings()
+
+
+def make_placeholder(path: Path, width: int = settings.placeholder_width) -> str:
+    """
+        Make a tiny blurry jpeg of an image to paint before the image loads
+
+        Parameters:
+            path (Path): the path of the image
+            width (int): the width of the placeholder, the browser scales it up
+
+        Returns:
+            str: the placeholder as a base64 jpeg data uri
+    """
+    with Image.open(path) as original:
+        # a jpeg is decoded at a fraction of its size, which is most of the work
+        original.draft("RGB", (width * 4, width * 8))
+        image = ImageOps.exif_transpose(original).convert("RGB")
+        image = image.resize((width, max(1, round(image.height * width / image.width))), Image.Resampling.BOX)
+        output = io.BytesIO()
+        image.save(output, "JPEG", quality=40, optimize=True)
+    return f"data:image/jpeg;base64,{base64.b64encode(output.getvalue()).decode()}"
+
+
+def refresh_placeholders(session: Session, manifest: ImageManifest = image_manifest) -> int:
+    """
+        Make the placeholders of the films whose image is new or changed and store them
+
+        Parameters:
+            session (Session): the database session
+            manifest (ImageManifest): the manifest of the images
+
+        Returns:
+            int: the number of placeholders made
+    """
+    if Image is None:
+        logging.info("[INFO]: pillow is not installed, no film placeholders are made")
+        return 0
+    if not manifest.ready:
+        manifest.refresh()
+
+    made = 0
+    stored = {placeholder.film_id: placeholder for placeholder in session.exec(select(FilmPlaceholder)).all()}
+    for film in session.exec(select(Film)).all():
+        image = manifest.lookup(film.image_name)
+        placeholder = stored.get(film.id)
+        if image is None or (placeholder is not None and placeholder.image_etag == image.etag):
+            continue
+        try:
+            data_uri = make_placeholder(image.path)
+        except (OSError, ValueError) as e:
+            logging.info(f"[INFO]: no placeholder for {film.image_name}: {str(e)}")
+            continue
+        if placeholder is None:
+            placeholder = FilmPlaceholder(film_id=film.id, image_etag=image.etag, placeholder=data_uri)
+        else:
+            placeholder.image_etag = image.etag
+            placeholder.placeholder = data_uri
+        session.add(placeholder)
+        made += 1
+
+    session.commit()
+    return made
+
+
+def main():
+    """
+        Make the missing and stale placeholders, run with python -m app.images.placeholders
+    """
+    from ..core.db import engine
+
+    with Session(engine) as session:
+        print(f"made {refresh_placeholders(session)} placeholders")
+
+
+if __name__ == "__main__":
+    main()
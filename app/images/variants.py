@@ -0,0 +1,226 @@
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from ..core.config import Settings
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # pragma: no cover - pillow is optional
+    Image = ImageOps = features = None
+
+settings = Settings()
+
+# the widths a variant is made at, a requested width is rounded up to the next one
+BREAKPOINTS = (160, 320, 480, 640, 960, 1280, 1920)
+
+# format name -> (pillow format, media type, save options)
+FORMATS = {
+    "webp": ("WEBP", "image/webp", {"quality": 80, "method": 4}),
+    "avif": ("AVIF", "image/avif", {"quality": 50}),
+    "jpeg": ("JPEG", "image/jpeg", {"quality": 82, "progressive": True, "optimize": True}),
+    "png": ("PNG", "image/png", {"optimize": True}),
+}
+
+
+def supported_formats() -> Tuple[str, ...]:
+    """
+        Get the formats the installed pillow can write
+
+        Returns:
+            Tuple[str, ...]: the format names, empty when pillow is not installed
+    """
+    if Image is None:
+        return ()
+    return tuple(name for name in FORMATS if name in ("jpeg", "png") or features.check(name))
+
+
+def snap_width(width: Optional[int]) -> Optional[int]:
+    """
+        Round a requested width up to a breakpoint so only a few variants exist per image
+
+        Parameters:
+            width (Optional[int]): the requested width
+
+        Returns:
+            Optional[int]: the breakpoint, None to keep the width of the original
+    """
+    if width is None:
+        return None
+    return next((breakpoint for breakpoint in BREAKPOINTS if breakpoint >= width), BREAKPOINTS[-1])
+
+
+class ImageVariantCache:
+    """
+        On disk cache of resized and re-encoded images with a size limit
+
+        A variant is made once from the original with pillow and written to cache_dir under a
+        name built from the original file version, the width and the format, so a changed
+        original never serves an old variant. The least recently used variants are deleted once
+        the variants take more than max_bytes. get does blocking work and is meant to run on a
+        worker thread.
+
+        Attributes:
+            cache_dir (Path): the directory of the variant files
+            max_bytes (int): the most bytes the variants take on disk
+            hits (int): the variants served from the cache
+            misses (int): the variants that had to be made
+            evictions (int): the variants deleted to stay under max_bytes
+    """
+
+    def __init__(self, cache_dir: Path = settings.image_variants_dir, max_bytes: int = settings.image_variants_max_bytes):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.cached_bytes = 0
+        self._files: Optional["OrderedDict[str, int]"] = None
+        self._making: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def variant_name(self, source: Path, stat_result: os.stat_result, width: Optional[int], image_format: str) -> str:
+        """
+            Get the file name of a variant, it changes when the original changes
+
+            Returns:
+                str: the file name of the variant
+        """
+        version = f"{source.name}-{stat_result.st_size}-{stat_result.st_mtime_ns}"
+        digest = hashlib.sha1(version.encode()).hexdigest()[:16]
+        return f"{source.stem}.{digest}.{width or 'full'}.{image_format}"
+
+    def get(self, source: Path, width: Optional[int], image_format: str) -> Path:
+        """
+            Get the path of a variant of an image, making it when it is not cached
+
+            Parameters:
+                source (Path): the path of the original image
+                width (Optional[int]): the breakpoint width, None for the width of the original
+                image_format (str): one of the supported formats
+
+            Returns:
+                Path: the path of the variant file
+
+            Raises:
+                ValueError: if the format cannot be written
+                FileNotFoundError: if the original does not exist
+        """
+        if image_format not in supported_formats():
+            raise ValueError(f"image format {image_format} is not supported")
+
+        name = self.variant_name(source, os.stat(source), width, image_format)
+        path = self.cache_dir / name
+        self._load()
+
+        with self._lock:
+            if name in self._files:
+                self._files.move_to_end(name)
+                self.hits += 1
+                return path
+            making = self._making.setdefault(name, threading.Lock())
+
+        # one thread makes a variant, the others asking for it at the same time wait for it
+        with making:
+            with self._lock:
+                if name in self._files:
+                    self.hits += 1
+                    return path
+            try:
+                size = self._make(source, path, width, image_format)
+            finally:
+                with self._lock:
+                    self._making.pop(name, None)
+            with self._lock:
+                self.misses += 1
+                self._files[name] = size
+                self.cached_bytes += size
+                self._evict()
+        return path
+
+    def stats(self) -> dict:
+        """
+            Get the counters of the cache
+
+            Returns:
+                dict: the hits, misses, evictions, number of variants and their bytes
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "variants": len(self._files or ()),
+            "bytes": self.cached_bytes
+        }
+
+    def _load(self) -> None:
+        """
+            Read the variants left by earlier runs, oldest first
+        """
+        if self._files is not None:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        entries = sorted(
+            (entry.stat().st_mtime, entry.name, entry.stat().st_size)
+            for entry in os.scandir(self.cache_dir) if entry.is_file() and not entry.name.endswith(".tmp")
+        )
+        with self._lock:
+            if self._files is None:
+                self._files = OrderedDict((name, size) for _, name, size in entries)
+                self.cached_bytes = sum(self._files.values())
+                self._evict()
+
+    def _make(self, source: Path, path: Path, width: Optional[int], image_format: str) -> int:
+        """
+            Resize and encode the original into the variant file
+
+            Returns:
+                int: the size of the variant file
+        """
+        pillow_format, _, options = FORMATS[image_format]
+        with Image.open(source) as original:
+            image = ImageOps.exif_transpose(original)
+            if width is not None and width < image.width:
+                # never upscale, the height follows the aspect ratio
+                image = image.resize((width, max(1, round(image.height * width / image.width))), Image.Resampling.LANCZOS)
+            if pillow_format == "JPEG" and image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+
+            temporary = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+            image.save(temporary, pillow_format, **options)
+        # replace atomically so a reader never sees half a variant
+        os.replace(temporary, path)
+        return path.stat().st_size
+
+    def _evict(self) -> None:
+        """
+            Delete the least recently used variants until they fit in max_bytes, the lock must be held
+        """
+        while self.cached_bytes > self.max_bytes and len(self._files) > 1:
+            name, size = self._files.popitem(last=False)
+            try:
+                os.unlink(self.cache_dir / name)
+            except FileNotFoundError:
+                logging.info(f"[INFO]: image variant {name} was already deleted")
+            self.cached_bytes -= size
+            self.evictions += 1
+
+
+def media_type(image_format: str) -> str:
+    """
+        Get the media type of a variant format
+    """
+    return FORMATS[image_format][1]
+
+
+def variant_etag(path: Path) -> str:
+    """
+        Get the strong etag of a variant, its file name already names the original version, width and format
+    """
+    return f'"{hashlib.sha1(path.name.encode()).hexdigest()[:20]}"'
+
+
+image_variants = ImageVariantCache()
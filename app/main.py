@@ -1,18 +1,42 @@
+import asyncio
 import datetime
 import logging
+import secrets
 from contextlib import asynccontextmanager
-from typing import Annotated
-from fastapi import Header, Response, Depends, FastAPI, Form, HTTPException, status
+from typing import Annotated, Optional
+from fastapi import Header, Query, Request, Response, Depends, FastAPI, Form, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import FileResponse
+from sqlalchemy.orm import selectinload
 from sqlmodel import Session, select
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordRequestForm
-from pathlib import Path
 from .core.db import *
 from .core.jwt import *
 from .core.db import *
 from .core.log import *
+from .images.bundles import *
+from .images.manifest import *
+from .images.memory_cache import *
+from .images.placeholders import *
+from .images.variants import *
 from .recommender.recommender import *
+from .search.cache import *
+from .search.database import *
+from .search.history import *
+from .search.index import *
+from .search.pages import *
+from .search.text import *
+from .streaming.chunking import *
+from .streaming.coalescing import *
+from .streaming.film_index import *
+from .streaming.film_io import *
+from .streaming.metadata import *
+from .streaming.mmap_cache import *
+from .streaming.ranges import *
+from .streaming.responses import *
+from .streaming.segments import *
+from .streaming.shaping import *
 from .core.config import Settings
 from .data.film_data import *
 from .data.example_data import *
@@ -61,8 +85,37 @@ async def lifespan(app: FastAPI):
         else:
             print(f"[INFO]: no films added")
 
+        # the films that can be streamed are looked up in this index instead of the filesystem
+        film_index.refresh(session.exec(select(Film.file_name)).all())
+        print(f"[INFO]: indexed films")
+
+        # searches are answered from this index, the film table events keep it up to date
+        search_index.build(session)
+        print(f"[INFO]: indexed film search terms")
+
+    # the images that can be served are looked up in this manifest instead of the filesystem
+    image_manifest.refresh()
+    print(f"[INFO]: indexed images")
+
+    # the placeholders of new or changed film images are made once and stored with the films
+    with Session(engine) as session:
+        print(f"[INFO]: made {refresh_placeholders(session, image_manifest)} film placeholders")
+
+    watchers = []
+    if settings.search_history_mode == "deferred":
+        watchers.append(asyncio.create_task(search_history.run()))
+    if settings.film_index_watch:
+        watchers.append(asyncio.create_task(film_index.watch()))
+    if settings.image_manifest_watch:
+        watchers.append(asyncio.create_task(image_manifest.watch()))
+
     yield
 
+    for watcher in watchers:
+        watcher.cancel()
+    # the searches still queued are written before the worker stops
+    await run_in_threadpool(search_history.flush)
+
 
 app = FastAPI(lifespan=lifespan)
 
@@ -107,7 +160,12 @@ async def root():
             "/getfilms",
             "/film",
             "/images",
-            "/recommendations"
+            "/posters",
+            "/autocomplete",
+            "/recommendations",
+            "/admin/films/refresh",
+            "/admin/images/refresh",
+            "/stats"
         ]
     }
 
@@ -416,47 +474,80 @@ async def add_watchhistory(profile_id: str, film_id: str, session: SessionDep, c
 
 
 @app.post("/search")
-async def search(profile_id: Annotated[str, Form()], query: Annotated[str, Form()], session: SessionDep, current_filmuser: UserDep) -> SearchResponseModel:
+async def search(
+    profile_id: Annotated[str, Form()],
+    query: Annotated[str, Form()],
+    session: SessionDep,
+    current_filmuser: UserDep,
+    bearer_token: Annotated[str, Depends(settings.oauth2_scheme)],
+    limit: Annotated[int, Form(ge=1, le=settings.search_max_page_size)] = settings.search_page_size,
+    cursor: Annotated[Optional[str], Form()] = None
+) -> SearchResponseModel:
     """
         This is the endpoint that allows the user to search for films
 
+        The results are ranked by relevance and come in pages, the next_cursor of a page asks
+        for the page after it. Only the search for the first page is added to the history. In the
+        deferred history mode the search is queued for the history and the token of the request
+        is given back, so nothing is written before the results are sent.
+
         Parameters:
             profile_id (Annotated[str, Form()]):
             query (Annotated[str, Form()]):
             session (SessionDep):
             current_filmuser (UserDep):
+            bearer_token (Annotated[str, Depends()]): the token of the request
+            limit (Annotated[int, Form()]): the number of results of a page
+            cursor (Annotated[Optional[str], Form()]): the next_cursor of the previous page
 
         Returns:
-            search_response: a search_response object with the token and list of film ids from the search
+            search_response: a search_response object with the token, the film ids of the page and the cursor of the next page
     """
     try:
-        current_user = session.get(FilmUser, current_filmuser)
-        result = []
-
-        # get the films for the search
-        statement_film = select(Film)
-        films = session.exec(statement_film).all()
-
-        # go through the films and search them using in
-        for film in films:
-            # add to the result with the in
-            if query in film.title:
-                result.append(film.id)
-
-        # get the profile inside the session
-        for profile in current_user.profiles:
-            # add to the profile
-            if profile.id == int(profile_id):
-                profile.search_history.append(
-                    SearchHistory(profileid=int(profile_id), search_query=query))
-                break
+        # popular searches are answered from the cache until the catalog changes
+        cache_key = (settings.search_mode, " ".join(tokenize(query)))
+        version = search_index.version
+        ranked = search_cache.get(cache_key, version)
+        if ranked is None:
+            if settings.search_mode == "database":
+                # the database matches and ranks the titles, only the ids come back
+                ranked = database_search(session, query)
+            else:
+                # look the query up in the search index, built here when the lifespan did not run
+                if not search_index.ready:
+                    search_index.build(session)
+                ranked = search_index.ranked_search(query)
+                if not ranked:
+                    # nothing has every word, rank the titles by similarity to forgive typos
+                    ranked = search_index.fuzzy_search(query)
+            ranked = search_cache.put(cache_key, version, ranked)
+
+        try:
+            result, next_cursor = page(ranked, limit, cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid search cursor")
+
+        if settings.search_history_mode == "deferred":
+            if cursor is None:
+                search_history.record(current_filmuser, int(profile_id), query)
+            return SearchResponseModel(results=result, token=bearer_token, next_cursor=next_cursor)
 
-        if len(profile.search_history) > 3:
-            # remove the search from the profile object
-            oldest_search_history = profile.search_history[0]
-            profile.search_history.remove(oldest_search_history)
-            # remove the search from the database
-            session.delete(oldest_search_history)
+        current_user = session.get(FilmUser, current_filmuser)
+        if cursor is None:
+            # get the profile inside the session
+            for profile in current_user.profiles:
+                # add to the profile
+                if profile.id == int(profile_id):
+                    profile.search_history.append(
+                        SearchHistory(profileid=int(profile_id), search_query=query))
+                    break
+
+            if len(profile.search_history) > 3:
+                # remove the search from the profile object
+                oldest_search_history = profile.search_history[0]
+                profile.search_history.remove(oldest_search_history)
+                # remove the search from the database
+                session.delete(oldest_search_history)
 
         session.add(current_user)
         session.commit()
@@ -464,11 +555,13 @@ async def search(profile_id: Annotated[str, Form()], query: Annotated[str, Form(
 
         token = create_jwt_token(
             TokenModel.model_validate(current_user).model_dump())
-        search_reponse = SearchResponseModel(results=result, token=token)
+        search_reponse = SearchResponseModel(results=result, token=token, next_cursor=next_cursor)
 
         return search_reponse
 
     # Catch errors
+    except HTTPException:
+        raise
     except JWTError:
         raise HTTPException(
             status_code=401,  # Unauthorized
@@ -481,22 +574,58 @@ async def search(profile_id: Annotated[str, Form()], query: Annotated[str, Form(
         )
 
 
-@app.get("/getfilms")
-async def get_film_list(session: SessionDep) -> list[FilmToken]:
+@app.get("/autocomplete")
+async def autocomplete(q: str, limit: Annotated[int, Query(ge=1, le=50)] = 10) -> list[SuggestionModel]:
+    """
+        This is the read only endpoint for search as you type suggestions
+
+        The suggestions come from the search index in memory, so a keystroke costs no
+        database query, no history write and no new token.
+
+        Parameters:
+            q (str): the text typed so far
+            limit (int): the most suggestions
+
+        Returns:
+            list[SuggestionModel]: the titles and cast names starting with the text
+    """
+    return [
+        SuggestionModel(text=text, kind=kind, film_id=film_id)
+        for text, kind, film_id in search_index.suggest(q, limit)
+    ]
+
+
+@app.get("/getfilms", response_model_exclude_none=True)
+async def get_film_list(session: SessionDep, placeholders: bool = False) -> list[FilmToken]:
     """
         This is the endpoint that allows a user to get the list of films to stream
 
         Parameters:
             session: SessionDep
+            placeholders (bool): whether every film comes with the placeholder of its image
 
         Returns:    
-            str: the jwt token that represents the new state after edits
+            list[FilmToken]: the films
     """
     try:
-        statement = select(Film)
-        result = session.exec(statement).all()
-
-        return result
+        if not placeholders:
+            statement = select(Film)
+            result = session.exec(statement).all()
+
+            return result
+
+        # the placeholders are loaded in one query instead of one per film
+        statement = select(Film).options(selectinload(Film.image_placeholder))
+        return [
+            FilmToken(
+                id=film.id,
+                title=film.title,
+                image_name=film.image_name,
+                file_name=film.file_name,
+                placeholder=film.image_placeholder.placeholder if film.image_placeholder else None
+            )
+            for film in session.exec(statement).all()
+        ]
 
     # Catch errors
     except JWTError:
@@ -512,83 +641,298 @@ async def get_film_list(session: SessionDep) -> list[FilmToken]:
 
 
 @app.get("/film/{film_name}")
-async def stream_film(film_name: str, range: str = Header(None)):
+async def stream_film(film_name: str, request: Request, range: str = Header(None), if_range: str = Header(None), if_none_match: str = Header(None)):
     """
         This is the endpoint that allows a user to stream a film
 
         Parameters:
             film_name (str): the name of the film to stream
+            request (Request): the request, used to tell clients apart for the chunk size
             range (str): the range of the film file to request
+            if_range (str): the etag or date the range is only valid for
+            if_none_match (str): the etags of the film the client already has
 
         Returns:    
-            str: the jwt token that represents the new state after edits
+            FilmRangeResponse: the requested ranges of the film
     """
+    # a name that is not in the index gets a 404 without touching the filesystem
+    if not film_index.ready:
+        await film_io.run(film_index.refresh)
+    if film_index.lookup(film_name) is None:
+        raise HTTPException(status_code=404, detail="Film not found")
+
     try:
-        start, end = range.replace("bytes=", "").split("-")
-        start = int(start)
-        end = int(end) if end else start + settings.chunk_size
+        # the size and etag come from the cache so a seek does not stat the file again,
+        # when the file has to be checked it is done on the film io threads and not the event loop
+        metadata = film_metadata.cached(film_name) or await film_io.run(film_metadata.get, film_name)
+        filesize = metadata.size
+        headers = {
+            'Accept-Ranges': 'bytes',
+            'ETag': metadata.etag,
+            'Last-Modified': metadata.last_modified
+        }
+
+        if etag_matches(if_none_match, metadata.etag):
+            return Response(status_code=304, headers=headers)
+
+        # a range for another version of the film is ignored and the whole film is sent
+        if not if_range_matches(if_range, metadata):
+            range = None
+
+        # an open ended range gets a chunk that grows while the client keeps playing sequentially
+        chunk_size = settings.chunk_initial_size
+        start = open_ended_start(range)
+        if start is not None:
+            chunk_size = chunk_policy.chunk_size(client_key(request.scope), film_name, start)
+
+        try:
+            ranges = parse_range_header(range, filesize, chunk_size)
+        except RangeNotSatisfiable:
+            headers['Content-Range'] = f'bytes */{str(filesize)}'
+            return Response(status_code=416, headers=headers)
+
+        # the most requested films are served from memory maps shared with the other workers
+        mapped = None
+        if settings.mmap_cache_enabled:
+            mapped = film_segments.view(metadata)
+            if mapped is None and film_segments.should_map(metadata):
+                mapped = await film_io.run(film_segments.map, metadata)
+
+        # no range or an invalid one gets the whole film
+        if ranges is None:
+            return FilmRangeResponse(metadata.path, [(0, filesize)], filesize, status_code=200, headers=headers, mapped=mapped)
+
+        # the ranges are streamed from the file instead of being read into memory
+        return FilmRangeResponse(metadata.path, ranges, filesize, status_code=206, headers=headers, media_type="video/mp4", mapped=mapped)
+
+    except FileNotFoundError:
+        # the file went away since the index was built
+        raise HTTPException(status_code=404, detail="Film not found")
 
-        # current_film = static_media_directory + "/EvilBrainFromOuterSpace_512kb.mp4"
-        current_film = f"{settings.static_media_directory}/films/{film_name}"
-        current_film = Path(current_film)
+    except HTTPException:
+        raise HTTPException(status_code=400, detail="Invalid film request")
 
-        with open(current_film, "rb") as video:
-            video.seek(start)
-            data = video.read(end - start)
-            filesize = str(current_film.stat().st_size)
-            headers = {
-                'Content-Range': f'bytes {str(start)}-{str(end)}/{filesize}',
-                'Accept-Ranges': 'bytes'
-            }
 
-            return Response(data, status_code=206, headers=headers, media_type="video/mp4")
+async def get_segment_index(film_name: str) -> tuple[FilmMetadata, SegmentIndex]:
+    """
+        Get the metadata and the segment index of a film for the segmented routes
 
-    except HTTPException:
-        raise HTTPException(status_code=400, detail="Invalid film request")
+        Parameters:
+            film_name (str): the name of the film
+
+        Returns:
+            tuple[FilmMetadata, SegmentIndex]: the metadata and the index of the film
+    """
+    if not film_index.ready:
+        await film_io.run(film_index.refresh)
+    if film_index.lookup(film_name) is None:
+        raise HTTPException(status_code=404, detail="Film not found")
+    try:
+        metadata = film_metadata.cached(film_name) or await film_io.run(film_metadata.get, film_name)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Film not found")
+
+    index = segment_indexes.cached(film_name, metadata) or await film_io.run(segment_indexes.get, film_name, metadata)
+    # only a fragmented film can be played segment by segment
+    if index is None or not index.fragmented:
+        raise HTTPException(status_code=404, detail="Film has no segments")
+    return metadata, index
+
+
+@app.get("/film/{film_name}/playlist.m3u8")
+async def get_film_playlist(film_name: str):
+    """
+        This is the endpoint that gives the hls playlist of a film that was segmented by the indexer
+
+        Parameters:
+            film_name (str): the name of the film
+
+        Returns:
+            Response: the media playlist of the film
+    """
+    metadata, index = await get_segment_index(film_name)
+    return Response(
+        content=render_playlist(index),
+        media_type="application/vnd.apple.mpegurl",
+        headers={"ETag": metadata.etag, "Cache-Control": "no-cache"}
+    )
+
+
+@app.get("/film/{film_name}/segment/{segment}")
+async def get_film_segment(film_name: str, segment: str, if_none_match: str = Header(None)):
+    """
+        This is the endpoint that gives one segment of a film, the playlist links to it
+
+        Parameters:
+            film_name (str): the name of the film
+            segment (str): init for the initialization section or the number of the segment
+            if_none_match (str): the etags of the segment the client already has
+
+        Returns:
+            FilmRangeResponse: the bytes of the segment
+    """
+    metadata, index = await get_segment_index(film_name)
+    if segment == "init":
+        offset, size = index.init
+    elif segment.isdigit() and int(segment) < len(index.segments):
+        offset, size, _ = index.segments[int(segment)]
+    else:
+        raise HTTPException(status_code=404, detail="Segment not found")
+
+    # a segment never changes for a version of the film so it is cached for good
+    headers = {
+        "ETag": f'{metadata.etag[:-1]}-{segment}"',
+        "Cache-Control": "public, max-age=31536000, immutable"
+    }
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    mapped = film_segments.view(metadata) if settings.mmap_cache_enabled else None
+    # the segment is a whole resource of its own so it is a 200 and not a part of the film
+    return FilmRangeResponse(metadata.path, [(offset, offset + size)], metadata.size, status_code=200, headers=headers, mapped=mapped)
 
 
 @app.get("/images/{image_name}")
-async def get_image(image_name: str):
+async def get_image(image_name: str, width: int = Query(None, ge=1, le=4096), format: str = Query(None),
+                    if_none_match: str = Header(None)):
     """
         This is the endpoint that allows a user to fetch an image 
 
         Parameters:
             image_name (str): the name of the image to fetch
+            width (int): the width the image is shown at, a variant of the next breakpoint width is sent
+            format (str): the format of the variant to send like webp or avif
+            if_none_match (str): the etags of the variant the client already has
 
         Returns:    
-            str: the jwt token that represents the new state after edits
+            FileResponse: the image or the variant of the image
     """
-    try:
-        # Construct the intended path
-        image_path = (settings.images_dir / f"{image_name}").resolve()
-        logging.info(f"[INFO]: got resolved path {image_path}")
-
-        # Critical security check - ensure the resolved path is within images_dir
-        if not str(image_path).startswith(str(settings.images_dir.resolve())):
-            logging.info(f"[SECURITY]: Attempted path traversal: {image_name}")
-            raise HTTPException(status_code=403, detail="Access denied")
+    # an unknown name, a path or a sibling directory is turned away by one dict lookup
+    if not image_manifest.ready:
+        await run_in_threadpool(image_manifest.refresh)
+    image = image_manifest.lookup(image_name)
+    if image is None:
+        raise HTTPException(status_code=400, detail="Invalid image request")
 
-        image_path = (settings.images_dir / f"{image_name}").resolve()
-        logging.info(f"[INFO]: image path gotten {image_path}")
+    variant = (width is not None or format is not None) and bool(supported_formats())
+    key = f"{image_name}?width={snap_width(width)}&format={format or 'webp'}" if variant else image_name
 
-        if not image_path.exists():
-            logging.info(f"[INFO]: image not found")
-            raise HTTPException(status_code=404, detail="Image not found")
+    # the posters asked for all the time are answered from memory without touching the disk
+    cached = image_cache.cached(key)
+    if cached is not None:
+        return image_response(cached, if_none_match)
 
+    try:
         # Set cache headers (1 hour = 3600 seconds)
         headers = {"Cache-Control": "public, max-age=3600"}
 
-        return FileResponse(
-            path=str(image_path),
-            headers=headers,
-            # Determine media type from extension
-            media_type=f"image/{image_path.suffix.lstrip('.')}"
-        )
+        # a resized or re-encoded variant is made once and then served from the variant cache
+        if variant:
+            variant_format = format or "webp"
+            variant_path = await run_in_threadpool(image_variants.get, image.path, snap_width(width), variant_format)
+            headers["ETag"] = variant_etag(variant_path)
+            cached = await run_in_threadpool(image_cache.load, key, image.path, variant_path, media_type(variant_format), headers["ETag"])
+            if cached is not None:
+                return image_response(cached, if_none_match)
+            if etag_matches(if_none_match, headers["ETag"]):
+                return Response(status_code=304, headers=headers)
+            return FileResponse(path=str(variant_path), headers=headers, media_type=media_type(variant_format))
+
+        cached = await run_in_threadpool(image_cache.load, key, image.path, image.path, image.media_type)
+        if cached is not None:
+            return image_response(cached, if_none_match)
+
+        # the file may have been replaced since the manifest was built so its etag is checked first
+        image = await run_in_threadpool(image_manifest.revalidate, image_name)
+        if image is None:
+            raise HTTPException(status_code=400, detail="Invalid image request")
+        headers["ETag"] = image.etag
+        if etag_matches(if_none_match, image.etag):
+            return Response(status_code=304, headers=headers)
+        return FileResponse(path=str(image.path), headers=headers, media_type=image.media_type)
 
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid image request")
 
 
+def image_response(image: CachedImage, if_none_match: str = None) -> Response:
+    """
+        Build the response of an image held in memory
+
+        Parameters:
+            image (CachedImage): the image
+            if_none_match (str): the etags of the image the client already has
+
+        Returns:
+            Response: the image or a 304 when the client already has it
+    """
+    headers = {
+        "Cache-Control": "public, max-age=3600",
+        "ETag": image.etag,
+        "Last-Modified": image.last_modified
+    }
+    if etag_matches(if_none_match, image.etag):
+        image_cache.count_not_modified()
+        return Response(status_code=304, headers=headers)
+    return Response(content=image.content, media_type=image.media_type, headers=headers)
+
+
+@app.get("/posters")
+async def get_posters(images: str = Query(...), width: int = Query(None, ge=1, le=4096), format: str = Query(None),
+                      if_none_match: str = Header(None)):
+    """
+        This is the endpoint that gives several posters in one zip bundle keyed by image name
+
+        The catalog asks for the posters of a page at once instead of one request per film.
+
+        Parameters:
+            images (str): the comma separated image names of the films
+            width (int): the width the posters are shown at, variants of the next breakpoint width are sent
+            format (str): the format of the variants like webp or avif
+            if_none_match (str): the etags of the bundle the client already has
+
+        Returns:
+            Response: the zip bundle, its index.json lists the content types and the missing names
+    """
+    names = list(dict.fromkeys(name for name in images.split(",") if name))
+    if not names or len(names) > settings.poster_bundle_max_images:
+        raise HTTPException(status_code=400, detail="Invalid image request")
+
+    if not image_manifest.ready:
+        await run_in_threadpool(image_manifest.refresh)
+    # the images may have been replaced since the manifest was built so they are checked in one go
+    checked = await run_in_threadpool(lambda: [image_manifest.revalidate(name) for name in names])
+    found = list(zip(names, checked))
+    missing = [name for name, image in found if image is None]
+    found = [(name, image) for name, image in found if image is not None]
+
+    variant = (width is not None or format is not None) and bool(supported_formats())
+    variant_width, variant_format = (snap_width(width), format or "webp") if variant else (None, None)
+    etag = bundle_etag([image for _, image in found], [name for name, _ in found], variant_width, variant_format)
+    headers = {"Cache-Control": "public, max-age=3600", "ETag": etag}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    # the key holds the missing names too so the index of a cached bundle is right
+    key = f"{','.join(names)}?width={variant_width}&format={variant_format}"
+    bundle = poster_bundles.cached(key, etag)
+    if bundle is None:
+        try:
+            if variant:
+                files = [
+                    (name, await run_in_threadpool(image_variants.get, image.path, variant_width, variant_format), media_type(variant_format))
+                    for name, image in found
+                ]
+            else:
+                files = [(name, image.path, image.media_type) for name, image in found]
+            bundle = await run_in_threadpool(build_bundle, files, missing)
+        except Exception:
+            raise HTTPException(status_code=400, detail="Invalid image request")
+        poster_bundles.store(key, etag, bundle)
+
+    return Response(content=bundle, media_type="application/zip", headers=headers)
+
+
 @app.get("/recommendations/{profile_id}")
 async def get_recommendations(profile_id: str, session: SessionDep, current_filmuser: UserDep):
     """
@@ -631,4 +975,85 @@ async def get_recommendations(profile_id: str, session: SessionDep, current_film
         raise HTTPException(
             status_code=500,  # Internal server error
             detail=f"Recommend Films failed: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+def check_admin_token(x_admin_token: str) -> None:
+    """
+        Check the admin token of a request to an admin route
+
+        Parameters:
+            x_admin_token (str): the value of the X-Admin-Token header
+
+        Raises:
+            HTTPException: 403 if the admin routes are disabled or the token is wrong
+    """
+    if not settings.admin_token or not x_admin_token or not secrets.compare_digest(x_admin_token, settings.admin_token):
+        raise HTTPException(status_code=403, detail="Access denied")
+
+
+@app.post("/admin/films/refresh")
+async def refresh_film_index(session: SessionDep, x_admin_token: str = Header(None)):
+    """
+        This route rebuilds the film index after films were added or removed
+
+        Parameters:
+            session (SessionDep): this is the database session
+            x_admin_token (str): the admin token of the deployment
+
+        Returns:
+            dict: the counters of the rebuilt index
+    """
+    check_admin_token(x_admin_token)
+
+    file_names = session.exec(select(Film.file_name)).all()
+    await film_io.run(film_index.refresh, file_names)
+    return film_index.stats()
+
+
+@app.post("/admin/images/refresh")
+async def refresh_image_manifest(x_admin_token: str = Header(None)):
+    """
+        This route rebuilds the image manifest after images were added or removed
+
+        Parameters:
+            x_admin_token (str): the admin token of the deployment
+
+        Returns:
+            dict: the counters of the rebuilt manifest
+    """
+    check_admin_token(x_admin_token)
+
+    await run_in_threadpool(image_manifest.refresh)
+    return image_manifest.stats()
+
+
+@app.get("/stats")
+async def get_stats(x_admin_token: str = Header(None)):
+    """
+        This route returns the counters of the caches so they can be tuned
+
+        Parameters:
+            x_admin_token (str): the admin token of the deployment
+
+        Returns:
+            dict: the counters of every cache
+    """
+    check_admin_token(x_admin_token)
+
+    return {
+        "film_index": film_index.stats(),
+        "film_metadata": film_metadata.stats(),
+        "search_index": search_index.stats(),
+        "search_history": search_history.stats(),
+        "search_cache": search_cache.stats(),
+        "chunk_policy": chunk_policy.stats(),
+        "mapped_films": film_segments.stats(),
+        "film_io": film_io.stats(),
+        "film_reads": block_reads.stats(),
+        "image_cache": image_cache.stats(),
+        "image_manifest": image_manifest.stats(),
+        "image_variants": image_variants.stats(),
+        "poster_bundles": poster_bundles.stats(),
+        "egress": egress.stats()
+    }
@@ -15,6 +15,7 @@ class Film(SQLModel, table=True):
             name (Optional[str]): name for backwards compatibility
             film_cast (List["FilmCast"]): relationship to film cast table
             production_team (List["FilmProductionTeam"]): relationship to production team
+            image_placeholder (Optional["FilmPlaceholder"]): relationship to the placeholder of the film image
     """
     id: Optional[int] = Field(default=None, primary_key=True)
     title: str
@@ -27,6 +28,7 @@ class Film(SQLModel, table=True):
     # Relationships
     film_cast: List["FilmCast"] = Relationship(back_populates="film")
     production_team: List["FilmProductionTeam"] = Relationship(back_populates="film")
+    image_placeholder: Optional["FilmPlaceholder"] = Relationship(back_populates="film", sa_relationship_kwargs={"uselist": False})
 
 
 class FilmCast(SQLModel, table=True):
@@ -66,4 +68,24 @@ class FilmProductionTeam(SQLModel, table=True):
     film_id: int = Field(foreign_key="film.id")
 
     # Relationship
-    film: Film = Relationship(back_populates="production_team")
\ No newline at end of file
+    film: Film = Relationship(back_populates="production_team")
+
+
+class FilmPlaceholder(SQLModel, table=True):
+    """
+        The table for the tiny placeholders painted before the film image loads
+
+        Attributes:
+            id (Optional[int]): the id of the placeholder
+            film_id (int): foreign key to film
+            image_etag (str): the etag of the image the placeholder was made from
+            placeholder (str): the placeholder as a base64 jpeg data uri
+            film (Film): relationship to film table
+    """
+    id: Optional[int] = Field(default=None, primary_key=True)
+    film_id: int = Field(foreign_key="film.id", unique=True)
+    image_etag: str
+    placeholder: str
+
+    # Relationship
+    film: Film = Relationship(back_populates="image_placeholder")
@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic import BaseModel
 from .film_models import *
 
@@ -11,8 +12,10 @@ class FilmToken(BaseModel):
             title (str): the title of the film
             image_name (str): the name of the image of the film
             file_name (str): the name of the video of the film
+            placeholder (Optional[str]): the base64 jpeg data uri painted until the image loads
     """
     id: int
     title: str
     image_name: str
-    file_name: str
\ No newline at end of file
+    file_name: str
+    placeholder: Optional[str] = None
\ No newline at end of file
@@ -1,6 +1,21 @@
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel
 
 class SearchResponseModel(BaseModel):
     results: List[int]
-    token: str
\ No newline at end of file
+    token: str
+    next_cursor: Optional[str] = None
+
+
+class SuggestionModel(BaseModel):
+    """
+        A search as you type suggestion
+
+        Attributes:
+            text (str): the title or cast name to show
+            kind (str): what the text is [title, cast]
+            film_id (int): a film with this title or cast member
+    """
+    text: str
+    kind: str
+    film_id: int
@@ -0,0 +1,104 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, List, Optional, Tuple
+from ..core.config import Settings
+
+settings = Settings()
+
+
+class SearchResultCache:
+    """
+        Bounded least recently used cache of the ranked results of popular searches
+
+        The key is the search mode and the normalized query, so "Alien" and "alien " share an
+        entry. Every entry remembers the catalog version it was computed at, the version of the
+        search index goes up whenever a committed write changes a film, its cast or its team,
+        so an entry of an older catalog is never served. Entries also expire after ttl seconds.
+
+        Attributes:
+            max_entries (int): the most searches held
+            ttl (float): the seconds an entry is served
+            hits (int): the searches answered from the cache
+            misses (int): the searches that had to run
+            stale (int): the misses caused by an older catalog version or an expired entry
+            evictions (int): the entries dropped to make room
+    """
+
+    def __init__(self, max_entries: int = settings.search_cache_max_entries, ttl: float = settings.search_cache_ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, Tuple[int, float, Tuple[Tuple[int, float], ...]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, version: int) -> Optional[Tuple[Tuple[int, float], ...]]:
+        """
+            Get the results of a search
+
+            Parameters:
+                key (Hashable): the search mode and normalized query
+                version (int): the current catalog version
+
+            Returns:
+                Optional[Tuple[Tuple[int, float], ...]]: the film id and score of the results,
+                None if the search has to run
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[0] != version or time.monotonic() - entry[1] >= self.ttl):
+                del self._entries[key]
+                self.stale += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key: Hashable, version: int, results: List[Tuple[int, float]]) -> Tuple[Tuple[int, float], ...]:
+        """
+            Keep the results of a search
+
+            Parameters:
+                key (Hashable): the search mode and normalized query
+                version (int): the catalog version the results were computed at
+                results (List[Tuple[int, float]]): the film id and score of the results
+
+            Returns:
+                Tuple[Tuple[int, float], ...]: the results as they are kept
+        """
+        kept = tuple(results)
+        if self.max_entries <= 0:
+            return kept
+        with self._lock:
+            self._entries[key] = (version, time.monotonic(), kept)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return kept
+
+    def stats(self) -> dict:
+        """
+            Get the counters of the cache
+
+            Returns:
+                dict: the hits, misses, stale entries, evictions, hit ratio and number of entries
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": len(self._entries)
+        }
+
+
+search_cache = SearchResultCache()
@@ -0,0 +1,117 @@
+import logging
+from typing import List, Optional, Tuple
+from sqlalchemy import event, text
+from sqlalchemy.engine import Connection
+from sqlmodel import Session, select
+from .text import tokenize
+from ..models.film_models import Film
+
+# the fts5 table mirrors the film titles, the triggers keep it in step with the film table
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS film_fts USING fts5("
+    "title, content='film', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS film_fts_insert AFTER INSERT ON film BEGIN "
+    "INSERT INTO film_fts(rowid, title) VALUES (new.id, new.title); END",
+    "CREATE TRIGGER IF NOT EXISTS film_fts_delete AFTER DELETE ON film BEGIN "
+    "INSERT INTO film_fts(film_fts, rowid, title) VALUES ('delete', old.id, old.title); END",
+    "CREATE TRIGGER IF NOT EXISTS film_fts_update AFTER UPDATE OF title ON film BEGIN "
+    "INSERT INTO film_fts(film_fts, rowid, title) VALUES ('delete', old.id, old.title); "
+    "INSERT INTO film_fts(rowid, title) VALUES (new.id, new.title); END",
+    # picks up the films written before the table existed
+    "INSERT INTO film_fts(film_fts) VALUES ('rebuild')",
+]
+SQLITE_DROP = ["DROP TABLE IF EXISTS film_fts"]
+POSTGRESQL_DDL = [
+    "CREATE INDEX IF NOT EXISTS film_title_trgm ON film USING gin (title gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS film_title_tsv ON film USING gin (to_tsvector('simple', title))",
+]
+
+
+def create_search_tables(connection: Connection) -> None:
+    """
+        Create the database side search structures of the film table, safe to run again
+
+        Parameters:
+            connection (Connection): the connection in the transaction that creates the tables
+    """
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        for statement in SQLITE_DDL:
+            connection.exec_driver_sql(statement)
+    elif dialect == "postgresql":
+        try:
+            # the extension needs a privileged role, an administrator can create it instead
+            with connection.begin_nested():
+                connection.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        except Exception as e:
+            logging.info(f"[INFO]: could not create pg_trgm, the database search mode needs it: {str(e)}")
+            return
+        for statement in POSTGRESQL_DDL:
+            connection.exec_driver_sql(statement)
+
+
+def drop_search_tables(connection: Connection) -> None:
+    """
+        Drop the database side search structures that are not dropped with the film table
+    """
+    if connection.dialect.name == "sqlite":
+        for statement in SQLITE_DROP:
+            connection.exec_driver_sql(statement)
+
+
+@event.listens_for(Film.__table__, "after_create")
+def _film_table_created(target, connection: Connection, **kw) -> None:
+    create_search_tables(connection)
+
+
+@event.listens_for(Film.__table__, "before_drop")
+def _film_table_dropped(target, connection: Connection, **kw) -> None:
+    drop_search_tables(connection)
+
+
+def database_search(session: Session, query: str, limit: Optional[int] = None) -> List[Tuple[int, float]]:
+    """
+        Search the film titles in the database, only the matching ids are sent back
+
+        Sqlite uses the fts5 table ranked by bm25 and postgresql the full text index, ranked
+        with ts_rank, together with the pg_trgm similarity that also matches mistyped titles.
+        The last word of the query matches as a prefix like the in-memory search index.
+        Other databases fall back to a case insensitive substring match.
+
+        Parameters:
+            session (Session): the database session
+            query (str): the search query
+            limit (Optional[int]): the most results, None for all of them
+
+        Returns:
+            List[Tuple[int, float]]: the film id and score of the results, best first
+    """
+    words = tokenize(query)
+    if not words:
+        return []
+    dialect = session.get_bind().dialect.name
+    limit_clause = "" if limit is None else " LIMIT :limit"
+
+    if dialect == "sqlite":
+        # the words only hold letters and digits, quoting keeps fts5 from reading them as operators
+        match = " ".join(f'"{word}"' for word in words) + "*"
+        rows = session.execute(
+            text(f"SELECT rowid, -bm25(film_fts) FROM film_fts WHERE film_fts MATCH :match ORDER BY rank, rowid{limit_clause}"),
+            {"match": match, "limit": limit}
+        )
+    elif dialect == "postgresql":
+        tsquery = " & ".join(words[:-1] + [f"{words[-1]}:*"])
+        rows = session.execute(
+            text(
+                "SELECT id, greatest(ts_rank(to_tsvector('simple', title), tsquery), similarity(title, :query)) AS score "
+                "FROM film, to_tsquery('simple', :tsquery) tsquery "
+                "WHERE to_tsvector('simple', title) @@ tsquery OR title % :query "
+                f"ORDER BY score DESC, id{limit_clause}"
+            ),
+            {"query": query, "tsquery": tsquery, "limit": limit}
+        )
+    else:
+        statement = select(Film.id).where(Film.title.icontains(query, autoescape=True)).order_by(Film.id).limit(limit)
+        return [(film_id, 1.0) for film_id in session.exec(statement).all()]
+
+    return [(film_id, float(score)) for film_id, score in rows.all()]
@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+from ..core.config import Settings
+from ..core.db import engine
+from ..models.user_models import Profile, SearchHistory
+
+settings = Settings()
+
+# the searches kept in the history of a profile
+HISTORY_LENGTH = 3
+
+
+class SearchHistoryWriter:
+    """
+        Write behind queue of the searches added to the search history of the profiles
+
+        /search records the search and answers right away, the writer adds the queued searches
+        in one transaction when the batch size is reached or the flush interval has passed,
+        and trims the history of every profile in the batch to the newest searches. Searches
+        for a profile the user does not own are dropped when they are written. A batch that
+        could not be written goes back to the front of the queue, and the oldest searches are
+        dropped once the queue holds max_backlog of them.
+
+        Attributes:
+            engine (Engine): the database the history is written to
+            batch_size (int): the queued searches that trigger a flush before the interval
+            flush_interval (float): the most seconds a search waits in the queue
+            max_backlog (int): the most searches the queue holds
+            flushed (int): the number of searches written
+            dropped (int): the number of searches dropped because of the profile owner or a full queue
+            flushes (int): the number of batches written
+    """
+
+    def __init__(self, engine: Engine = engine, batch_size: int = settings.search_history_batch_size,
+                 flush_interval: float = settings.search_history_flush_interval,
+                 max_backlog: int = settings.search_history_max_backlog):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_backlog = max_backlog
+        self.flushed = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.flushed_at: Optional[float] = None
+        self._pending: List[Tuple[int, int, str]] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake: Optional[asyncio.Event] = None
+
+    def record(self, filmuser_id: int, profile_id: int, query: str) -> None:
+        """
+            Queue a search for the history of a profile
+
+            Parameters:
+                filmuser_id (int): the id of the user who searched
+                profile_id (int): the id of the profile the search belongs to
+                query (str): the search query
+        """
+        with self._lock:
+            self._pending.append((filmuser_id, profile_id, query))
+            self._trim()
+            full = len(self._pending) >= self.batch_size
+        if full and self._wake is not None:
+            self._wake.set()
+
+    def _trim(self) -> None:
+        """
+            Drop the oldest searches over max_backlog, the caller holds the lock
+        """
+        overflow = len(self._pending) - self.max_backlog
+        if overflow > 0:
+            del self._pending[:overflow]
+            self.dropped += overflow
+
+    def backlog(self) -> int:
+        """
+            Get the number of queued searches
+        """
+        return len(self._pending)
+
+    def flush(self) -> int:
+        """
+            Write the queued searches and trim the history of their profiles
+
+            Returns:
+                int: the number of searches written
+
+            Raises:
+                Exception: the error of the database, the searches are queued again
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+            if not pending:
+                return 0
+
+            try:
+                entries = self._write(pending)
+            except Exception:
+                with self._lock:
+                    self._pending = pending + self._pending
+                    self._trim()
+                raise
+
+            self.flushed += len(entries)
+            self.dropped += len(pending) - len(entries)
+            self.flushes += 1
+            self.flushed_at = time.time()
+            return len(entries)
+
+    def _write(self, pending: List[Tuple[int, int, str]]) -> List[SearchHistory]:
+        """
+            Add a batch of searches in one transaction and trim the history of their profiles
+
+            Parameters:
+                pending (List[Tuple[int, int, str]]): the user, profile and query of every search
+
+            Returns:
+                List[SearchHistory]: the searches written, the ones for a profile of another user are left out
+        """
+        with Session(self.engine) as session:
+            profile_ids = {profile_id for _, profile_id, _ in pending}
+            owners = dict(session.exec(select(Profile.id, Profile.filmuserid).where(Profile.id.in_(profile_ids))).all())
+            entries = [
+                SearchHistory(profileid=profile_id, search_query=query)
+                for filmuser_id, profile_id, query in pending if owners.get(profile_id) == filmuser_id
+            ]
+            session.add_all(entries)
+            session.flush()
+
+            # keep the newest searches of every profile of the batch, the ids grow with time
+            kept: Dict[int, int] = defaultdict(int)
+            stale = []
+            statement = select(SearchHistory.id, SearchHistory.profileid) \
+                .where(SearchHistory.profileid.in_({entry.profileid for entry in entries})) \
+                .order_by(SearchHistory.id.desc())
+            for history_id, profile_id in session.exec(statement).all():
+                kept[profile_id] += 1
+                if kept[profile_id] > HISTORY_LENGTH:
+                    stale.append(history_id)
+            if stale:
+                session.exec(delete(SearchHistory).where(SearchHistory.id.in_(stale)))
+            session.commit()
+        return entries
+
+    async def run(self) -> None:
+        """
+            Flush the queue whenever it is full or the flush interval has passed, runs until cancelled
+        """
+        self._wake = asyncio.Event()
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await run_in_threadpool(self.flush)
+            except Exception as e:
+                # the database is unavailable, the batch was queued again for the next flush
+                logging.info(f"[INFO]: could not write the search history: {str(e)}")
+
+    def stats(self) -> dict:
+        """
+            Get the counters of the queue
+
+            Returns:
+                dict: the queued, written and dropped searches and the number of flushes
+        """
+        return {
+            "backlog": self.backlog(),
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "flushed_at": self.flushed_at
+        }
+
+
+search_history = SearchHistoryWriter()
@@ -0,0 +1,396 @@
+import bisect
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import event, inspect, orm
+from sqlalchemy.orm import object_session
+from sqlmodel import Session, select
+from .text import tokenize
+from .suggestions import Suggester
+from .trigrams import TrigramIndex
+from ..models.film_models import Film, FilmCast, FilmProductionTeam
+
+# the key of the index changes staged in session.info until the transaction commits
+PENDING_CHANGES = "search_index_changes"
+
+
+class SearchIndex:
+    """
+        Inverted index of the film titles and the names of their cast and production team
+
+        Every film is a document made of fields, its title and one field per cast or team
+        member, and every word of the fields points back to the film. A query matches the films
+        that have all of its words, the last word also matches as a prefix so results show up
+        while the user types. The prefix lookup is a bisect over the sorted terms. The index is
+        built by the lifespan and then kept up to date by the mapper events of the film tables,
+        which are applied when their transaction commits. The titles are also kept in a
+        trigram index for the typo tolerant search used when no film has every word, and the
+        titles and cast names in a sorted array for the search as you type suggestions.
+
+        Attributes:
+            ready (bool): whether the index was built
+            builds (int): the number of times the index was built
+            updates (int): the number of committed changes applied since the last build
+            version (int): the catalog version, goes up with every build and applied commit
+            searches (int): the number of searches
+            fuzzy_searches (int): the number of typo tolerant searches
+            suggests (int): the number of suggestion lookups
+            titles (TrigramIndex): the trigram index of the titles
+            suggestions (Suggester): the sorted array of the titles and cast names
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.builds = 0
+        self.updates = 0
+        self.version = 0
+        self.searches = 0
+        self.fuzzy_searches = 0
+        self.suggests = 0
+        self.titles = TrigramIndex()
+        self.suggestions = Suggester()
+        self.built_at: Optional[float] = None
+        self._fields: Dict[int, Dict[str, str]] = {}
+        self._documents: Dict[int, Set[str]] = {}
+        self._postings: Dict[str, Set[int]] = {}
+        self._terms: List[str] = []
+        self._title_postings: Dict[str, Set[int]] = {}
+        self._title_bonus: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def build(self, session: Session) -> None:
+        """
+            Rebuild the index from the film tables
+
+            Parameters:
+                session (Session): the database session
+        """
+        fields: Dict[int, Dict[str, str]] = {}
+        for film_id, title in session.exec(select(Film.id, Film.title)).all():
+            fields[film_id] = {"title": title}
+        for kind, model in (("cast", FilmCast), ("team", FilmProductionTeam)):
+            for member_id, film_id, name in session.exec(select(model.id, model.film_id, model.name)).all():
+                fields.setdefault(film_id, {})[f"{kind}:{member_id}"] = name
+
+        documents = {film_id: self._words(film_fields) for film_id, film_fields in fields.items()}
+        postings: Dict[str, Set[int]] = {}
+        for film_id, words in documents.items():
+            for word in words:
+                postings.setdefault(word, set()).add(film_id)
+
+        with self._lock:
+            self._fields = fields
+            self._documents = documents
+            self._postings = postings
+            self._terms = sorted(postings)
+            self.suggestions.build(fields.items())
+            self.titles.build(())
+            self._title_postings = {}
+            self._title_bonus = {}
+            for film_id, film_fields in fields.items():
+                if "title" in film_fields:
+                    self._add_title(film_id, film_fields["title"])
+            self.ready = True
+            self.builds += 1
+            self.updates = 0
+            self.version += 1
+            self.built_at = time.time()
+
+    def apply(self, changes: Iterable[Tuple[str, int, Optional[str], Optional[str]]]) -> None:
+        """
+            Apply committed changes of the film tables
+
+            Parameters:
+                changes (Iterable[Tuple[str, int, Optional[str], Optional[str]]]): the operation,
+                    the film id, the field and the text of every change. The operation is "set" to
+                    write a field, "unset" to remove a field and "drop" to remove the film.
+        """
+        with self._lock:
+            touched = set()
+            for operation, film_id, field, text in changes:
+                if operation == "drop":
+                    self._fields.pop(film_id, None)
+                elif operation == "set":
+                    self._fields.setdefault(film_id, {})[field] = text
+                elif operation == "unset":
+                    self._fields.get(film_id, {}).pop(field, None)
+                touched.add(film_id)
+                self.updates += 1
+            for film_id in touched:
+                self._reindex(film_id)
+            if touched:
+                self.version += 1
+
+    def _words(self, fields: Dict[str, str]) -> Set[str]:
+        """
+            Get the words of the fields of a film
+        """
+        return {word for text in fields.values() for word in tokenize(text)}
+
+    def _reindex(self, film_id: int) -> None:
+        """
+            Bring the postings of a film in line with its fields, the lock must be held
+        """
+        fields = self._fields.get(film_id)
+        if not fields:
+            self._fields.pop(film_id, None)
+        words = self._words(fields) if fields else set()
+        title = fields.get("title") if fields else None
+        if title != self.titles.title(film_id):
+            self._remove_title(film_id)
+            if title is not None:
+                self._add_title(film_id, title)
+        self.suggestions.update(film_id, fields or {})
+        old_words = self._documents.get(film_id, set())
+
+        for word in old_words - words:
+            films = self._postings[word]
+            films.discard(film_id)
+            if not films:
+                del self._postings[word]
+                del self._terms[bisect.bisect_left(self._terms, word)]
+        for word in words - old_words:
+            films = self._postings.get(word)
+            if films is None:
+                films = self._postings[word] = set()
+                bisect.insort(self._terms, word)
+            films.add(film_id)
+
+        if words:
+            self._documents[film_id] = words
+        else:
+            self._documents.pop(film_id, None)
+
+    def _add_title(self, film_id: int, title: str) -> None:
+        """
+            Add a title to the trigram index and the title postings used for ranking, the lock must be held
+        """
+        self.titles.add(film_id, title)
+        title_words = set(tokenize(title))
+        for word in title_words:
+            self._title_postings.setdefault(word, set()).add(film_id)
+        # shorter titles rank first, a title that is exactly the query comes before longer ones
+        self._title_bonus[film_id] = 1 / (1 + len(title_words))
+
+    def _remove_title(self, film_id: int) -> None:
+        """
+            Remove a title from the trigram index and the title postings, the lock must be held
+        """
+        title = self.titles.title(film_id)
+        if title is None:
+            return
+        self.titles.remove(film_id)
+        for word in set(tokenize(title)):
+            films = self._title_postings[word]
+            films.discard(film_id)
+            if not films:
+                del self._title_postings[word]
+        self._title_bonus.pop(film_id, None)
+
+    def _prefix_terms(self, prefix: str) -> List[str]:
+        """
+            Get the terms starting with a prefix, the lock must be held
+        """
+        start = bisect.bisect_left(self._terms, prefix)
+        end = bisect.bisect_right(self._terms, prefix + "\U0010ffff", start)
+        return self._terms[start:end]
+
+    def _match(self, words: List[str]) -> Tuple[Set[int], List[str]]:
+        """
+            Find the films having every word, the last one as a prefix, the lock must be held
+
+            Returns:
+                Tuple[Set[int], List[str]]: the matching films, not to be changed, and the terms
+                the last word is a prefix of
+        """
+        *whole_words, prefix = words
+        terms = self._prefix_terms(prefix)
+        if not terms:
+            return set(), terms
+
+        groups = []
+        for word in set(whole_words):
+            films = self._postings.get(word)
+            if not films:
+                return set(), terms
+            groups.append(films)
+        if len(terms) == 1:
+            # the prefix is a whole term, its postings join the intersection
+            groups.append(self._postings[terms[0]])
+
+        # intersect the shortest postings first so the candidates shrink fast, the first
+        # intersection makes a new set so the postings are never changed
+        groups.sort(key=len)
+        candidates: Optional[Set[int]] = groups[0] if groups else None
+        for films in groups[1:]:
+            candidates = candidates & films
+            if not candidates:
+                return set(), terms
+
+        if len(terms) == 1:
+            return candidates, terms
+        if candidates is not None and len(candidates) < len(terms):
+            # fewer candidates than prefix terms, check the words of every candidate instead
+            return {
+                film_id for film_id in candidates
+                if any(word.startswith(prefix) for word in self._documents[film_id])
+            }, terms
+        if candidates is not None:
+            return set().union(*(candidates & self._postings[term] for term in terms)), terms
+        return set().union(*(self._postings[term] for term in terms)), terms
+
+    def search(self, query: str) -> List[int]:
+        """
+            Find the films matching every word of a query, the last word may be a prefix
+
+            Parameters:
+                query (str): the search query
+
+            Returns:
+                List[int]: the ids of the matching films in ascending order
+        """
+        words = tokenize(query)
+        with self._lock:
+            self.searches += 1
+            if not words:
+                return []
+            return sorted(self._match(words)[0])
+
+    def ranked_search(self, query: str) -> List[Tuple[int, float]]:
+        """
+            Find the films matching every word of a query and score their relevance
+
+            A word found in the title scores 2 and a word only found in the names of the cast
+            or production team scores 1. Shorter titles get a bonus below 1, so a title that is
+            exactly the query comes before longer titles holding the same words.
+
+            Parameters:
+                query (str): the search query
+
+            Returns:
+                List[Tuple[int, float]]: the film id and score of the matching films, unordered
+        """
+        words = tokenize(query)
+        with self._lock:
+            self.searches += 1
+            if not words:
+                return []
+            matched, terms = self._match(words)
+            # every word scores 1 and 1 more when it is in the title, counted a word at a time
+            scores = {film_id: len(words) + self._title_bonus.get(film_id, 0.0) for film_id in matched}
+            for word in set(words[:-1]):
+                for film_id in matched & self._title_postings.get(word, set()):
+                    scores[film_id] += 1
+            in_title = set().union(*(self._title_postings.get(term, ()) for term in terms))
+            for film_id in matched & in_title:
+                scores[film_id] += 1
+            return list(scores.items())
+
+    def fuzzy_search(self, query: str, limit: Optional[int] = None) -> List[Tuple[int, float]]:
+        """
+            Find the films whose title is most similar to a query, for queries with typos
+
+            Parameters:
+                query (str): the search query
+                limit (Optional[int]): the number of results to keep, None for the default
+
+            Returns:
+                List[Tuple[int, float]]: the film id and title similarity of the results, best first
+        """
+        with self._lock:
+            self.fuzzy_searches += 1
+            return self.titles.search(query, limit)
+
+    def suggest(self, prefix: str, limit: int) -> List[Tuple[str, str, int]]:
+        """
+            Get the titles and cast names starting with the text typed so far
+
+            Parameters:
+                prefix (str): the text typed so far
+                limit (int): the most suggestions
+
+            Returns:
+                List[Tuple[str, str, int]]: the text, kind and film id of every suggestion
+        """
+        with self._lock:
+            self.suggests += 1
+            return self.suggestions.suggest(prefix, limit)
+
+    def stats(self) -> dict:
+        """
+            Get the counters of the index
+
+            Returns:
+                dict: the number of films and terms, the builds, updates, searches and suggestion lookups
+        """
+        return {
+            "films": len(self._documents),
+            "terms": len(self._terms),
+            "builds": self.builds,
+            "version": self.version,
+            "updates": self.updates,
+            "searches": self.searches,
+            "fuzzy_searches": self.fuzzy_searches,
+            "suggests": self.suggests,
+            "built_at": self.built_at
+        }
+
+
+search_index = SearchIndex()
+
+
+def _stage(target, change: Tuple[str, int, Optional[str], Optional[str]]) -> None:
+    """
+        Keep a change of the film tables until its transaction commits
+    """
+    session = object_session(target)
+    if session is None:
+        search_index.apply([change])
+    else:
+        session.info.setdefault(PENDING_CHANGES, []).append(change)
+
+
+@event.listens_for(Film, "after_insert")
+@event.listens_for(Film, "after_update")
+def _film_written(mapper, connection, film: Film) -> None:
+    _stage(film, ("set", film.id, "title", film.title))
+
+
+@event.listens_for(Film, "after_delete")
+def _film_deleted(mapper, connection, film: Film) -> None:
+    _stage(film, ("drop", film.id, None, None))
+
+
+def _track_members(model, kind: str) -> None:
+    """
+        Stage the changes of a table of film members, the cast or the production team
+    """
+    @event.listens_for(model, "after_insert")
+    @event.listens_for(model, "after_update")
+    def _member_written(mapper, connection, member) -> None:
+        field = f"{kind}:{member.id}"
+        # a member moved to another film leaves its old film
+        for old_film_id in inspect(member).attrs.film_id.history.deleted:
+            if old_film_id is not None and old_film_id != member.film_id:
+                _stage(member, ("unset", old_film_id, field, None))
+        _stage(member, ("set", member.film_id, field, member.name))
+
+    @event.listens_for(model, "after_delete")
+    def _member_deleted(mapper, connection, member) -> None:
+        _stage(member, ("unset", member.film_id, f"{kind}:{member.id}", None))
+
+
+_track_members(FilmCast, "cast")
+_track_members(FilmProductionTeam, "team")
+
+
+@event.listens_for(orm.Session, "after_commit")
+def _apply_committed(session: orm.Session) -> None:
+    changes = session.info.pop(PENDING_CHANGES, None)
+    if changes:
+        search_index.apply(changes)
+
+
+@event.listens_for(orm.Session, "after_rollback")
+def _discard_rolled_back(session: orm.Session) -> None:
+    session.info.pop(PENDING_CHANGES, None)
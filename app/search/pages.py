@@ -0,0 +1,72 @@
+import base64
+import binascii
+import heapq
+import struct
+from typing import Iterable, List, Optional, Tuple
+
+# the score and film id of the last result of a page
+CURSOR = struct.Struct(">dQ")
+
+
+def encode_cursor(film_id: int, score: float) -> str:
+    """
+        Make the opaque cursor that continues after a result
+
+        Parameters:
+            film_id (int): the film id of the last result of the page
+            score (float): the score of the last result of the page
+
+        Returns:
+            str: the cursor
+    """
+    return base64.urlsafe_b64encode(CURSOR.pack(score, film_id)).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    """
+        Read a cursor made by encode_cursor
+
+        Returns:
+            Tuple[float, int]: the score and film id of the result the next page starts after
+
+        Raises:
+            ValueError: if the cursor was not made by encode_cursor
+    """
+    try:
+        data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        score, film_id = CURSOR.unpack(data)
+    except (binascii.Error, struct.error, UnicodeEncodeError) as e:
+        raise ValueError("invalid cursor") from e
+    return score, film_id
+
+
+def page(results: Iterable[Tuple[int, float]], limit: int, cursor: Optional[str] = None) -> Tuple[List[int], Optional[str]]:
+    """
+        Take one page of results, best scores first and the lowest film id first on a tie
+
+        The page is selected with a heap of limit results, so the results are never sorted
+        in full and every page costs the same whatever the number of results.
+
+        Parameters:
+            results (Iterable[Tuple[int, float]]): the film id and score of every result
+            limit (int): the number of results of a page
+            cursor (Optional[str]): the cursor of the previous page, None for the first page
+
+        Returns:
+            Tuple[List[int], Optional[str]]: the film ids of the page and the cursor of the
+            next page, None on the last page
+
+        Raises:
+            ValueError: if the cursor is invalid
+    """
+    if cursor is not None:
+        after = decode_cursor(cursor)
+        # the results ranked after the cursor, in the order of the sort key (-score, film id)
+        results = (
+            (film_id, score) for film_id, score in results
+            if score < after[0] or (score == after[0] and film_id > after[1])
+        )
+    # one more than the page tells whether there is a next page
+    best = heapq.nsmallest(limit + 1, results, key=lambda result: (-result[1], result[0]))
+    next_cursor = encode_cursor(*best[limit - 1]) if len(best) > limit else None
+    return [film_id for film_id, _ in best[:limit]], next_cursor
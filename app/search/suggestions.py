@@ -0,0 +1,116 @@
+import bisect
+from typing import Dict, Iterable, List, Set, Tuple
+from .text import tokenize
+
+# the order of the kinds of suggestions that share a key, titles come first
+KINDS = ("title", "cast")
+
+
+def suggestion_entries(fields: Dict[str, str]) -> Set[Tuple[str, int, str]]:
+    """
+        Get the sorted array entries of the title and cast names of a film
+
+        A text gets one entry per word it has, keyed by the normalized text from that word on,
+        so "Sigourney Weaver" is suggested for "sig" and for "wea".
+
+        Parameters:
+            fields (Dict[str, str]): the fields of the film in the search index
+
+        Returns:
+            Set[Tuple[str, int, str]]: the key, kind and text of every entry
+    """
+    entries = set()
+    for field, text in fields.items():
+        kind = field.split(":", 1)[0]
+        if kind not in KINDS:
+            continue
+        words = tokenize(text)
+        for start in range(len(words)):
+            entries.add((" ".join(words[start:]), KINDS.index(kind), text))
+    return entries
+
+
+class Suggester:
+    """
+        Sorted array of the film titles and cast names for search as you type
+
+        An entry is shared by every film with the same text, so an actor in a thousand films is
+        one entry. A suggestion lookup is a bisect to the first key with the prefix and a walk
+        over the next limit entries, so it does not depend on the size of the catalog. The
+        array is not locked, the search index that owns it holds its own lock around every call.
+    """
+
+    def __init__(self):
+        self._entries: List[Tuple[str, int, str]] = []
+        # the films of every entry in the order they were added, a dict is an ordered set
+        self._films: Dict[Tuple[str, int, str], Dict[int, None]] = {}
+        self._by_film: Dict[int, Set[Tuple[str, int, str]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def build(self, films: Iterable[Tuple[int, Dict[str, str]]]) -> None:
+        """
+            Rebuild the array
+
+            Parameters:
+                films (Iterable[Tuple[int, Dict[str, str]]]): the id and search index fields of every film
+        """
+        self._by_film = {film_id: suggestion_entries(fields) for film_id, fields in sorted(films)}
+        self._films = {}
+        for film_id, entries in self._by_film.items():
+            for entry in entries:
+                self._films.setdefault(entry, {})[film_id] = None
+        self._entries = sorted(self._films)
+
+    def update(self, film_id: int, fields: Dict[str, str]) -> None:
+        """
+            Bring the entries of a film in line with its fields, empty fields remove the film
+        """
+        entries = suggestion_entries(fields)
+        old_entries = self._by_film.get(film_id, set())
+        for entry in old_entries - entries:
+            films = self._films[entry]
+            del films[film_id]
+            if not films:
+                del self._films[entry]
+                del self._entries[bisect.bisect_left(self._entries, entry)]
+        for entry in entries - old_entries:
+            films = self._films.get(entry)
+            if films is None:
+                films = self._films[entry] = {}
+                bisect.insort(self._entries, entry)
+            films[film_id] = None
+        if entries:
+            self._by_film[film_id] = entries
+        else:
+            self._by_film.pop(film_id, None)
+
+    def suggest(self, prefix: str, limit: int) -> List[Tuple[str, str, int]]:
+        """
+            Get the titles and cast names starting with a prefix, in key order
+
+            Parameters:
+                prefix (str): the text typed so far
+                limit (int): the most suggestions
+
+            Returns:
+                List[Tuple[str, str, int]]: the text, kind and film id of every suggestion,
+                a text shared by several films is suggested once with the first of its films
+        """
+        key = " ".join(tokenize(prefix))
+        if not key:
+            return []
+        suggestions = []
+        seen = set()
+        for position in range(bisect.bisect_left(self._entries, (key,)), len(self._entries)):
+            entry = self._entries[position]
+            entry_key, kind, text = entry
+            if not entry_key.startswith(key) or len(suggestions) >= limit:
+                break
+            # a text with a word repeated has one entry per key, it is suggested once
+            if (kind, text) in seen:
+                continue
+            seen.add((kind, text))
+            suggestions.append((text, KINDS[kind], next(iter(self._films[entry]))))
+        return suggestions
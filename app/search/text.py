@@ -0,0 +1,32 @@
+import re
+import unicodedata
+from typing import List
+
+TOKEN = re.compile(r"[^\W_]+")
+
+
+def normalize(text: str) -> str:
+    """
+        Fold a text for matching, accents are stripped and the case is folded
+
+        Parameters:
+            text (str): the text to fold
+
+        Returns:
+            str: the folded text
+    """
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+def tokenize(text: str) -> List[str]:
+    """
+        Split a text into its normalized words
+
+        Parameters:
+            text (str): the text to split
+
+        Returns:
+            List[str]: the words in order
+    """
+    return TOKEN.findall(normalize(text))
@@ -0,0 +1,136 @@
+from array import array
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+from .text import tokenize
+from ..core.config import Settings
+
+settings = Settings()
+
+
+def trigrams(text: str) -> Set[str]:
+    """
+        Get the trigrams of the normalized words of a text
+
+        Every word is padded like pg_trgm does, two spaces in front and one behind, so the
+        start of a word weighs more than its middle.
+
+        Parameters:
+            text (str): the text
+
+        Returns:
+            Set[str]: the distinct trigrams
+    """
+    grams = set()
+    for word in tokenize(text):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TrigramIndex:
+    """
+        Trigram index of the film titles for typo tolerant search
+
+        The postings of a trigram are a compact array of film ids and the trigram count of
+        every title is an array indexed by film id, so a lookup counts the shared trigrams of
+        all candidates at once with numpy. The score is the similarity of pg_trgm, the shared
+        trigrams over the trigrams of the query and the title together. The index is not
+        locked, the search index that owns it holds its own lock around every call.
+
+        Attributes:
+            threshold (float): the lowest similarity a result has
+            limit (int): the default number of results, the best ones are kept
+    """
+
+    def __init__(self, threshold: float = settings.search_fuzzy_threshold, limit: int = settings.search_fuzzy_limit):
+        self.threshold = threshold
+        self.limit = limit
+        self._postings: Dict[str, array] = {}
+        self._sizes = array("I")
+        self._titles: Dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._titles)
+
+    def title(self, film_id: int) -> Optional[str]:
+        """
+            Get the indexed title of a film
+        """
+        return self._titles.get(film_id)
+
+    def build(self, titles: Iterable[Tuple[int, str]]) -> None:
+        """
+            Rebuild the index
+
+            Parameters:
+                titles (Iterable[Tuple[int, str]]): the id and title of every film
+        """
+        self._postings = {}
+        self._sizes = array("I")
+        self._titles = {}
+        for film_id, title in sorted(titles):
+            self.add(film_id, title)
+
+    def add(self, film_id: int, title: str) -> None:
+        """
+            Index the title of a film that is not indexed yet
+        """
+        grams = trigrams(title)
+        if film_id >= len(self._sizes):
+            self._sizes.extend([0] * (film_id + 1 - len(self._sizes)))
+        self._sizes[film_id] = len(grams)
+        self._titles[film_id] = title
+        for gram in grams:
+            films = self._postings.get(gram)
+            if films is None:
+                films = self._postings[gram] = array("I")
+            films.append(film_id)
+
+    def remove(self, film_id: int) -> None:
+        """
+            Remove the title of a film from the index
+        """
+        title = self._titles.pop(film_id, None)
+        if title is None:
+            return
+        for gram in trigrams(title):
+            films = self._postings[gram]
+            films.remove(film_id)
+            if not films:
+                del self._postings[gram]
+        self._sizes[film_id] = 0
+
+    def search(self, query: str, limit: Optional[int] = None, threshold: Optional[float] = None) -> List[Tuple[int, float]]:
+        """
+            Find the titles most similar to a query
+
+            Parameters:
+                query (str): the search query
+                limit (Optional[int]): the number of results to keep, None for the default
+                    and 0 for every result above the threshold
+                threshold (Optional[float]): the lowest similarity, None for the default
+
+            Returns:
+                List[Tuple[int, float]]: the film id and similarity of the results, best first
+        """
+        limit = self.limit if limit is None else limit
+        threshold = self.threshold if threshold is None else threshold
+        grams = trigrams(query)
+        found = [self._postings[gram] for gram in grams if gram in self._postings]
+        if not found:
+            return []
+
+        # every posting holds a film once, so counting the ids gives the shared trigrams
+        shared = np.bincount(np.concatenate([np.frombuffer(films, dtype=np.uint32) for films in found]))
+        candidates = np.flatnonzero(shared)
+        shared = shared[candidates]
+        sizes = np.frombuffer(self._sizes, dtype=np.uint32)[candidates]
+        scores = shared / (len(grams) + sizes - shared)
+
+        kept = scores >= threshold
+        candidates, scores = candidates[kept], scores[kept]
+        if limit and len(scores) > limit:
+            best = np.argpartition(-scores, limit - 1)[:limit]
+            candidates, scores = candidates[best], scores[best]
+        order = np.lexsort((candidates, -scores))
+        return [(int(candidates[i]), float(scores[i])) for i in order]
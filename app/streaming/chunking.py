@@ -0,0 +1,84 @@
+from collections import OrderedDict
+from typing import Tuple
+from starlette.datastructures import Headers
+from starlette.types import Scope
+from ..core.config import Settings
+
+settings = Settings()
+
+
+def client_key(scope: Scope) -> str:
+    """
+        Get the key a client is remembered by between its requests
+
+        Parameters:
+            scope (Scope): the asgi scope of the request
+
+        Returns:
+            str: the address and the user agent of the client
+    """
+    client = scope.get("client")
+    return f"{client[0] if client else ''} {Headers(raw=scope.get('headers', [])).get('user-agent', '')}"
+
+
+class AdaptiveChunkPolicy:
+    """
+        Chooses how many bytes to serve for an open ended range request
+
+        A client starts with initial_size bytes, every request that continues where the
+        previous one ended grows the chunk by growth_factor up to max_size and a seek starts
+        over at initial_size. The state of the most recent clients is kept in a bounded LRU.
+
+        Attributes:
+            initial_size (int): the chunk size of the first request of a client
+            max_size (int): the largest chunk size
+            growth_factor (int): how much the chunk grows on a sequential request
+            max_clients (int): the number of clients whose state is kept
+    """
+
+    def __init__(self, initial_size: int = settings.chunk_initial_size, max_size: int = settings.chunk_max_size,
+                 growth_factor: int = settings.chunk_growth_factor, max_clients: int = settings.chunk_policy_clients):
+        self.initial_size = initial_size
+        self.max_size = max(max_size, initial_size)
+        self.growth_factor = growth_factor
+        self.max_clients = max_clients
+        # (client, film name) -> (offset the next sequential request starts at, last chunk size)
+        self._clients: "OrderedDict[Tuple[str, str], Tuple[int, int]]" = OrderedDict()
+
+    def chunk_size(self, client: str, film_name: str, start: int) -> int:
+        """
+            Get the chunk size for an open ended range request and remember it
+
+            Parameters:
+                client (str): the key of the client making the request
+                film_name (str): the name of the film requested
+                start (int): the first byte requested
+
+            Returns:
+                int: the number of bytes to serve
+        """
+        key = (client, film_name)
+        state = self._clients.pop(key, None)
+
+        if state is not None and state[0] == start:
+            size = min(state[1] * self.growth_factor, self.max_size)
+        else:
+            size = self.initial_size
+
+        self._clients[key] = (start + size, size)
+        if len(self._clients) > self.max_clients:
+            self._clients.popitem(last=False)
+
+        return size
+
+    def stats(self) -> dict:
+        """
+            Get the counters of the policy
+
+            Returns:
+                dict: the number of clients tracked
+        """
+        return {"clients": len(self._clients)}
+
+
+chunk_policy = AdaptiveChunkPolicy()
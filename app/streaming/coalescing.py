@@ -0,0 +1,92 @@
+import asyncio
+import os
+from typing import Dict, Tuple
+from .film_io import film_io
+from .loops import LoopLocal
+from ..core.config import Settings
+
+settings = Settings()
+
+
+class BlockReadCoalescer:
+    """
+        Shares one disk read between the concurrent requests for the same aligned block of a film
+
+        The files are read in blocks aligned to block_size. The first request for a block reads it
+        and the requests that want the same block while that read is in flight wait for it instead
+        of reading the block again, so at a premiere the disk reads grow with the unique blocks
+        and not with the viewers. Nothing is kept once a read is done, the page cache does that.
+        The blocks are larger than the chunks of the other send paths because every block is a
+        hop to a thread and back, with small blocks the hops and not the disk set the throughput.
+
+        Attributes:
+            block_size (int): the size and alignment of the reads
+            reads (int): the blocks read from the disk
+            shared (int): the blocks that were handed to a request by the read of another request
+    """
+
+    def __init__(self, block_size: int = settings.film_read_block_size):
+        self.block_size = block_size
+        self.reads = 0
+        self.shared = 0
+        self._in_flight: LoopLocal[Dict[Tuple[str, int], asyncio.Future]] = LoopLocal(dict)
+
+    def in_flight(self) -> Dict[Tuple[str, int], asyncio.Future]:
+        """
+            Get the reads in flight of the running event loop
+
+            Returns:
+                Dict[Tuple[str, int], asyncio.Future]: the future of every (path, block) being read
+        """
+        return self._in_flight.get()
+
+    async def read(self, path: str, fd: int, block: int) -> bytes:
+        """
+            Read an aligned block of a film or wait for the read of another request
+
+            Parameters:
+                path (str): the path of the film file, the key of the block
+                fd (int): an open descriptor of the film file, used when this request does the read
+                block (int): the number of the block
+
+            Returns:
+                bytes: the block, shorter than block_size at the end of the file
+        """
+        in_flight = self.in_flight()
+        key = (path, block)
+        while key in in_flight:
+            data = await asyncio.shield(in_flight[key])
+            if data is not None:
+                self.shared += 1
+                return data
+            # the request doing the read went away, one of the waiters reads it instead
+
+        future = asyncio.get_running_loop().create_future()
+        in_flight[key] = future
+        try:
+            data = await film_io.run(os.pread, fd, self.block_size, block * self.block_size)
+        except BaseException:
+            future.set_result(None)
+            raise
+        finally:
+            del in_flight[key]
+        self.reads += 1
+        future.set_result(data)
+        return data
+
+    def stats(self) -> dict:
+        """
+            Get the counters of the coalescing
+
+            Returns:
+                dict: the block size, the disk reads, the shared reads and the reads in flight
+        """
+        return {
+            "block_size": self.block_size,
+            "reads": self.reads,
+            "shared": self.shared,
+            "in_flight": sum(len(in_flight) for in_flight in self._in_flight.values())
+        }
+
+
+block_reads = BlockReadCoalescer()
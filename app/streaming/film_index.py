@@ -0,0 +1,133 @@
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set
+from .film_io import film_io
+from ..core.config import Settings
+
+settings = Settings()
+
+
+class FilmIndex:
+    """
+        Index of the film files that can be streamed, built at startup from the films directory
+
+        A lookup is one dict access, so a name that is not a film file of the directory,
+        including a path traversal attempt, is turned away without touching the filesystem.
+        The index is cross checked with the file names of the films in the database and the
+        films without a file and the files without a film are logged and counted. Once a
+        catalog is known only the files of its films are served, a file without a film is
+        counted but not streamed. It is rebuilt by refresh, which the lifespan, the file
+        watcher and the admin route call.
+
+        Attributes:
+            films_dir (Path): the directory of the film files
+            ready (bool): whether the index was built
+            refreshes (int): the number of times the index was built
+    """
+
+    def __init__(self, films_dir: Path = settings.films_dir):
+        self.films_dir = Path(films_dir)
+        self.ready = False
+        self.refreshes = 0
+        self.refreshed_at: Optional[float] = None
+        self._files: Dict[str, Path] = {}
+        self._served: Dict[str, Path] = {}
+        self._catalog: Optional[Set[str]] = None
+        self._lock = threading.Lock()
+
+    def lookup(self, film_name: str) -> Optional[Path]:
+        """
+            Get the path of a film file
+
+            Parameters:
+                film_name (str): the file name of the film
+
+            Returns:
+                Optional[Path]: the resolved path of the file, None if it is not an indexed film
+                    or not a film of the catalog
+        """
+        return self._served.get(film_name)
+
+    def refresh(self, catalog: Optional[Iterable[str]] = None) -> None:
+        """
+            Rebuild the index from the films directory
+
+            Parameters:
+                catalog (Optional[Iterable[str]]): the file names of the films in the database,
+                    None to keep the ones of the last refresh
+        """
+        files = {}
+        try:
+            with os.scandir(self.films_dir) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        files[entry.name] = Path(entry.path).resolve()
+        except FileNotFoundError:
+            logging.info(f"[INFO]: films directory {self.films_dir} does not exist")
+
+        with self._lock:
+            if catalog is not None:
+                self._catalog = set(catalog)
+            self._files = files
+            if self._catalog is None:
+                self._served = files
+            else:
+                self._served = {name: path for name, path in files.items() if name in self._catalog}
+            self.ready = True
+            self.refreshes += 1
+            self.refreshed_at = time.time()
+
+        missing, orphaned = self.mismatches()
+        if missing:
+            logging.info(f"[INFO]: films without a file: {sorted(missing)}")
+        if orphaned:
+            logging.info(f"[INFO]: film files without a film: {sorted(orphaned)}")
+
+    def mismatches(self) -> tuple[Set[str], Set[str]]:
+        """
+            Compare the indexed files with the film file names of the database
+
+            Returns:
+                tuple[Set[str], Set[str]]: the films without a file and the files without a film
+        """
+        if self._catalog is None:
+            return set(), set()
+        files = set(self._files)
+        return self._catalog - files, files - self._catalog
+
+    async def watch(self) -> None:
+        """
+            Refresh the index whenever the films directory changes, needs the watchfiles package
+        """
+        try:
+            from watchfiles import awatch
+        except ImportError:
+            logging.info("[INFO]: watchfiles is not installed, the film index is only refreshed by the admin route")
+            return
+        if not self.films_dir.is_dir():
+            return
+
+        async for _ in awatch(self.films_dir):
+            await film_io.run(self.refresh)
+
+    def stats(self) -> dict:
+        """
+            Get the counters of the index
+
+            Returns:
+                dict: the number of films, the mismatches with the database and the refreshes
+        """
+        missing, orphaned = self.mismatches()
+        return {
+            "films": len(self._files),
+            "missing_files": len(missing),
+            "orphaned_files": len(orphaned),
+            "refreshes": self.refreshes,
+            "refreshed_at": self.refreshed_at
+        }
+
+
+film_index = FilmIndex()
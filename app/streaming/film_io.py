@@ -0,0 +1,68 @@
+from typing import Any, Callable, TypeVar
+import anyio
+from .loops import LoopLocal
+from ..core.config import Settings
+
+settings = Settings()
+
+T = TypeVar("T")
+
+
+class FilmIO:
+    """
+        Runs the blocking file work of film streaming on worker threads with a bounded concurrency
+
+        The film reads get their own limiter instead of the thread pool shared with every sync
+        dependency, so a slow disk only makes film requests wait and the event loop keeps serving
+        logins, searches and token refreshes.
+
+        Attributes:
+            concurrency (int): the most film file operations running at once per worker
+            calls (int): the number of operations run
+    """
+
+    def __init__(self, concurrency: int = settings.film_io_concurrency):
+        self.concurrency = concurrency
+        self.calls = 0
+        self._limiters: LoopLocal[anyio.CapacityLimiter] = LoopLocal(lambda: anyio.CapacityLimiter(self.concurrency))
+
+    def limiter(self) -> anyio.CapacityLimiter:
+        """
+            Get the limiter of the running event loop
+
+            Returns:
+                anyio.CapacityLimiter: the limiter of the film file operations
+        """
+        return self._limiters.get()
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        """
+            Run a blocking function on a worker thread once a film io slot is free
+
+            Parameters:
+                func (Callable): the blocking function
+                args (Any): the arguments of the function
+
+            Returns:
+                T: the result of the function
+        """
+        self.calls += 1
+        return await anyio.to_thread.run_sync(func, *args, limiter=self.limiter())
+
+    def stats(self) -> dict:
+        """
+            Get the counters of the film io of the running event loop
+
+            Returns:
+                dict: the concurrency, the operations running and waiting and the operations run
+        """
+        statistics = self.limiter().statistics()
+        return {
+            "concurrency": self.concurrency,
+            "running": statistics.borrowed_tokens,
+            "waiting": statistics.tasks_waiting,
+            "calls": self.calls
+        }
+
+
+film_io = FilmIO()
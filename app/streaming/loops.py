@@ -0,0 +1,45 @@
+import asyncio
+import weakref
+from typing import Callable, Generic, List, TypeVar
+
+T = TypeVar("T")
+
+
+class LoopLocal(Generic[T]):
+    """
+        One value per event loop, made by a factory the first time a loop asks for it
+
+        Locks, futures and limiters belong to the event loop they were made on and the tests
+        and benchmarks run several loops in one process. The values are held by a weak
+        reference to their loop, so they go away with it.
+
+        Attributes:
+            factory (Callable[[], T]): makes the value of a loop
+    """
+
+    def __init__(self, factory: Callable[[], T]):
+        self.factory = factory
+        self._values: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, T]" = weakref.WeakKeyDictionary()
+
+    def get(self) -> T:
+        """
+            Get the value of the running event loop
+
+            Returns:
+                T: the value, made now if the loop did not have one yet
+        """
+        loop = asyncio.get_running_loop()
+        value = self._values.get(loop)
+        if value is None:
+            value = self.factory()
+            self._values[loop] = value
+        return value
+
+    def values(self) -> List[T]:
+        """
+            Get the values of all the event loops that are still alive
+
+            Returns:
+                List[T]: the values
+        """
+        return list(self._values.values())
@@ -0,0 +1,197 @@
+import os
+import stat
+import threading
+import time
+from email.utils import formatdate
+from pathlib import Path
+from typing import Dict, Optional
+from pydantic import BaseModel
+from .mp4 import find_top_level_box
+from ..core.config import Settings
+
+settings = Settings()
+
+
+class FilmMetadata(BaseModel):
+    """
+        The cached file information of a film
+
+        Attributes:
+            path (Path): the resolved path of the film file
+            size (int): the size of the film file
+            mtime_ns (int): the modification time of the film file
+            etag (str): the strong etag of this version of the film file
+            last_modified (str): the modification time formatted for http headers
+            moov_offset (Optional[int]): the offset of the moov box, None if the file has none
+            checked_at (float): the monotonic time the file was last checked
+    """
+    path: Path
+    size: int
+    mtime_ns: int
+    etag: str
+    last_modified: str
+    moov_offset: Optional[int] = None
+    checked_at: float
+
+
+class FilmMetadataCache:
+    """
+        Process wide cache of the film file metadata keyed by film name
+
+        Entries are trusted for revalidate_after seconds, after that one stat checks the
+        modification time and the entry is rebuilt when the file changed. cached never touches
+        the filesystem and is safe on the event loop, get may and is meant to run on the film io threads.
+
+        Attributes:
+            films_dir (Path): the directory of the film files
+            revalidate_after (float): the seconds an entry is used without checking the file
+            hits (int): the lookups answered from the cache
+            misses (int): the lookups that had to read the file
+    """
+
+    def __init__(self, films_dir: Path = settings.films_dir, revalidate_after: float = settings.film_metadata_ttl):
+        self.films_dir = Path(films_dir)
+        self.revalidate_after = revalidate_after
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, FilmMetadata] = {}
+        self._lock = threading.Lock()
+
+    def cached(self, film_name: str) -> Optional[FilmMetadata]:
+        """
+            Get the metadata of a film if it can be used without touching the filesystem
+
+            Parameters:
+                film_name (str): the file name of the film
+
+            Returns:
+                Optional[FilmMetadata]: the metadata of the film, None if get has to check the file
+        """
+        entry = self._entries.get(film_name)
+        if entry is None or time.monotonic() - entry.checked_at >= self.revalidate_after:
+            return None
+        with self._lock:
+            self.hits += 1
+        return entry
+
+    def get(self, film_name: str) -> FilmMetadata:
+        """
+            Get the metadata of a film
+
+            Parameters:
+                film_name (str): the file name of the film
+
+            Returns:
+                FilmMetadata: the metadata of the film
+
+            Raises:
+                FileNotFoundError: if the film file does not exist
+        """
+        entry = self.cached(film_name)
+        if entry is not None:
+            return entry
+
+        entry = self._entries.get(film_name)
+        now = time.monotonic()
+
+        path = entry.path if entry is not None else self.films_dir / film_name
+        try:
+            stat_result = os.stat(path)
+        except FileNotFoundError:
+            self.invalidate(film_name)
+            raise
+        if not stat.S_ISREG(stat_result.st_mode):
+            raise FileNotFoundError(f"film {film_name} is not a file")
+
+        if entry is not None and entry.mtime_ns == stat_result.st_mtime_ns and entry.size == stat_result.st_size:
+            entry.checked_at = now
+            with self._lock:
+                self.hits += 1
+            return entry
+
+        entry = self._load(path, stat_result, now)
+        with self._lock:
+            self.misses += 1
+            self._entries[film_name] = entry
+        return entry
+
+    def invalidate(self, film_name: Optional[str] = None) -> None:
+        """
+            Drop one film or every film from the cache
+
+            Parameters:
+                film_name (Optional[str]): the film to drop, None to drop every film
+        """
+        with self._lock:
+            if film_name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(film_name, None)
+
+    def stats(self) -> dict:
+        """
+            Get the counters of the cache
+
+            Returns:
+                dict: the hits, misses and number of entries
+        """
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+    def _load(self, path: Path, stat_result: os.stat_result, now: float) -> FilmMetadata:
+        """
+            Build the metadata of a film file from its stat result
+        """
+        with open(path, "rb") as video:
+            moov_offset = find_top_level_box(video, stat_result.st_size, b"moov")
+
+        return FilmMetadata(
+            path=path.resolve(),
+            size=stat_result.st_size,
+            mtime_ns=stat_result.st_mtime_ns,
+            etag=f'"{stat_result.st_ino:x}-{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"',
+            last_modified=formatdate(stat_result.st_mtime, usegmt=True),
+            moov_offset=moov_offset,
+            checked_at=now
+        )
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """
+        Check an if none match header against an etag with the weak comparison
+
+        Parameters:
+            header (Optional[str]): the value of the if none match header
+            etag (str): the current etag
+
+        Returns:
+            bool: whether the client already has this version
+    """
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag.removeprefix("W/") in tags
+
+
+def if_range_matches(header: Optional[str], metadata: FilmMetadata) -> bool:
+    """
+        Check whether the range of a request can be served given its if range header
+
+        Parameters:
+            header (Optional[str]): the value of the if range header
+            metadata (FilmMetadata): the metadata of the film
+
+        Returns:
+            bool: whether the range should be served, when False the whole film is sent
+    """
+    if not header:
+        return True
+    header = header.strip()
+    # an etag validator needs the strong comparison, a date validator must be the exact date
+    if header.startswith('"') or header.startswith("W/"):
+        return header == metadata.etag
+    return header == metadata.last_modified
+
+
+film_metadata = FilmMetadataCache()
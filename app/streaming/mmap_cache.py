@@ -0,0 +1,155 @@
+import mmap
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from .metadata import FilmMetadata
+from ..core.config import Settings
+
+settings = Settings()
+
+
+class MappedFilmCache:
+    """
+        Keeps the most requested film files memory mapped so ranges are served as memoryview slices
+
+        The maps are read only and shared, so every uvicorn worker that maps the same film uses
+        the same pages of the OS page cache instead of holding its own copy. A film is mapped once
+        it has been requested min_requests times and the least recently used films are unmapped
+        when the total mapped bytes go over max_bytes. view never blocks and is used on the event
+        loop, map opens the file and is meant to run on the film io threads.
+
+        Attributes:
+            max_bytes (int): the most bytes that are mapped at once
+            min_requests (int): the requests a film needs before it is mapped
+            hits (int): the requests served from a map
+            misses (int): the requests for films that are not mapped
+    """
+
+    def __init__(self, max_bytes: int = settings.mmap_cache_max_bytes, min_requests: int = settings.mmap_cache_min_requests):
+        self.max_bytes = max_bytes
+        self.min_requests = min_requests
+        self.hits = 0
+        self.misses = 0
+        self.mapped_bytes = 0
+        # (path, mtime) -> (film name, map), the key changes when the film file changes
+        self._maps: "OrderedDict[Tuple[str, int], Tuple[str, mmap.mmap]]" = OrderedDict()
+        self._requests: Dict[str, int] = {}
+        # maps that were evicted while a response still held a slice of them
+        self._retired: List[mmap.mmap] = []
+        self._lock = threading.Lock()
+
+    def view(self, metadata: FilmMetadata) -> Optional[memoryview]:
+        """
+            Get a memoryview of a film if it is mapped and count the request
+
+            Parameters:
+                metadata (FilmMetadata): the metadata of the film
+
+            Returns:
+                Optional[memoryview]: a view of the whole film, None if the film is not mapped
+        """
+        key = (str(metadata.path), metadata.mtime_ns)
+        with self._lock:
+            entry = self._maps.get(key)
+            if entry is not None:
+                self._maps.move_to_end(key)
+                self.hits += 1
+                return memoryview(entry[1])
+
+            self.misses += 1
+            name = metadata.path.name
+            self._requests[name] = self._requests.get(name, 0) + 1
+            return None
+
+    def should_map(self, metadata: FilmMetadata) -> bool:
+        """
+            Check whether a film that is not mapped is hot enough and small enough to be mapped
+
+            Parameters:
+                metadata (FilmMetadata): the metadata of the film
+
+            Returns:
+                bool: whether the film should be mapped
+        """
+        requests = self._requests.get(metadata.path.name, 0)
+        return requests >= self.min_requests and 0 < metadata.size <= self.max_bytes
+
+    def map(self, metadata: FilmMetadata) -> Optional[memoryview]:
+        """
+            Map a film and unmap the least recently used films that no longer fit
+
+            Parameters:
+                metadata (FilmMetadata): the metadata of the film
+
+            Returns:
+                Optional[memoryview]: a view of the whole film, None if the file changed since its metadata was read
+        """
+        key = (str(metadata.path), metadata.mtime_ns)
+        with open(metadata.path, "rb") as video:
+            mapped = mmap.mmap(video.fileno(), 0, access=mmap.ACCESS_READ)
+        if mapped.size() != metadata.size:
+            # the file changed since its metadata was read, serve it from the file this time
+            mapped.close()
+            return None
+        if hasattr(mapped, "madvise"):
+            mapped.madvise(mmap.MADV_WILLNEED)
+
+        with self._lock:
+            if key in self._maps:
+                # another request mapped it first
+                mapped.close()
+                return memoryview(self._maps[key][1])
+
+            # drop the map of an older version of the film
+            for old_key in [old_key for old_key in self._maps if old_key[0] == key[0]]:
+                self._unmap(old_key)
+
+            self._maps[key] = (metadata.path.name, mapped)
+            self.mapped_bytes += metadata.size
+            while self.mapped_bytes > self.max_bytes:
+                self._unmap(next(iter(self._maps)))
+
+            return memoryview(mapped)
+
+    def resident(self) -> List[dict]:
+        """
+            Get the films that are currently mapped, least recently used first
+
+            Returns:
+                List[dict]: the name and size of every mapped film
+        """
+        with self._lock:
+            return [{"film": name, "bytes": mapped.size()} for name, mapped in self._maps.values()]
+
+    def stats(self) -> dict:
+        """
+            Get the counters of the cache
+
+            Returns:
+                dict: the hits, misses, mapped bytes and mapped films
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "mapped_bytes": self.mapped_bytes,
+            "resident": self.resident()
+        }
+
+    def _unmap(self, key: Tuple[str, int]) -> None:
+        """
+            Remove a map from the cache and close it once no response uses it, the lock must be held
+        """
+        _, mapped = self._maps.pop(key)
+        self.mapped_bytes -= mapped.size()
+        self._retired.append(mapped)
+
+        still_used = []
+        for retired in self._retired:
+            try:
+                retired.close()
+            except BufferError:
+                still_used.append(retired)
+        self._retired = still_used
+
+
+film_segments = MappedFilmCache()
@@ -0,0 +1,294 @@
+import struct
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+BOX_HEADER = struct.Struct(">I4s")
+LARGE_SIZE = struct.Struct(">Q")
+
+
+def iter_boxes(video: BinaryIO, start: int, end: int) -> Iterator[Tuple[bytes, int, int, int]]:
+    """
+        Walk the mp4 boxes between two offsets of a file without reading their payloads
+
+        Parameters:
+            video (BinaryIO): the open mp4 file
+            start (int): the offset of the first box
+            end (int): the offset where the boxes stop
+
+        Returns:
+            Iterator[Tuple[bytes, int, int, int]]: the type, offset, header size and total size of every box
+    """
+    offset = start
+    while offset + BOX_HEADER.size <= end:
+        video.seek(offset)
+        header = video.read(BOX_HEADER.size)
+        if len(header) < BOX_HEADER.size:
+            return
+        size, box_type = BOX_HEADER.unpack(header)
+        header_size = BOX_HEADER.size
+        if size == 1:
+            large = video.read(LARGE_SIZE.size)
+            if len(large) < LARGE_SIZE.size:
+                return
+            size = LARGE_SIZE.unpack(large)[0]
+            header_size += LARGE_SIZE.size
+        elif size == 0:
+            # the last box runs to the end of the file
+            size = end - offset
+        if size < header_size:
+            # a corrupt size would loop forever, stop walking instead
+            return
+        yield box_type, offset, header_size, size
+        offset += size
+
+
+def find_top_level_box(video: BinaryIO, file_size: int, box_type: bytes) -> Optional[int]:
+    """
+        Find the offset of the first top level box of a type
+
+        Parameters:
+            video (BinaryIO): the open mp4 file
+            file_size (int): the size of the file
+            box_type (bytes): the four character box type like b"moov"
+
+        Returns:
+            Optional[int]: the offset of the box, None if the file has no such box
+    """
+    for found_type, offset, _, _ in iter_boxes(video, 0, file_size):
+        if found_type == box_type:
+            return offset
+    return None
+
+
+class Box:
+    """
+        A box of an mp4 file, the payload is only read when asked for
+
+        Attributes:
+            type (bytes): the four character type of the box
+            offset (int): the offset of the box in the file
+            header_size (int): the size of the box header
+            size (int): the size of the whole box
+    """
+
+    def __init__(self, box_type: bytes, offset: int, header_size: int, size: int):
+        self.type = box_type
+        self.offset = offset
+        self.header_size = header_size
+        self.size = size
+
+    @property
+    def end(self) -> int:
+        return self.offset + self.size
+
+    def children(self, video: BinaryIO) -> List["Box"]:
+        """
+            Get the boxes inside a container box
+        """
+        return [Box(*found) for found in iter_boxes(video, self.offset + self.header_size, self.end)]
+
+    def child(self, video: BinaryIO, box_type: bytes) -> Optional["Box"]:
+        """
+            Get the first box of a type inside a container box
+        """
+        return next((box for box in self.children(video) if box.type == box_type), None)
+
+    def payload(self, video: BinaryIO) -> bytes:
+        """
+            Read the payload of the box
+        """
+        video.seek(self.offset + self.header_size)
+        return video.read(self.size - self.header_size)
+
+
+def top_level_boxes(video: BinaryIO, file_size: int) -> List[Box]:
+    """
+        Get the top level boxes of an mp4 file
+
+        Parameters:
+            video (BinaryIO): the open mp4 file
+            file_size (int): the size of the file
+
+        Returns:
+            List[Box]: the top level boxes in file order
+    """
+    return [Box(*found) for found in iter_boxes(video, 0, file_size)]
+
+
+def _full_box(payload: bytes) -> Tuple[int, int, bytes]:
+    """
+        Split the version and flags off the payload of a full box
+
+        Returns:
+            Tuple[int, int, bytes]: the version, the flags and the rest of the payload
+    """
+    return payload[0], int.from_bytes(payload[1:4], "big"), payload[4:]
+
+
+def _timescale_and_duration(payload: bytes) -> Tuple[int, int]:
+    """
+        Read the timescale and duration of a mvhd or mdhd payload
+    """
+    version, _, body = _full_box(payload)
+    if version == 1:
+        return struct.unpack_from(">IQ", body, 16)
+    return struct.unpack_from(">II", body, 8)
+
+
+class Track:
+    """
+        The parts of a trak box needed to find keyframes
+
+        Attributes:
+            track_id (int): the id of the track
+            handler (bytes): the handler type like b"vide" or b"soun"
+            timescale (int): the units per second of the track times
+            duration (int): the duration of the track in its timescale
+            stbl (Optional[Box]): the sample table of the track
+    """
+
+    def __init__(self, video: BinaryIO, trak: Box):
+        tkhd = trak.child(video, b"tkhd")
+        version, _, body = _full_box(tkhd.payload(video))
+        self.track_id = struct.unpack_from(">I", body, 16 if version == 1 else 8)[0]
+
+        mdia = trak.child(video, b"mdia")
+        self.timescale, self.duration = _timescale_and_duration(mdia.child(video, b"mdhd").payload(video))
+        self.handler = _full_box(mdia.child(video, b"hdlr").payload(video))[2][4:8]
+        minf = mdia.child(video, b"minf")
+        self.stbl = minf.child(video, b"stbl") if minf is not None else None
+
+
+def read_movie(video: BinaryIO, moov: Box) -> Tuple[int, int, List[Track], dict]:
+    """
+        Read the movie header, the tracks and the fragment defaults of a moov box
+
+        Parameters:
+            video (BinaryIO): the open mp4 file
+            moov (Box): the moov box
+
+        Returns:
+            Tuple[int, int, List[Track], dict]: the movie timescale, the movie duration, the tracks
+            and the default sample duration of every track id
+    """
+    timescale, duration = _timescale_and_duration(moov.child(video, b"mvhd").payload(video))
+    tracks = [Track(video, trak) for trak in moov.children(video) if trak.type == b"trak"]
+
+    default_durations = {}
+    mvex = moov.child(video, b"mvex")
+    if mvex is not None:
+        for box in mvex.children(video):
+            if box.type == b"trex":
+                track_id, _, default_duration = struct.unpack_from(">III", _full_box(box.payload(video))[2])
+                default_durations[track_id] = default_duration
+            elif box.type == b"mehd":
+                version, _, body = _full_box(box.payload(video))
+                # the movie header of a fragmented file has no duration, mehd has it
+                duration = struct.unpack_from(">Q" if version == 1 else ">I", body)[0] or duration
+
+    return timescale, duration, tracks, default_durations
+
+
+def fragment_duration(video: BinaryIO, moof: Box, track_id: int, default_duration: int) -> int:
+    """
+        Sum the sample durations of one track in a movie fragment
+
+        Parameters:
+            video (BinaryIO): the open mp4 file
+            moof (Box): the moof box of the fragment
+            track_id (int): the track to sum
+            default_duration (int): the default sample duration from the trex box of the track
+
+        Returns:
+            int: the duration of the fragment in the track timescale
+    """
+    total = 0
+    for traf in moof.children(video):
+        if traf.type != b"traf":
+            continue
+        boxes = traf.children(video)
+        tfhd = next(box for box in boxes if box.type == b"tfhd")
+        _, flags, body = _full_box(tfhd.payload(video))
+        if struct.unpack_from(">I", body)[0] != track_id:
+            continue
+
+        # the optional tfhd fields come in this order, only the default duration is needed
+        position = 4
+        position += 8 if flags & 0x1 else 0
+        position += 4 if flags & 0x2 else 0
+        track_default = struct.unpack_from(">I", body, position)[0] if flags & 0x8 else default_duration
+
+        for trun in boxes:
+            if trun.type != b"trun":
+                continue
+            _, flags, body = _full_box(trun.payload(video))
+            sample_count = struct.unpack_from(">I", body)[0]
+            if not flags & 0x100:
+                total += sample_count * track_default
+                continue
+            position = 4 + (4 if flags & 0x1 else 0) + (4 if flags & 0x4 else 0)
+            sample_size = 4 * bin(flags & 0xF00).count("1")
+            for _ in range(sample_count):
+                total += struct.unpack_from(">I", body, position)[0]
+                position += sample_size
+    return total
+
+
+def keyframes(video: BinaryIO, track: Track) -> List[Tuple[int, int]]:
+    """
+        Find the byte offset and decode time of every keyframe of a progressive track
+
+        Parameters:
+            video (BinaryIO): the open mp4 file
+            track (Track): the track, usually the video track
+
+        Returns:
+            List[Tuple[int, int]]: the offset and decode time in the track timescale of every keyframe
+    """
+    tables = {box.type: box.payload(video) for box in track.stbl.children(video)}
+
+    sizes_body = _full_box(tables[b"stsz"])[2]
+    uniform_size, sample_count = struct.unpack_from(">II", sizes_body)
+    sizes = [uniform_size] * sample_count if uniform_size else list(struct.unpack_from(f">{sample_count}I", sizes_body, 8))
+
+    if b"stco" in tables:
+        body = _full_box(tables[b"stco"])[2]
+        chunk_offsets = struct.unpack_from(f">{struct.unpack_from('>I', body)[0]}I", body, 4)
+    else:
+        body = _full_box(tables[b"co64"])[2]
+        chunk_offsets = struct.unpack_from(f">{struct.unpack_from('>I', body)[0]}Q", body, 4)
+
+    body = _full_box(tables[b"stsc"])[2]
+    runs = [struct.unpack_from(">III", body, 4 + 12 * i)[:2] for i in range(struct.unpack_from(">I", body)[0])]
+
+    # offset of every sample from the chunk offsets and the samples per chunk runs
+    offsets = []
+    sample = 0
+    for run, (first_chunk, samples_per_chunk) in enumerate(runs):
+        last_chunk = runs[run + 1][0] - 1 if run + 1 < len(runs) else len(chunk_offsets)
+        for chunk in range(first_chunk - 1, last_chunk):
+            position = chunk_offsets[chunk]
+            for _ in range(samples_per_chunk):
+                if sample >= sample_count:
+                    break
+                offsets.append(position)
+                position += sizes[sample]
+                sample += 1
+
+    # decode time of every sample from the time to sample runs
+    times = []
+    body = _full_box(tables[b"stts"])[2]
+    time = 0
+    for i in range(struct.unpack_from(">I", body)[0]):
+        count, delta = struct.unpack_from(">II", body, 4 + 8 * i)
+        for _ in range(count):
+            times.append(time)
+            time += delta
+
+    # without a sync sample table every sample is a keyframe
+    if b"stss" in tables:
+        body = _full_box(tables[b"stss"])[2]
+        sync_samples = [number - 1 for number in struct.unpack_from(f">{struct.unpack_from('>I', body)[0]}I", body, 4)]
+    else:
+        sync_samples = range(len(offsets))
+
+    return [(offsets[i], times[i]) for i in sync_samples if i < len(offsets) and i < len(times)]
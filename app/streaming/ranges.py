@@ -0,0 +1,149 @@
+from typing import List, Optional, Tuple
+
+# more ranges than this in one header is treated as an invalid header and the full file is sent
+MAX_RANGES = 16
+
+
+class RangeNotSatisfiable(Exception):
+    """
+        Raised when a valid range header has no range that overlaps the file
+
+        Attributes:
+            file_size (int): the size of the file the ranges were checked against
+    """
+
+    def __init__(self, file_size: int):
+        super().__init__(f"no satisfiable range for a file of {file_size} bytes")
+        self.file_size = file_size
+
+
+def _parse_range_spec(spec: str, file_size: int, open_ended_size: Optional[int]) -> Optional[Tuple[int, int]]:
+    """
+        Parse one byte range spec like "0-99", "100-" or "-500"
+
+        Parameters:
+            spec (str): the range spec without the unit
+            file_size (int): the size of the file
+            open_ended_size (Optional[int]): the most bytes to serve for a "start-" spec, None for the rest of the file
+
+        Returns:
+            Optional[Tuple[int, int]]: the start and exclusive end of the range, None if it is not satisfiable
+
+        Raises:
+            ValueError: if the spec is not a valid byte range spec
+    """
+    first, separator, last = spec.strip().partition("-")
+    first, last = first.strip(), last.strip()
+    if not separator or (not first and not last):
+        raise ValueError(f"invalid range spec {spec!r}")
+    if (first and not first.isdigit()) or (last and not last.isdigit()):
+        raise ValueError(f"invalid range spec {spec!r}")
+
+    # suffix range, the last n bytes of the file
+    if not first:
+        suffix_length = int(last)
+        if suffix_length == 0 or file_size == 0:
+            return None
+        return max(file_size - suffix_length, 0), file_size
+
+    start = int(first)
+    if last:
+        end = int(last) + 1
+        if end <= start:
+            raise ValueError(f"invalid range spec {spec!r}")
+    else:
+        end = file_size if open_ended_size is None else start + open_ended_size
+
+    if start >= file_size:
+        return None
+    return start, min(end, file_size)
+
+
+def parse_range_header(header: Optional[str], file_size: int,
+                       open_ended_size: Optional[int] = None) -> Optional[List[Tuple[int, int]]]:
+    """
+        Parse a range header following RFC 7233
+
+        Overlapping and adjacent ranges are coalesced and returned in file order.
+
+        Parameters:
+            header (Optional[str]): the value of the range header
+            file_size (int): the size of the file the ranges refer to
+            open_ended_size (Optional[int]): the most bytes to serve for a "start-" range, None for the rest of the file
+
+        Returns:
+            Optional[List[Tuple[int, int]]]: start and exclusive end of every range, None when the whole file should be sent
+
+        Raises:
+            RangeNotSatisfiable: if none of the ranges overlap the file
+    """
+    if not header:
+        return None
+
+    unit, separator, specs = header.partition("=")
+    if not separator or unit.strip().lower() != "bytes":
+        # unknown units and garbage are ignored, the client gets the full file
+        return None
+
+    specs = [spec for spec in specs.split(",") if spec.strip()]
+    if not specs or len(specs) > MAX_RANGES:
+        return None
+
+    ranges = []
+    try:
+        for spec in specs:
+            byte_range = _parse_range_spec(spec, file_size, open_ended_size)
+            if byte_range is not None:
+                ranges.append(byte_range)
+    except ValueError:
+        return None
+
+    if not ranges:
+        raise RangeNotSatisfiable(file_size)
+
+    ranges.sort()
+    coalesced = [ranges[0]]
+    for start, end in ranges[1:]:
+        last_start, last_end = coalesced[-1]
+        if start <= last_end:
+            coalesced[-1] = (last_start, max(last_end, end))
+        else:
+            coalesced.append((start, end))
+
+    return coalesced
+
+
+def open_ended_start(header: Optional[str]) -> Optional[int]:
+    """
+        Get the start of a header that asks for a single open ended range like "bytes=100-"
+
+        Parameters:
+            header (Optional[str]): the value of the range header
+
+        Returns:
+            Optional[int]: the first byte requested, None for any other header
+    """
+    if not header:
+        return None
+    unit, separator, spec = header.partition("=")
+    if not separator or unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, separator, last = spec.strip().partition("-")
+    if not separator or last.strip() or not first.strip().isdigit():
+        return None
+    return int(first)
+
+
+def content_range(start: int, end: int, file_size: int) -> str:
+    """
+        Build the content range header value of a range
+
+        Parameters:
+            start (int): the first byte of the range
+            end (int): the byte after the last byte of the range
+            file_size (int): the size of the file
+
+        Returns:
+            str: the header value with an inclusive last byte
+    """
+    return f"bytes {start}-{end - 1}/{file_size}"
@@ -0,0 +1,164 @@
+import os
+from secrets import token_hex
+from typing import List, Optional, Tuple, Union
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+from .chunking import client_key
+from .coalescing import block_reads
+from .film_io import film_io
+from .ranges import content_range
+from .shaping import egress
+from ..core.config import Settings
+
+settings = Settings()
+
+
+class FilmRangeResponse(Response):
+    """
+        Response that streams byte ranges of a film file without buffering them in memory
+
+        A 200 response sends the whole file, a 206 response with one range sends that range
+        with a content range header and a 206 response with several ranges sends a
+        multipart/byteranges body.
+
+        When the ASGI server supports the zero copy send extension the file descriptor is
+        handed to the server so the bytes go from the page cache to the socket with os.sendfile.
+        When the film is memory mapped the ranges are sent as memoryview slices of the map.
+        Otherwise the ranges are read in bounded aligned blocks on the film io threads and sent as they
+        are read, so the memory used per request stays at one block whatever the size of the ranges
+        and concurrent requests for the same block share one read.
+        Every chunk goes through the egress scheduler when a rate limit is set.
+
+        Attributes:
+            path (str): the path of the film file
+            ranges (List[Tuple[int, int]]): the start and exclusive end of every range to send
+            file_size (int): the size of the film file
+            mapped (Optional[memoryview]): a view of the memory mapped film, None to read the file
+            chunk_size (int): the size of the memoryview slices of a mapped film
+    """
+    chunk_size = settings.chunk_size
+
+    def __init__(self, path: Union[str, os.PathLike], ranges: List[Tuple[int, int]], file_size: int,
+                 status_code: int = 206, headers: Optional[dict] = None, media_type: str = "video/mp4",
+                 mapped: Optional[memoryview] = None) -> None:
+        self.path = path
+        self.ranges = ranges
+        self.file_size = file_size
+        self.mapped = mapped
+        self.status_code = status_code
+        self.background = None
+
+        if len(ranges) > 1:
+            boundary = token_hex(13)
+            self.media_type = f"multipart/byteranges; boundary={boundary}"
+            self._parts = [
+                (f"--{boundary}\r\nContent-Type: {media_type}\r\n"
+                 f"Content-Range: {content_range(start, end, file_size)}\r\n\r\n").encode("latin-1")
+                for start, end in ranges
+            ]
+            self._separator = b"\r\n"
+            self._epilogue = f"--{boundary}--\r\n".encode("latin-1")
+        else:
+            self.media_type = media_type
+            self._parts = [b""]
+            self._separator = b""
+            self._epilogue = b""
+
+        self.init_headers(headers)
+        if status_code == 206 and len(ranges) == 1:
+            self.headers["content-range"] = content_range(ranges[0][0], ranges[0][1], file_size)
+        self.headers["content-length"] = str(
+            sum(end - start for start, end in ranges)
+            + sum(len(part) + len(self._separator) for part in self._parts)
+            + len(self._epilogue)
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+
+        if scope["method"].upper() == "HEAD" or self.headers["content-length"] == "0":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        zerocopy = "http.response.zerocopysend" in scope.get("extensions", {})
+        video = None
+        if zerocopy or self.mapped is None:
+            video = await film_io.run(open, self.path, "rb")
+        try:
+            with egress.stream(send, client_key(scope)) as send:
+                for part, (start, end) in zip(self._parts, self.ranges):
+                    if part:
+                        await send({"type": "http.response.body", "body": part, "more_body": True})
+                    if zerocopy:
+                        await self._send_zerocopy(video, start, end, send)
+                    elif self.mapped is not None:
+                        await self._send_mapped(start, end, send)
+                    else:
+                        await self._send_chunked(video, start, end, send)
+                    if self._separator:
+                        await send({"type": "http.response.body", "body": self._separator, "more_body": True})
+                await send({"type": "http.response.body", "body": self._epilogue, "more_body": False})
+        finally:
+            if video is not None:
+                await film_io.run(video.close)
+            self.mapped = None
+
+    async def _send_zerocopy(self, video, start: int, end: int, send: Send) -> None:
+        """
+            Let the server copy a range straight from the file to the socket with sendfile
+
+            Parameters:
+                video (BufferedReader): the open film file
+                start (int): the first byte of the range
+                end (int): the byte after the last byte of the range
+                send (Send): the asgi send channel
+        """
+        # a shaped stream sends the range chunk by chunk so it takes turns with the other streams
+        step = self.chunk_size if egress.enabled else end - start
+        for position in range(start, end, step):
+            await send({
+                "type": "http.response.zerocopysend",
+                "file": video,
+                "offset": position,
+                "count": min(step, end - position),
+                "more_body": True
+            })
+
+    async def _send_mapped(self, start: int, end: int, send: Send) -> None:
+        """
+            Send a range as memoryview slices of the memory mapped film without copying it
+
+            Parameters:
+                start (int): the first byte of the range
+                end (int): the byte after the last byte of the range
+                send (Send): the asgi send channel
+        """
+        for position in range(start, end, self.chunk_size):
+            await send({
+                "type": "http.response.body",
+                "body": self.mapped[position:min(position + self.chunk_size, end)],
+                "more_body": True
+            })
+
+    async def _send_chunked(self, video, start: int, end: int, send: Send) -> None:
+        """
+            Read a range in aligned blocks off the event loop and send each block as it is read
+
+            Parameters:
+                video (BufferedReader): the open film file
+                start (int): the first byte of the range
+                end (int): the byte after the last byte of the range
+                send (Send): the asgi send channel
+        """
+        fd = video.fileno()
+        path = str(self.path)
+        block_size = block_reads.block_size
+        for block in range(start // block_size, (end - 1) // block_size + 1):
+            block_start = block * block_size
+            data = await block_reads.read(path, fd, block)
+            # only the part of the block inside the range is sent, the block itself is shared
+            chunk = memoryview(data)[max(start - block_start, 0):end - block_start]
+            if not chunk:
+                # the file got shorter than its stat said, stop instead of hanging
+                break
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
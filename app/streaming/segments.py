@@ -0,0 +1,302 @@
+import argparse
+import logging
+import os
+import struct
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from pydantic import BaseModel
+from .metadata import FilmMetadata
+from .mp4 import fragment_duration, keyframes, read_movie, top_level_boxes
+from ..core.config import Settings
+
+settings = Settings()
+
+# magic, version, fragmented, timescale, film size, film mtime, init offset, init size, segment count
+INDEX_HEADER = struct.Struct(">4sBB2xIQqQII")
+# offset, size, duration in the timescale
+INDEX_RECORD = struct.Struct(">QII")
+INDEX_MAGIC = b"MFXS"
+INDEX_VERSION = 1
+
+
+class SegmentIndex(BaseModel):
+    """
+        The precomputed segments of a film
+
+        A fragmented film has one segment per group of movie fragments and can be played with
+        the hls playlist. A progressive film has one segment per group of keyframes which is
+        only useful as a seek index.
+
+        Attributes:
+            fragmented (bool): whether the film is a fragmented mp4
+            timescale (int): the units per second of the segment durations
+            film_size (int): the size of the film file the index was built from
+            film_mtime_ns (int): the modification time of the film file the index was built from
+            init (Tuple[int, int]): the offset and size of the initialization section
+            segments (List[Tuple[int, int, int]]): the offset, size and duration of every segment
+    """
+    fragmented: bool
+    timescale: int
+    film_size: int
+    film_mtime_ns: int
+    init: Tuple[int, int]
+    segments: List[Tuple[int, int, int]]
+
+    def matches(self, metadata: FilmMetadata) -> bool:
+        """
+            Check whether the index was built from this version of the film
+        """
+        return self.film_size == metadata.size and self.film_mtime_ns == metadata.mtime_ns
+
+    def to_bytes(self) -> bytes:
+        """
+            Pack the index into its compact binary file format
+        """
+        header = INDEX_HEADER.pack(
+            INDEX_MAGIC, INDEX_VERSION, self.fragmented, self.timescale, self.film_size,
+            self.film_mtime_ns, self.init[0], self.init[1], len(self.segments)
+        )
+        return header + b"".join(INDEX_RECORD.pack(*segment) for segment in self.segments)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "SegmentIndex":
+        """
+            Unpack an index from its compact binary file format
+
+            Raises:
+                ValueError: if the data is not a segment index
+        """
+        if len(data) < INDEX_HEADER.size:
+            raise ValueError("segment index is truncated")
+        magic, version, fragmented, timescale, film_size, film_mtime_ns, init_offset, init_size, count = \
+            INDEX_HEADER.unpack_from(data)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            raise ValueError("not a segment index")
+        if len(data) != INDEX_HEADER.size + count * INDEX_RECORD.size:
+            raise ValueError("segment index is truncated")
+        return cls(
+            fragmented=bool(fragmented),
+            timescale=timescale,
+            film_size=film_size,
+            film_mtime_ns=film_mtime_ns,
+            init=(init_offset, init_size),
+            segments=list(INDEX_RECORD.iter_unpack(data[INDEX_HEADER.size:]))
+        )
+
+
+def _group(parts: List[Tuple[int, int, int]], timescale: int, target_duration: float) -> List[Tuple[int, int, int]]:
+    """
+        Merge consecutive parts until every segment is at least the target duration
+
+        Parameters:
+            parts (List[Tuple[int, int, int]]): the offset, end and duration of contiguous parts
+            timescale (int): the units per second of the durations
+            target_duration (float): the wanted segment duration in seconds
+
+        Returns:
+            List[Tuple[int, int, int]]: the offset, size and duration of every segment
+    """
+    target = target_duration * timescale
+    segments = []
+    start = duration = None
+    for offset, end, part_duration in parts:
+        if start is None:
+            start, duration = offset, 0
+        duration += part_duration
+        if duration >= target:
+            segments.append((start, end - start, duration))
+            start = None
+    if start is not None:
+        segments.append((start, parts[-1][1] - start, duration))
+    return segments
+
+
+def build_segment_index(path: Path, target_duration: float = settings.segment_target_duration) -> SegmentIndex:
+    """
+        Parse an mp4 file and compute its segments
+
+        Parameters:
+            path (Path): the path of the mp4 file
+            target_duration (float): the wanted segment duration in seconds
+
+        Returns:
+            SegmentIndex: the index of the film
+
+        Raises:
+            ValueError: if the file is not an mp4 with a video track
+    """
+    stat_result = os.stat(path)
+    with open(path, "rb") as video:
+        boxes = top_level_boxes(video, stat_result.st_size)
+        moov = next((box for box in boxes if box.type == b"moov"), None)
+        if moov is None:
+            raise ValueError(f"{path.name} has no moov box")
+
+        _, _, tracks, default_durations = read_movie(video, moov)
+        track = next((track for track in tracks if track.handler == b"vide"), None)
+        if track is None:
+            raise ValueError(f"{path.name} has no video track")
+
+        moofs = [i for i, box in enumerate(boxes) if box.type == b"moof"]
+        if moofs:
+            # a fragment starts at the styp or sidx boxes right before its moof and runs up to the next fragment
+            starts = []
+            for i in moofs:
+                while i > 0 and boxes[i - 1].type in (b"styp", b"sidx"):
+                    i -= 1
+                starts.append(boxes[i].offset)
+            ends = starts[1:] + [boxes[-1].end]
+            default_duration = default_durations.get(track.track_id, 0)
+            parts = [
+                (start, end, fragment_duration(video, boxes[i], track.track_id, default_duration))
+                for start, end, i in zip(starts, ends, moofs)
+            ]
+            init = (0, starts[0])
+        else:
+            if track.stbl is None:
+                raise ValueError(f"{path.name} has no sample table")
+            found = keyframes(video, track)
+            if not found:
+                raise ValueError(f"{path.name} has no keyframes")
+            mdat_end = max((box.end for box in boxes if box.type == b"mdat"), default=stat_result.st_size)
+            parts = []
+            for number, (offset, time) in enumerate(found):
+                if number + 1 < len(found):
+                    end, next_time = found[number + 1]
+                else:
+                    end, next_time = mdat_end, track.duration
+                parts.append((offset, end, max(next_time - time, 0)))
+            init = (moov.offset, moov.size)
+
+    return SegmentIndex(
+        fragmented=bool(moofs),
+        timescale=track.timescale,
+        film_size=stat_result.st_size,
+        film_mtime_ns=stat_result.st_mtime_ns,
+        init=init,
+        segments=_group(parts, track.timescale, target_duration)
+    )
+
+
+def render_playlist(index: SegmentIndex) -> str:
+    """
+        Render the hls media playlist of a fragmented film
+
+        The segment uris are relative to /film/{film_name}/playlist.m3u8.
+
+        Parameters:
+            index (SegmentIndex): the index of the film
+
+        Returns:
+            str: the playlist
+    """
+    durations = [duration / index.timescale for _, _, duration in index.segments]
+    lines = [
+        "#EXTM3U",
+        "#EXT-X-VERSION:7",
+        f"#EXT-X-TARGETDURATION:{max([1] + [int(duration + 0.999) for duration in durations])}",
+        "#EXT-X-PLAYLIST-TYPE:VOD",
+        "#EXT-X-INDEPENDENT-SEGMENTS",
+        '#EXT-X-MAP:URI="segment/init"',
+    ]
+    for number, duration in enumerate(durations):
+        lines.append(f"#EXTINF:{duration:.3f},")
+        lines.append(f"segment/{number}")
+    lines.append("#EXT-X-ENDLIST")
+    return "\n".join(lines) + "\n"
+
+
+class SegmentIndexStore:
+    """
+        Loads the segment index files written by the indexer and keeps them in memory
+
+        Attributes:
+            segments_dir (Path): the directory of the index files
+    """
+
+    def __init__(self, segments_dir: Path = settings.segments_dir):
+        self.segments_dir = Path(segments_dir)
+        self._indexes: Dict[str, SegmentIndex] = {}
+        self._lock = threading.Lock()
+
+    def index_path(self, film_name: str) -> Path:
+        """
+            Get the path of the index file of a film
+        """
+        return self.segments_dir / f"{film_name}.idx"
+
+    def cached(self, film_name: str, metadata: FilmMetadata) -> Optional[SegmentIndex]:
+        """
+            Get the index of a film if it is loaded and was built from this version of the film
+        """
+        index = self._indexes.get(film_name)
+        return index if index is not None and index.matches(metadata) else None
+
+    def get(self, film_name: str, metadata: FilmMetadata) -> Optional[SegmentIndex]:
+        """
+            Get the index of a film, loading it from its file when needed
+
+            Parameters:
+                film_name (str): the file name of the film
+                metadata (FilmMetadata): the metadata of the film
+
+            Returns:
+                Optional[SegmentIndex]: the index, None if the film has no index for this version
+        """
+        index = self.cached(film_name, metadata)
+        if index is not None:
+            return index
+
+        try:
+            index = SegmentIndex.from_bytes(self.index_path(film_name).read_bytes())
+        except (OSError, ValueError):
+            return None
+        if not index.matches(metadata):
+            return None
+
+        with self._lock:
+            self._indexes[film_name] = index
+        return index
+
+    def write(self, film_name: str, index: SegmentIndex) -> None:
+        """
+            Write the index file of a film
+        """
+        self.segments_dir.mkdir(parents=True, exist_ok=True)
+        temporary = self.index_path(film_name).with_suffix(".tmp")
+        temporary.write_bytes(index.to_bytes())
+        # replace atomically so a worker never reads half an index
+        temporary.replace(self.index_path(film_name))
+        with self._lock:
+            self._indexes.pop(film_name, None)
+
+
+segment_indexes = SegmentIndexStore()
+
+
+def main():
+    """
+        Index every mp4 film in the films directory, run with python -m app.streaming.segments
+    """
+    parser = argparse.ArgumentParser(description="Build the segment index of every film")
+    parser.add_argument("--films-dir", type=Path, default=settings.films_dir)
+    parser.add_argument("--segments-dir", type=Path, default=settings.segments_dir)
+    parser.add_argument("--target-duration", type=float, default=settings.segment_target_duration)
+    args = parser.parse_args()
+
+    store = SegmentIndexStore(args.segments_dir)
+    for path in sorted(args.films_dir.glob("*.mp4")):
+        try:
+            index = build_segment_index(path, args.target_duration)
+        except (OSError, ValueError, struct.error, StopIteration, AttributeError) as e:
+            logging.info(f"[INFO]: could not index {path.name}: {str(e)}")
+            print(f"skipped {path.name}: {str(e)}")
+            continue
+        store.write(path.name, index)
+        kind = "fragmented" if index.fragmented else "progressive"
+        print(f"indexed {path.name}: {len(index.segments)} {kind} segments")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Iterator, Optional
+from starlette.types import Message, Send
+from .loops import LoopLocal
+from ..core.config import Settings
+
+settings = Settings()
+
+
+class TokenBucket:
+    """
+        Token bucket that lets bytes through at a rate with a burst
+
+        A take may go over the tokens left, the bucket then goes into debt and the caller
+        waits until the debt is paid back, so chunks bigger than the burst still get through.
+
+        Attributes:
+            rate (float): the bytes per second added to the bucket
+            burst (float): the most bytes the bucket holds
+            tokens (float): the bytes that can be sent right now
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self, count: int) -> float:
+        """
+            Take bytes out of the bucket
+
+            Parameters:
+                count (int): the bytes to send
+
+            Returns:
+                float: the seconds to wait before sending them
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= count
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+
+class EgressScheduler:
+    """
+        Shapes the film bytes a worker sends with a token bucket per client and one for the worker
+
+        Every body message of a film response takes its bytes from the bucket of its client and
+        then from the global bucket. The bucket of a client is kept across its range requests in
+        a bounded LRU, so a player that asks for many small ranges is held to the stream rate
+        and does not get a new burst with every response. The streams waiting for the global bucket queue in arrival
+        order and a stream queues again after every chunk, so the active streams take turns
+        chunk by chunk and one client pulling large ranges cannot starve the others. A rate of 0
+        means no limit.
+
+        Attributes:
+            rate (int): the most bytes per second the worker sends, 0 for no limit
+            stream_rate (int): the most bytes per second one client gets, 0 for no limit
+            burst (int): the bytes a bucket lets through at once after being idle
+            max_clients (int): the number of clients whose bucket is kept
+            active (int): the streams being sent
+            waiting (int): the streams queued for the global bucket
+            throttled (int): the chunks that had to wait
+            throttled_seconds (float): the total time chunks waited
+            bytes_sent (int): the bytes let through
+    """
+
+    def __init__(self, rate: int = settings.egress_rate_limit, stream_rate: int = settings.stream_rate_limit,
+                 burst: int = settings.egress_burst, max_clients: int = settings.stream_rate_clients):
+        self.rate = rate
+        self.stream_rate = stream_rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self.active = 0
+        self.waiting = 0
+        self.most_waiting = 0
+        self.throttled = 0
+        self.throttled_seconds = 0.0
+        self.bytes_sent = 0
+        self._bucket = TokenBucket(rate, burst) if rate > 0 else None
+        self._clients: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._locks: LoopLocal[asyncio.Lock] = LoopLocal(asyncio.Lock)
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0 or self.stream_rate > 0
+
+    def lock(self) -> asyncio.Lock:
+        """
+            Get the lock the streams of the running event loop queue on for the global bucket
+
+            Returns:
+                asyncio.Lock: the lock, it wakes its waiters in arrival order
+        """
+        return self._locks.get()
+
+    def client_bucket(self, client: Optional[str]) -> Optional[TokenBucket]:
+        """
+            Get the stream rate bucket of a client
+
+            Parameters:
+                client (Optional[str]): the key of the client, None for a bucket of this response only
+
+            Returns:
+                Optional[TokenBucket]: the bucket, None when there is no stream rate
+        """
+        if self.stream_rate <= 0:
+            return None
+        if client is None:
+            return TokenBucket(self.stream_rate, self.burst)
+
+        bucket = self._clients.pop(client, None) or TokenBucket(self.stream_rate, self.burst)
+        self._clients[client] = bucket
+        if len(self._clients) > self.max_clients:
+            self._clients.popitem(last=False)
+        return bucket
+
+    @contextmanager
+    def stream(self, send: Send, client: Optional[str] = None) -> Iterator[Send]:
+        """
+            Shape the body messages of one response
+
+            Parameters:
+                send (Send): the asgi send channel of the response
+                client (Optional[str]): the key of the client, its responses share one stream rate bucket
+
+            Returns:
+                Iterator[Send]: the send channel to use while the response is sent
+        """
+        if not self.enabled:
+            yield send
+            return
+
+        bucket = self.client_bucket(client)
+
+        async def shaped_send(message: Message) -> None:
+            count = len(message.get("body", b"")) or message.get("count", 0)
+            if count:
+                await self._acquire(bucket, count)
+            await send(message)
+
+        self.active += 1
+        try:
+            yield shaped_send
+        finally:
+            self.active -= 1
+
+    async def _acquire(self, bucket: Optional[TokenBucket], count: int) -> None:
+        """
+            Wait until the stream and the worker may send a number of bytes
+        """
+        if bucket is not None:
+            await self._wait(bucket.take(count))
+
+        if self._bucket is not None:
+            self.waiting += 1
+            self.most_waiting = max(self.most_waiting, self.waiting)
+            try:
+                # sleeping with the lock held keeps the queue in order, the next stream goes once this chunk is paid for
+                async with self.lock():
+                    await self._wait(self._bucket.take(count))
+            finally:
+                self.waiting -= 1
+
+        self.bytes_sent += count
+
+    async def _wait(self, delay: float) -> None:
+        """
+            Sleep for a throttled chunk and count it
+        """
+        if delay > 0:
+            self.throttled += 1
+            self.throttled_seconds += delay
+            await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        """
+            Get the counters of the shaping
+
+            Returns:
+                dict: the limits, the active and queued streams and the throttling counters
+        """
+        return {
+            "rate": self.rate,
+            "stream_rate": self.stream_rate,
+            "clients": len(self._clients),
+            "active": self.active,
+            "waiting": self.waiting,
+            "most_waiting": self.most_waiting,
+            "throttled": self.throttled,
+            "throttled_seconds": round(self.throttled_seconds, 3),
+            "bytes_sent": self.bytes_sent
+        }
+
+
+egress = EgressScheduler()
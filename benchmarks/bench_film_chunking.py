@@ -0,0 +1,72 @@
+"""
+    Benchmark of the number of requests a player needs to play a whole film
+
+    The player asks for "bytes=N-" and continues where the previous response ended, like
+    browsers do while playing. The fixed mode serves a constant 64 KiB per request, the way
+    stream_film did before the adaptive chunk policy. Run from the repository root:
+
+        python -m benchmarks.bench_film_chunking --size-mb 200
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from app.main import app
+from app.streaming.chunking import AdaptiveChunkPolicy
+from app.streaming.film_index import FilmIndex
+from app.streaming.metadata import FilmMetadataCache
+
+POLICIES = {
+    "fixed": lambda: AdaptiveChunkPolicy(initial_size=64 * 1024, max_size=64 * 1024),
+    "adaptive": lambda: AdaptiveChunkPolicy(),
+}
+
+
+def play(client, film_name):
+    """
+        Play a film from start to end with open ended range requests
+
+        Returns:
+            tuple: the number of requests and the number of bytes received
+    """
+    requests = 0
+    position = 0
+    while True:
+        response = client.get(f"/film/{film_name}", headers={"Range": f"bytes={position}-"})
+        requests += 1
+        if response.status_code != 206:
+            break
+        position += len(response.content)
+        total = int(response.headers["content-range"].rsplit("/", 1)[1])
+        if position >= total:
+            break
+    return requests, position
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=int, default=200, help="size of the generated film")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as films_dir:
+        film = Path(films_dir) / "sample.mp4"
+        film.write_bytes(os.urandom(args.size_mb * 2**20))
+        # no lifespan, the benchmark does not need the database
+        client = TestClient(app)
+        index = FilmIndex(films_dir)
+        index.refresh()
+
+        for name, make_policy in POLICIES.items():
+            with patch("app.main.film_metadata", FilmMetadataCache(films_dir)), \
+                    patch("app.main.film_index", index), patch("app.main.chunk_policy", make_policy()):
+                began = time.perf_counter()
+                requests, received = play(client, film.name)
+                elapsed = time.perf_counter() - began
+            print(f"{name:>9}: {requests:6d} requests for {received / 2**20:.0f} MB in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
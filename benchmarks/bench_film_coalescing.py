@@ -0,0 +1,82 @@
+"""
+    Benchmark of the disk reads made by many viewers starting the same film at the same time
+
+    N clients request the same opening range of a film at once, like at a premiere. The
+    uncoalesced mode reads every block once per client, the way the chunked fallback did before
+    block reads were shared. --latency-ms adds a delay to every read to stand in for a disk that
+    is slower than the page cache. Run from the repository root:
+
+        python -m benchmarks.bench_film_coalescing --clients 200 --range-mb 8
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import patch
+from app.streaming.coalescing import BlockReadCoalescer
+from app.streaming.responses import FilmRangeResponse
+
+
+class UncoalescedReads(BlockReadCoalescer):
+    """
+        Block reads that are never shared
+    """
+
+    def in_flight(self):
+        return {}
+
+
+async def viewers(path, clients, range_size):
+    """
+        Send the same range to every client at once
+
+        Returns:
+            int: the bytes sent to all the clients
+    """
+    sent = 0
+    scope = {"type": "http", "method": "GET", "extensions": {}}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal sent
+        sent += len(message.get("body", b""))
+
+    responses = [FilmRangeResponse(path, [(0, range_size)], os.path.getsize(path)) for _ in range(clients)]
+    await asyncio.gather(*(response(scope, receive, send) for response in responses))
+    return sent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=200, help="concurrent identical clients")
+    parser.add_argument("--range-mb", type=int, default=8, help="size of the range every client requests")
+    parser.add_argument("--latency-ms", type=float, default=2, help="delay added to every disk read")
+    args = parser.parse_args()
+
+    pread = os.pread
+
+    def slow_pread(fd, size, offset):
+        time.sleep(args.latency_ms / 1000)
+        return pread(fd, size, offset)
+
+    with tempfile.TemporaryDirectory() as films_dir:
+        film = Path(films_dir) / "premiere.mp4"
+        film.write_bytes(os.urandom(args.range_mb * 2**20))
+
+        for name, coalescer in (("uncoalesced", UncoalescedReads()), ("coalesced", BlockReadCoalescer())):
+            with patch("app.streaming.responses.block_reads", coalescer), patch.object(os, "pread", slow_pread):
+                began = time.perf_counter()
+                sent = asyncio.run(viewers(film, args.clients, args.range_mb * 2**20))
+                elapsed = time.perf_counter() - began
+            unique = args.range_mb * 2**20 // coalescer.block_size
+            print(f"{name:>12}: {coalescer.reads:7d} disk reads for {unique} unique blocks, "
+                  f"{coalescer.reads / elapsed:8.0f} reads/s, {sent / elapsed / 2**20:8.1f} MB/s to "
+                  f"{args.clients} clients in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
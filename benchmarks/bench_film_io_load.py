@@ -0,0 +1,144 @@
+"""
+    Load test of the login latency while many film range streams are active
+
+    Starts the app with uvicorn on a sqlite database and a generated film, registers a user,
+    then measures /login and / latency once with no streams and once while --streams clients
+    keep requesting random ranges of the film. The streams run in their own process so the
+    latency probe is not slowed down by the client side of the load. Run from the repository root:
+
+        python -m benchmarks.bench_film_io_load --streams 200 --seconds 20
+"""
+import argparse
+import asyncio
+import multiprocessing
+import random
+import tempfile
+import time
+from pathlib import Path
+import httpx
+from .common import CATALOG_FILM, percentile, run_server, wait_until_up, write_film
+
+
+async def stream(client, film_name, film_size, range_size, stop):
+    """
+        Keep requesting random ranges of the film until stop is set
+
+        Returns:
+            int: the number of bytes received
+
+        Raises:
+            RuntimeError: if a range was not served, the load would be small error responses
+    """
+    received = 0
+    # ramp up so the connections do not all hit the listen backlog at once
+    await asyncio.sleep(random.random())
+    while not stop.is_set():
+        start = random.randrange(0, film_size - range_size)
+        try:
+            response = await client.get(f"/film/{film_name}", headers={"Range": f"bytes={start}-{start + range_size - 1}"})
+        except httpx.TransportError:
+            # a keep alive connection closed by the server, the next request opens a new one
+            continue
+        if response.status_code != 206:
+            raise RuntimeError(f"range of {film_name} got {response.status_code}: {response.text[:200]}")
+        received += len(response.content)
+    return received
+
+
+def stream_load(base_url, film_name, film_size, range_size, streams, stop, received):
+    """
+        Run the concurrent streams in a separate process until stop is set
+    """
+    async def run_streams():
+        limits = httpx.Limits(max_connections=streams, max_keepalive_connections=streams)
+        async with httpx.AsyncClient(base_url=base_url, timeout=300, limits=limits) as client:
+            tasks = [asyncio.create_task(stream(client, film_name, film_size, range_size, stop)) for _ in range(streams)]
+            received.value = sum(await asyncio.gather(*tasks))
+
+    asyncio.run(run_streams())
+
+
+async def measure(client, path, samples, **kwargs):
+    """
+        Measure the latency of sequential requests to a route
+
+        Returns:
+            List[float]: the latencies in milliseconds
+    """
+    latencies = []
+    for _ in range(samples):
+        began = time.perf_counter()
+        response = await client.request("POST" if kwargs else "GET", path, **kwargs)
+        latencies.append((time.perf_counter() - began) * 1000)
+        response.raise_for_status()
+    return latencies
+
+
+def report(label, latencies):
+    print(f"{label:>28}: p50 {percentile(latencies, 0.50):8.1f} ms  "
+          f"p99 {percentile(latencies, 0.99):8.1f} ms  max {max(latencies):8.1f} ms")
+
+
+async def probe(base_url, credentials, samples, label):
+    """
+        Measure and report the latency of /login and /
+    """
+    async with httpx.AsyncClient(base_url=base_url, timeout=300) as client:
+        report(f"/login {label}", await measure(client, "/login", samples, data=credentials))
+        report(f"/ {label}", await measure(client, "/", samples * 5))
+
+
+async def setup(base_url, credentials):
+    """
+        Wait for the server and register the benchmark user
+    """
+    async with httpx.AsyncClient(base_url=base_url, timeout=300) as client:
+        await wait_until_up(client)
+        await client.post("/registration", data=credentials)
+
+
+def run(base_url, film_name, film_size, args):
+    credentials = {"username": "bench@example.com", "password": "benchpassword"}
+    asyncio.run(setup(base_url, credentials))
+    asyncio.run(probe(base_url, credentials, args.samples, "idle"))
+
+    stop = multiprocessing.Event()
+    received = multiprocessing.Value("q", 0)
+    load = multiprocessing.Process(
+        target=stream_load,
+        args=(base_url, film_name, film_size, args.range_kb * 1024, args.streams, stop, received)
+    )
+    load.start()
+    time.sleep(2)
+    began = time.perf_counter()
+    asyncio.run(probe(base_url, credentials, args.samples, f"with {args.streams} streams"))
+    time.sleep(max(0, args.seconds - (time.perf_counter() - began)))
+    stop.set()
+    load.join()
+    elapsed = time.perf_counter() - began
+    if load.exitcode != 0 or not received.value:
+        raise RuntimeError("the range streams failed, the latency under load is not valid")
+    print(f"{'streamed':>28}: {received.value / elapsed / 2**20:8.1f} MB/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--streams", type=int, default=200, help="concurrent range streams")
+    parser.add_argument("--seconds", type=float, default=20, help="how long the streams run")
+    parser.add_argument("--size-mb", type=int, default=512, help="size of the generated film")
+    parser.add_argument("--range-kb", type=int, default=1024, help="size of every requested range")
+    parser.add_argument("--samples", type=int, default=20, help="login requests per measurement")
+    parser.add_argument("--film-io-concurrency", type=int, default=16, help="FILM_IO_CONCURRENCY of the server")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as media:
+        films = Path(media) / "films"
+        films.mkdir()
+        film = write_film(films / CATALOG_FILM, args.size_mb)
+
+        with run_server(media, FILM_IO_CONCURRENCY=str(args.film_io_concurrency)) as server:
+            run(server.base_url, film.name, film.stat().st_size, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+    Benchmark of the film range response against the old read-into-memory implementation
+
+    Every mode runs in its own process so the peak resident set size of one mode is not
+    hidden by the other. Run from the repository root:
+
+        python -m benchmarks.bench_film_streaming --size-mb 512 --range-mb 256
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from starlette.responses import Response
+from app.streaming.responses import FilmRangeResponse
+
+
+def legacy_response(path, start, end):
+    """
+        The previous stream_film body, the whole range is read into a bytes object
+    """
+    with open(path, "rb") as video:
+        video.seek(start)
+        data = video.read(end - start)
+        return Response(data, status_code=206, media_type="video/mp4")
+
+
+def streaming_response(path, start, end):
+    """
+        The current stream_film body, the range is streamed from the file
+    """
+    return FilmRangeResponse(path, [(start, end)], os.path.getsize(path))
+
+
+MODES = {"legacy": legacy_response, "streaming": streaming_response}
+
+
+async def drive(make_response, path, start, end, repeat):
+    """
+        Send the range repeatedly through a send channel that drops the bytes
+
+        Returns:
+            int: the number of body bytes sent
+    """
+    scope = {"type": "http", "method": "GET", "extensions": {}}
+    sent = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal sent
+        if message["type"] == "http.response.body":
+            sent += len(message["body"])
+
+    for _ in range(repeat):
+        await make_response(path, start, end)(scope, receive, send)
+    return sent
+
+
+def run_mode(mode, path, range_bytes, repeat):
+    """
+        Run one mode in the current process and print its measurements as json
+    """
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    began = time.perf_counter()
+    sent = asyncio.run(drive(MODES[mode], path, 0, range_bytes, repeat))
+    elapsed = time.perf_counter() - began
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({
+        "mode": mode,
+        "bytes": sent,
+        "seconds": elapsed,
+        "throughput_mb_s": sent / elapsed / 2**20,
+        "peak_rss_mb": peak_kb / 1024,
+        "peak_rss_growth_mb": (peak_kb - baseline_kb) / 1024,
+    }))
+
+
+def make_film(size_mb):
+    """
+        Write a film sized file of random bytes to a temporary directory
+
+        Returns:
+            str: the path of the file
+    """
+    handle, path = tempfile.mkstemp(suffix=".mp4")
+    block = os.urandom(2**20)
+    with os.fdopen(handle, "wb") as film:
+        for _ in range(size_mb):
+            film.write(block)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=int, default=512, help="size of the generated film")
+    parser.add_argument("--range-mb", type=int, default=256, help="size of the requested range")
+    parser.add_argument("--repeat", type=int, default=3, help="requests per mode")
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.path, args.range_mb * 2**20, args.repeat)
+        return
+
+    path = make_film(args.size_mb)
+    try:
+        for mode in MODES:
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_film_streaming", "--mode", mode, "--path", path,
+                 "--range-mb", str(args.range_mb), "--repeat", str(args.repeat)],
+                check=True, capture_output=True, text=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{result['mode']:>10}: {result['throughput_mb_s']:8.1f} MB/s  "
+                  f"peak rss {result['peak_rss_mb']:7.1f} MB (+{result['peak_rss_growth_mb']:.1f} MB)")
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+    Throughput and latency benchmark of /film with the request patterns of real players
+
+    Generates a film file, starts the app with uvicorn and drives /film/{film_name} with:
+
+        sequential  players that play the film from start to end with open ended ranges like browsers do
+        seek        players that jump to random positions and read the first response of each
+        concurrent  many viewers that request fixed size ranges at random positions at the same time
+
+    Every pattern gets a fresh server so its peak resident set size is its own. The results are
+    printed and written as json with the commit they were measured on, and --baseline prints the
+    change against an earlier result file. Run from the repository root:
+
+        python -m benchmarks.bench_film_suite --size-mb 256 --output film_suite.json
+        python -m benchmarks.bench_film_suite --baseline film_suite.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+import httpx
+from .common import CATALOG_FILM, peak_rss_mb, percentile, run_server, wait_until_up, write_film
+
+
+async def timed_get(client, film_name, range_header, latencies):
+    """
+        Request a range and record the time until the whole body arrived
+
+        Returns:
+            httpx.Response: the response
+
+        Raises:
+            RuntimeError: if the range was not served, an error would be measured as a fast response
+    """
+    began = time.perf_counter()
+    response = await client.get(f"/film/{film_name}", headers={"Range": range_header})
+    latencies.append((time.perf_counter() - began) * 1000)
+    if response.status_code not in (200, 206):
+        raise RuntimeError(f"{range_header} of {film_name} got {response.status_code}: {response.text[:200]}")
+    return response
+
+
+async def sequential(client, film_name, film_size, args, latencies):
+    """
+        Play the film from start to end with open ended ranges on every player
+
+        Returns:
+            int: the bytes received
+    """
+    async def play():
+        position = 0
+        while position < film_size:
+            response = await timed_get(client, film_name, f"bytes={position}-", latencies)
+            if not response.content:
+                break
+            position += len(response.content)
+        return position
+
+    return sum(await asyncio.gather(*(play() for _ in range(args.players))))
+
+
+async def seek(client, film_name, film_size, args, latencies):
+    """
+        Jump to random positions and read the first response at each of them
+
+        Returns:
+            int: the bytes received
+    """
+    async def player(seed):
+        positions = random.Random(seed)
+        received = 0
+        for _ in range(args.seeks):
+            response = await timed_get(client, film_name, f"bytes={positions.randrange(film_size)}-", latencies)
+            received += len(response.content)
+        return received
+
+    return sum(await asyncio.gather(*(player(seed) for seed in range(args.players))))
+
+
+async def concurrent(client, film_name, film_size, args, latencies):
+    """
+        Request fixed size ranges at random positions from many viewers at once
+
+        Returns:
+            int: the bytes received
+    """
+    range_size = args.range_kb * 1024
+
+    async def viewer(seed):
+        positions = random.Random(seed)
+        received = 0
+        for _ in range(args.requests):
+            start = positions.randrange(film_size - range_size)
+            response = await timed_get(client, film_name, f"bytes={start}-{start + range_size - 1}", latencies)
+            received += len(response.content)
+        return received
+
+    return sum(await asyncio.gather(*(viewer(seed) for seed in range(args.viewers))))
+
+
+PATTERNS = {"sequential": sequential, "seek": seek, "concurrent": concurrent}
+
+
+async def measure(pattern, base_url, film_name, film_size, args):
+    """
+        Run one pattern against a started server
+
+        Returns:
+            dict: the requests, bytes, seconds, throughput and latency percentiles of the pattern
+    """
+    limits = httpx.Limits(max_connections=max(args.players, args.viewers))
+    async with httpx.AsyncClient(base_url=base_url, timeout=300, limits=limits) as client:
+        await wait_until_up(client)
+        latencies = []
+        began = time.perf_counter()
+        received = await PATTERNS[pattern](client, film_name, film_size, args, latencies)
+        elapsed = time.perf_counter() - began
+    if not received:
+        raise RuntimeError(f"{pattern} received no film bytes")
+
+    return {
+        "requests": len(latencies),
+        "bytes": received,
+        "seconds": round(elapsed, 3),
+        "requests_per_s": round(len(latencies) / elapsed, 1),
+        "mb_per_s": round(received / elapsed / 2**20, 1),
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+    }
+
+
+def commit():
+    """
+        Get the commit the benchmark runs on
+
+        Returns:
+            str: the commit hash, unknown outside of a git checkout
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def report(results, baseline):
+    """
+        Print the results and their change against the baseline
+    """
+    metrics = ["requests_per_s", "mb_per_s", "p50_ms", "p95_ms", "p99_ms", "peak_rss_mb"]
+    print(f"{'pattern':>12} " + " ".join(f"{metric:>14}" for metric in metrics))
+    for pattern, result in results["patterns"].items():
+        cells = []
+        for metric in metrics:
+            value = result.get(metric)
+            before = baseline.get("patterns", {}).get(pattern, {}).get(metric) if baseline else None
+            cell = "-" if value is None else f"{value:.1f}"
+            if value is not None and before:
+                cell += f" {100 * (value - before) / before:+.0f}%"
+            cells.append(f"{cell:>14}")
+        print(f"{pattern:>12} " + " ".join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--patterns", nargs="+", choices=list(PATTERNS), default=list(PATTERNS))
+    parser.add_argument("--size-mb", type=int, default=256, help="size of the generated film")
+    parser.add_argument("--players", type=int, default=4, help="players of the sequential and seek patterns")
+    parser.add_argument("--seeks", type=int, default=50, help="seeks of every player of the seek pattern")
+    parser.add_argument("--viewers", type=int, default=64, help="viewers of the concurrent pattern")
+    parser.add_argument("--requests", type=int, default=20, help="requests of every viewer of the concurrent pattern")
+    parser.add_argument("--range-kb", type=int, default=1024, help="range size of the concurrent pattern")
+    parser.add_argument("--output", type=Path, help="json file the results are written to")
+    parser.add_argument("--baseline", type=Path, help="json results of an earlier run to compare with")
+    args = parser.parse_args()
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else None
+    results = {"commit": commit(), "size_mb": args.size_mb, "arguments": vars(args) | {"output": None, "baseline": None}, "patterns": {}}
+
+    with tempfile.TemporaryDirectory() as media:
+        films = Path(media) / "films"
+        films.mkdir()
+        film = write_film(films / CATALOG_FILM, args.size_mb)
+
+        for pattern in args.patterns:
+            with run_server(media) as server:
+                result = asyncio.run(measure(pattern, server.base_url, film.name, film.stat().st_size, args))
+                result["peak_rss_mb"] = peak_rss_mb(server.pid)
+            results["patterns"][pattern] = result
+
+    report(results, baseline)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
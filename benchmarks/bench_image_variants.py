@@ -0,0 +1,62 @@
+"""
+    Benchmark of the bytes a catalog page downloads with original posters and with variants
+
+    Generates posters the size of the catalog originals and compares their total size with
+    the variants a grid of tiles asks for. Needs pillow. Run from the repository root:
+
+        python -m benchmarks.bench_image_variants --posters 24 --tile-width 300
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from PIL import Image, ImageDraw
+from app.images.variants import ImageVariantCache, snap_width, supported_formats
+
+
+def write_poster(path, number, width, height):
+    """
+        Write a jpeg poster with gradients and shapes so it compresses like a photo more than a flat color
+    """
+    poster = Image.effect_mandelbrot((width, height), (-2.0 + number * 0.01, -1.5, 1.0, 1.5), 100).convert("RGB")
+    draw = ImageDraw.Draw(poster)
+    for i in range(12):
+        draw.ellipse((i * width // 12, i * height // 16, i * width // 12 + width // 4, i * height // 16 + height // 5),
+                     fill=((i * 40 + number) % 256, (i * 70) % 256, (number * 13) % 256))
+    poster.save(path, "JPEG", quality=90)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--posters", type=int, default=24, help="tiles on a catalog page")
+    parser.add_argument("--tile-width", type=int, default=300, help="width a tile shows the poster at")
+    parser.add_argument("--original-width", type=int, default=2000, help="width of the original posters")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as media:
+        posters = []
+        for number in range(args.posters):
+            path = Path(media) / f"poster{number}.jpg"
+            write_poster(path, number, args.original_width, args.original_width * 3 // 2)
+            posters.append(path)
+
+        original = sum(path.stat().st_size for path in posters)
+        print(f"{'original jpeg':>16}: {original / 2**10:10.0f} KiB")
+
+        cache = ImageVariantCache(Path(media) / "variants", max_bytes=2**40)
+        width = snap_width(args.tile_width)
+        for image_format in supported_formats():
+            began = time.perf_counter()
+            variants = [cache.get(path, width, image_format) for path in posters]
+            made = time.perf_counter() - began
+            began = time.perf_counter()
+            for path in posters:
+                cache.get(path, width, image_format)
+            served = time.perf_counter() - began
+            size = sum(path.stat().st_size for path in variants)
+            print(f"{f'{width}w {image_format}':>16}: {size / 2**10:10.0f} KiB  {original / size:6.1f}x smaller  "
+                  f"made in {made * 1000 / args.posters:6.1f} ms/poster, cached in {served * 10**6 / args.posters:6.1f} us/poster")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+    Benchmark of the recommendations over a large generated catalog
+
+    Generates --films films with random genre vectors and measures the time to recommend
+    films for --seeds seed films with the sort of the whole similarity row that recommend
+    did before, with the argpartition of recommend and with one recommend_batch call. The
+    sort is given the rows of the seed films, recommend and recommend_batch compute them
+    from the normalized vectors. Run from the repository root:
+
+        python -m benchmarks.bench_recommender --films 50000
+"""
+import argparse
+import time
+from unittest.mock import patch
+import numpy as np
+from app.recommender import recommender
+
+
+def sorted_recommend(film_names, row, film_name, top_n):
+    """
+        The recommend before argpartition, a list scan and a sort of the whole row
+    """
+    film_names.index(film_name)
+    similar_films = sorted(zip(film_names, row), key=lambda x: x[1], reverse=True)
+    return [film for film, score in similar_films[1:top_n + 1]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--films", type=int, default=50000, help="number of generated films")
+    parser.add_argument("--genres", type=int, default=32, help="length of the genre vectors")
+    parser.add_argument("--seeds", type=int, default=200, help="number of seed films")
+    parser.add_argument("--top-n", type=int, default=10, help="recommendations for every seed")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    vectors = recommender.normalize_vectors(rng.random((args.films, args.genres)) < 0.2)
+    film_names = [f"Film {number}" for number in range(args.films)]
+    seed_positions = rng.choice(args.films, args.seeds, replace=False)
+    seeds = [film_names[position] for position in seed_positions]
+
+    rows = vectors[seed_positions] @ vectors.T
+
+    began = time.perf_counter()
+    for seed, row in zip(seeds, rows):
+        sorted_recommend(film_names, row, seed, args.top_n)
+    sort_seconds = time.perf_counter() - began
+
+    with patch.object(recommender, "film_names", film_names), \
+            patch.object(recommender, "film_positions", {name: position for position, name in enumerate(film_names)}), \
+            patch.object(recommender, "normalized_vectors", vectors):
+        began = time.perf_counter()
+        for seed in seeds:
+            recommender.recommend(seed, args.top_n)
+        partition_seconds = time.perf_counter() - began
+
+        began = time.perf_counter()
+        recommender.recommend_batch(seeds, args.top_n)
+        batch_seconds = time.perf_counter() - began
+
+    for label, seconds in (("sort", sort_seconds), ("argpartition", partition_seconds), ("batch", batch_seconds)):
+        print(f"{label:>12}: {seconds * 1000 / args.seeds:8.3f} ms per seed film over {args.films} films")
+
+
+if __name__ == "__main__":
+    main()
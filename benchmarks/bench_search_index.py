@@ -0,0 +1,121 @@
+"""
+    Benchmark of the search latency over a large generated catalog
+
+    Fills a sqlite database with --films films with generated titles, cast and production
+    team, then measures the latency of the search index, of a ranked page of 20 results, of
+    10 autocomplete suggestions, of the typo tolerant search and of the fts5 table of the
+    database search mode against the scan of every title that /search did before the index. Run from the repository root:
+
+        python -m benchmarks.bench_search_index --films 100000
+"""
+import argparse
+import random
+import time
+from sqlalchemy import insert
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+from app.models.film_models import Film, FilmCast, FilmProductionTeam
+from app.search.database import database_search
+from app.search.index import SearchIndex
+from app.search.pages import page
+from .common import percentile
+
+WORDS = [
+    "night", "day", "river", "city", "ghost", "storm", "silent", "last", "first", "broken",
+    "golden", "shadow", "garden", "winter", "summer", "empire", "island", "journey", "secret",
+    "mirror", "dream", "fire", "ocean", "station", "echo", "velvet", "iron", "glass", "return",
+    "kingdom", "desert", "letter", "wolf", "moon", "signal", "harbor", "crown", "paper", "orbit",
+]
+FIRST_NAMES = ["Ana", "Björn", "Chloé", "Dmitri", "Elena", "Farid", "Grace", "Hiro", "Inès", "Jonas", "Kofi", "Léa"]
+LAST_NAMES = ["Álvarez", "Berg", "Chen", "Dubois", "Eriksen", "Fischer", "García", "Haddad", "Ivanova", "Jensen"]
+QUERIES = ["ghost", "Silent River", "golden gar", "chloe", "garcia", "Ocean Station 12", "zzz", "w"]
+TYPO_QUERIES = ["Silnt Rivr", "goldn gardn", "Ocaen Staton 12"]
+
+
+def fill(session, count, rng):
+    """
+        Insert the generated films in bulk, the bulk insert does not fire the index events
+    """
+    def name():
+        return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+    session.execute(insert(Film), [
+        {"id": i, "title": f"{' '.join(rng.sample(WORDS, rng.randint(1, 4))).title()} {rng.randint(1, 99)}",
+         "length": 90, "image_name": f"{i}.jpg", "file_name": f"{i}.mp4", "producer": name()}
+        for i in range(1, count + 1)
+    ])
+    session.execute(insert(FilmCast), [
+        {"name": name(), "role": "Actor", "film_id": i} for i in range(1, count + 1) for _ in range(3)
+    ])
+    session.execute(insert(FilmProductionTeam), [
+        {"name": name(), "role": "Director", "film_id": i} for i in range(1, count + 1)
+    ])
+    session.commit()
+
+
+def scan(titles, query):
+    """
+        The search of /search before the index, a substring test on every title
+    """
+    return [film_id for film_id, title in titles if query in title]
+
+
+def measure(search, samples, queries=QUERIES):
+    """
+        Measure the latency of every benchmark query
+
+        Returns:
+            List[float]: the latencies in microseconds
+    """
+    latencies = []
+    for _ in range(samples):
+        for query in queries:
+            began = time.perf_counter()
+            search(query)
+            latencies.append((time.perf_counter() - began) * 1e6)
+    return latencies
+
+
+def report(label, latencies):
+    print(f"{label:>8}: p50 {percentile(latencies, 0.50):10.1f} us  "
+          f"p99 {percentile(latencies, 0.99):10.1f} us  max {max(latencies):10.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--films", type=int, default=100000, help="number of generated films")
+    parser.add_argument("--samples", type=int, default=50, help="repetitions of every query")
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        fill(session, args.films, random.Random(7))
+
+        index = SearchIndex()
+        began = time.perf_counter()
+        index.build(session)
+        print(f"   build: {time.perf_counter() - began:.2f}s for {args.films} films, {index.stats()['terms']} terms")
+
+        def scan_database(query):
+            return scan(session.exec(select(Film.id, Film.title)).all(), query)
+
+        report("index", measure(index.search, args.samples))
+        report("page", measure(lambda query: page(index.ranked_search(query), 20), args.samples))
+        report("suggest", measure(lambda query: index.suggest(query, 10), args.samples))
+        report("fuzzy", measure(index.fuzzy_search, args.samples, TYPO_QUERIES))
+        report("fts5", measure(lambda query: database_search(session, query), max(1, args.samples // 10)))
+        report("scan", measure(scan_database, max(1, args.samples // 10)))
+
+    # the latency grows with the number of matches, the ids are sorted and copied out
+    for query in QUERIES:
+        latencies = []
+        for _ in range(args.samples):
+            began = time.perf_counter()
+            found = index.search(query)
+            latencies.append((time.perf_counter() - began) * 1e6)
+        print(f"{query!r:>20}: p50 {percentile(latencies, 0.50):8.1f} us for {len(found)} films")
+
+
+if __name__ == "__main__":
+    main()
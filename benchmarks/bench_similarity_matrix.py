@@ -0,0 +1,60 @@
+"""
+    Benchmark of the time to compute the recommender similarities of every pair of films
+
+    Computes the similarities of --films generated films once with the loop over every pair
+    that recommender.py ran at import before, and with similarity_rows over every film, whose
+    rows are dropped as they come so only one block is held. The loop is quadratic in
+    interpreter work, so it is only run up to --loop-max-films films and estimated from the
+    pairs per second above that. Run from the repository root:
+
+        python -m benchmarks.bench_similarity_matrix --films 1000 5000 20000
+"""
+import argparse
+import time
+import numpy as np
+from app.recommender.recommender import cosine_similarity, normalize_vectors, similarity_rows
+
+
+def loop_build(vectors):
+    """
+        The build before the matrix products, one cosine_similarity call per pair
+    """
+    matrix = np.zeros((len(vectors), len(vectors)))
+    for i in range(len(vectors)):
+        for j in range(len(vectors)):
+            matrix[i][j] = cosine_similarity(vectors[i], vectors[j])
+    return matrix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--films", type=int, nargs="+", default=[10, 1000, 5000, 20000], help="catalog sizes")
+    parser.add_argument("--genres", type=int, default=32, help="length of the genre vectors")
+    parser.add_argument("--loop-max-films", type=int, default=1000, help="largest catalog built with the loop")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    pairs_per_second = None
+    for count in args.films:
+        vectors = (rng.random((count, args.genres)) < 0.2).astype(np.int64)
+
+        if count <= args.loop_max_films:
+            began = time.perf_counter()
+            loop_build(vectors)
+            loop_seconds = time.perf_counter() - began
+            pairs_per_second = count * count / loop_seconds
+            loop = f"{loop_seconds:.3f}s"
+        elif pairs_per_second is not None:
+            loop = f"~{count * count / pairs_per_second:.0f}s"
+        else:
+            loop = "n/a"
+
+        began = time.perf_counter()
+        for _ in similarity_rows(normalize_vectors(vectors), list(range(count))):
+            pass
+        rows_seconds = time.perf_counter() - began
+        print(f"{count:>7} films: loop {loop:>10}  rows {rows_seconds:8.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+    Helpers shared by the benchmarks that start the app and drive it over http
+"""
+import asyncio
+import os
+import socket
+import struct
+import subprocess
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional
+import httpx
+from app.data.film_data import FILMS
+
+# the films directory is only served for the films of the database, run_server seeds the Dynamic FILMS
+CATALOG_FILM = FILMS[0].file_name
+
+
+def free_port() -> int:
+    """
+        Get a free local tcp port
+
+        Returns:
+            int: the port
+    """
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """
+        Get a percentile of the samples with the nearest rank method
+
+        Returns:
+            float: the percentile
+    """
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def write_film(path: Path, size_mb: int) -> Path:
+    """
+        Write a film file shaped like a progressive mp4, an ftyp box, a random mdat and a moov box at the end
+
+        Parameters:
+            path (Path): the path of the film file
+            size_mb (int): the size of the mdat in MiB
+
+        Returns:
+            Path: the path of the film file
+    """
+    with open(path, "wb") as output:
+        output.write(struct.pack(">I4s4sI", 16, b"ftyp", b"isom", 0))
+        output.write(struct.pack(">I4s", 8 + size_mb * 2**20, b"mdat"))
+        for _ in range(size_mb):
+            output.write(os.urandom(2**20))
+        output.write(struct.pack(">I4s", 8, b"moov"))
+    return path
+
+
+def peak_rss_mb(pid: int) -> Optional[float]:
+    """
+        Get the peak resident set size of a process, only available on linux
+
+        Returns:
+            Optional[float]: the peak resident set size in MiB, None when it cannot be read
+    """
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+async def wait_until_up(client: httpx.AsyncClient) -> None:
+    """
+        Wait until the server answers the root route
+    """
+    for _ in range(200):
+        try:
+            await client.get("/")
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+@contextmanager
+def run_server(media: str, **env: str) -> Iterator[subprocess.Popen]:
+    """
+        Start the app with uvicorn on a sqlite database in the media directory
+
+        Parameters:
+            media (str): the media directory, the films go in its films directory
+            env (str): more environment variables for the server
+
+        Returns:
+            Iterator[subprocess.Popen]: the server process, its base_url attribute is its address
+    """
+    port = free_port()
+    server_env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{media}/bench.db",
+        DATABASE_SETUP="Dynamic",
+        MEDIA_DIRECTORY=media,
+        **env
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=server_env
+    )
+    server.base_url = f"http://127.0.0.1:{port}"
+    try:
+        yield server
+    finally:
+        server.terminate()
+        server.wait()
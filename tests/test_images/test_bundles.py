@@ -0,0 +1,50 @@
+import io
+import json
+import zipfile
+from app.images.bundles import PosterBundleCache, build_bundle, bundle_etag
+from app.images.manifest import ImageManifest
+
+
+def test_bundle_is_keyed_by_image_name(tmp_path):
+    """Test that the zip bundle holds every image under its name and an index."""
+    (tmp_path / "a.jpg").write_bytes(b"first")
+    (tmp_path / "b.png").write_bytes(b"second")
+
+    bundle = zipfile.ZipFile(io.BytesIO(build_bundle(
+        [("a.jpg", tmp_path / "a.jpg", "image/jpeg"), ("b.png", tmp_path / "b.png", "image/png")], ["c.jpg"]
+    )))
+
+    assert bundle.read("a.jpg") == b"first"
+    assert bundle.read("b.png") == b"second"
+    assert json.loads(bundle.read("index.json")) == {
+        "images": {"a.jpg": "image/jpeg", "b.png": "image/png"}, "missing": ["c.jpg"]
+    }
+
+
+def test_etag_changes_with_any_image(tmp_path):
+    """Test that the bundle etag follows the versions of its images."""
+    (tmp_path / "a.jpg").write_bytes(b"first")
+    (tmp_path / "b.jpg").write_bytes(b"second")
+    manifest = ImageManifest(tmp_path)
+    manifest.refresh()
+    names = ["a.jpg", "b.jpg"]
+    before = bundle_etag([manifest.lookup(name) for name in names], names, None, None)
+
+    (tmp_path / "b.jpg").write_bytes(b"changed")
+    manifest.refresh()
+
+    assert bundle_etag([manifest.lookup(name) for name in names], names, None, None) != before
+    assert bundle_etag([manifest.lookup(name) for name in names], names, 320, "webp") != before
+
+
+def test_cache_serves_a_bundle_until_its_etag_changes():
+    """Test that a cached bundle is only used for the etag it was built with."""
+    cache = PosterBundleCache(max_bytes=10)
+    cache.store("a,b", '"1"', b"bundle")
+
+    assert cache.cached("a,b", '"1"') == b"bundle"
+    assert cache.cached("a,b", '"2"') is None
+
+    cache.store("c", '"3"', b"other")
+    assert cache.cached("a,b", '"1"') is None
+    assert cache.stats() == {"hits": 1, "misses": 2, "bundles": 1, "bytes": 5}
@@ -0,0 +1,64 @@
+from app.images.manifest import ImageManifest
+
+
+def test_manifest_lists_the_images(tmp_path):
+    """Test that the manifest holds the files of the directory with their media type and etag."""
+    (tmp_path / "poster.jpg").write_bytes(b"poster")
+    (tmp_path / "thumbs").mkdir()
+    manifest = ImageManifest(tmp_path)
+
+    manifest.refresh()
+
+    image = manifest.lookup("poster.jpg")
+    assert image.path == (tmp_path / "poster.jpg").resolve()
+    assert image.size == 6
+    assert image.media_type == "image/jpeg"
+    assert image.etag.startswith('"')
+    assert manifest.lookup("thumbs") is None
+    assert manifest.lookup("../poster.jpg") is None
+
+
+def test_refresh_swaps_in_a_new_manifest(tmp_path):
+    """Test that added and removed images show up after a refresh."""
+    (tmp_path / "old.jpg").write_bytes(b"old")
+    manifest = ImageManifest(tmp_path)
+    manifest.refresh()
+
+    (tmp_path / "old.jpg").unlink()
+    (tmp_path / "new.webp").write_bytes(b"new")
+    manifest.refresh()
+
+    assert manifest.lookup("old.jpg") is None
+    assert manifest.lookup("new.webp").media_type == "image/webp"
+    assert manifest.stats() == {"images": 1, "refreshes": 2}
+
+
+def test_missing_directory_gives_an_empty_manifest(tmp_path):
+    """Test that a missing images directory does not raise."""
+    manifest = ImageManifest(tmp_path / "missing")
+
+    manifest.refresh()
+
+    assert manifest.ready
+    assert manifest.lookup("poster.jpg") is None
+
+
+def test_revalidate_picks_up_a_replaced_image(tmp_path):
+    """Test that an image changed without a refresh gets a new entry and a removed one is dropped."""
+    (tmp_path / "poster.jpg").write_bytes(b"poster")
+    manifest = ImageManifest(tmp_path)
+    manifest.refresh()
+    old = manifest.lookup("poster.jpg")
+
+    assert manifest.revalidate("poster.jpg") is old
+
+    (tmp_path / "poster.jpg").write_bytes(b"a new poster")
+    new = manifest.revalidate("poster.jpg")
+
+    assert new.size == 12
+    assert new.etag != old.etag
+    assert manifest.lookup("poster.jpg") == new
+
+    (tmp_path / "poster.jpg").unlink()
+    assert manifest.revalidate("poster.jpg") is None
+    assert manifest.lookup("poster.jpg") is None
@@ -0,0 +1,55 @@
+import os
+from app.images.memory_cache import ImageMemoryCache
+
+
+def test_image_is_held_until_it_is_revalidated(tmp_path):
+    """Test that an entry is served from memory and reread when the original changes."""
+    path = tmp_path / "poster.jpg"
+    path.write_bytes(b"first")
+    cache = ImageMemoryCache(revalidate_after=0)
+
+    first = cache.load("poster.jpg", path, path, "image/jpeg")
+    assert cache.load("poster.jpg", path, path, "image/jpeg") is first
+
+    path.write_bytes(b"second!")
+    os.utime(path, ns=(first.source_mtime_ns + 10**9, first.source_mtime_ns + 10**9))
+    second = cache.load("poster.jpg", path, path, "image/jpeg")
+
+    assert second.content == b"second!"
+    assert second.etag != first.etag
+    assert cache.stats()["misses"] == 2
+    assert cache.stats()["bytes"] == 7
+
+
+def test_cached_does_not_serve_an_expired_entry(tmp_path):
+    """Test that an entry older than revalidate_after needs a load."""
+    path = tmp_path / "poster.jpg"
+    path.write_bytes(b"poster")
+    cache = ImageMemoryCache(revalidate_after=0)
+    cache.load("poster.jpg", path, path, "image/jpeg")
+
+    assert cache.cached("poster.jpg") is None
+    assert cache.cached("missing.jpg") is None
+
+
+def test_large_images_are_not_held(tmp_path):
+    """Test that an image over the item limit is left to the file response."""
+    path = tmp_path / "poster.jpg"
+    path.write_bytes(b"x" * 100)
+    cache = ImageMemoryCache(max_item_bytes=10)
+
+    assert cache.load("poster.jpg", path, path, "image/jpeg") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_images_are_evicted(tmp_path):
+    """Test that the held bytes stay under the limit."""
+    cache = ImageMemoryCache(max_bytes=25, revalidate_after=60)
+    for name in ("a", "b", "c"):
+        (tmp_path / name).write_bytes(b"x" * 10)
+        cache.load(name, tmp_path / name, tmp_path / name, "image/jpeg")
+
+    assert cache.cached("a") is None
+    assert cache.cached("c") is not None
+    assert cache.stats()["bytes"] == 20
+    assert cache.stats()["hit_ratio"] == 0.25
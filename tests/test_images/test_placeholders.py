@@ -0,0 +1,41 @@
+import base64
+import io
+import os
+import pytest
+from sqlmodel import select
+from app.images.manifest import ImageManifest
+from app.images.placeholders import make_placeholder, refresh_placeholders
+from app.models.film_models import FilmPlaceholder
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def test_placeholder_is_a_tiny_jpeg(tmp_path):
+    """Test that the placeholder is a small data uri with the aspect ratio of the image."""
+    path = tmp_path / "poster.jpg"
+    Image.new("RGB", (1000, 1500), (200, 30, 30)).save(path, "JPEG")
+
+    placeholder = make_placeholder(path, width=16)
+
+    assert placeholder.startswith("data:image/jpeg;base64,")
+    assert len(placeholder) < 1024
+    with Image.open(io.BytesIO(base64.b64decode(placeholder.split(",", 1)[1]))) as image:
+        assert image.size == (16, 24)
+
+
+def test_placeholders_are_made_for_new_and_changed_images(test_session, test_film, tmp_path):
+    """Test that a placeholder is made once and again only when its image changes."""
+    path = tmp_path / test_film.image_name
+    Image.new("RGB", (100, 150), (0, 0, 255)).save(path, "JPEG")
+    manifest = ImageManifest(tmp_path)
+    manifest.refresh()
+
+    assert refresh_placeholders(test_session, manifest) == 1
+    assert refresh_placeholders(test_session, manifest) == 0
+
+    stat_result = path.stat()
+    os.utime(path, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 10**9))
+    manifest.refresh()
+
+    assert refresh_placeholders(test_session, manifest) == 1
+    assert len(test_session.exec(select(FilmPlaceholder)).all()) == 1
@@ -0,0 +1,81 @@
+import os
+import pytest
+from app.images.variants import ImageVariantCache, snap_width, supported_formats, variant_etag
+
+Image = pytest.importorskip("PIL.Image")
+
+
+@pytest.fixture
+def poster(tmp_path):
+    """Create a poster image."""
+    path = tmp_path / "poster.jpg"
+    Image.new("RGB", (1000, 1500), (200, 30, 30)).save(path, "JPEG", quality=95)
+    return path
+
+
+def test_width_is_rounded_up_to_a_breakpoint():
+    """Test that requested widths map to a few breakpoints."""
+    assert snap_width(None) is None
+    assert snap_width(1) == 160
+    assert snap_width(320) == 320
+    assert snap_width(321) == 480
+    assert snap_width(10000) == 1920
+
+
+def test_variant_is_resized_and_reencoded(poster, tmp_path):
+    """Test that a variant has the breakpoint width, the aspect ratio and the format."""
+    cache = ImageVariantCache(tmp_path / "variants", max_bytes=10**8)
+
+    path = cache.get(poster, 320, "webp")
+
+    with Image.open(path) as variant:
+        assert variant.format == "WEBP"
+        assert variant.size == (320, 480)
+    assert path.stat().st_size < poster.stat().st_size
+    assert "webp" in supported_formats()
+
+
+def test_variant_is_made_once(poster, tmp_path):
+    """Test that the second request for a variant is served from the cache."""
+    cache = ImageVariantCache(tmp_path / "variants", max_bytes=10**8)
+
+    first = cache.get(poster, 160, "jpeg")
+    second = cache.get(poster, 160, "jpeg")
+
+    assert first == second
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_changed_original_gets_a_new_variant(poster, tmp_path):
+    """Test that a variant of an older version of the original is not served."""
+    cache = ImageVariantCache(tmp_path / "variants", max_bytes=10**8)
+    first = cache.get(poster, 160, "webp")
+
+    stat_result = poster.stat()
+    os.utime(poster, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 10**9))
+    second = cache.get(poster, 160, "webp")
+
+    assert first != second
+    assert variant_etag(first) != variant_etag(second)
+
+
+def test_least_recently_used_variants_are_evicted(poster, tmp_path):
+    """Test that the variants stay under the size limit."""
+    cache = ImageVariantCache(tmp_path / "variants", max_bytes=10**8)
+    small = cache.get(poster, 160, "webp")
+    cache.max_bytes = small.stat().st_size + 1
+
+    larger = cache.get(poster, 640, "webp")
+
+    assert not small.exists()
+    assert larger.exists()
+    assert cache.stats()["evictions"] == 1
+
+
+def test_unsupported_format_is_rejected(poster, tmp_path):
+    """Test that a format pillow cannot write raises."""
+    cache = ImageVariantCache(tmp_path / "variants")
+
+    with pytest.raises(ValueError):
+        cache.get(poster, 160, "gif")
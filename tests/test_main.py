@@ -1,3 +1,4 @@
+from unittest.mock import patch
 from fastapi.testclient import TestClient
 from app.main import app
 
@@ -22,6 +23,21 @@ def test_root_route():
             "/getfilms",
             "/film",
             "/images",
+            "/posters",
+            "/autocomplete",
             "/recommendations",
+            "/admin/films/refresh",
+            "/admin/images/refresh",
+            "/stats",
         ]
     }
+
+
+def test_stats_need_the_admin_token():
+    with patch("app.main.settings.admin_token", "secret"):
+        assert client.get("/stats").status_code == 403
+        assert client.get("/stats", headers={"X-Admin-Token": "wrong"}).status_code == 403
+        response = client.get("/stats", headers={"X-Admin-Token": "secret"})
+
+    assert response.status_code == 200
+    assert "film_index" in response.json()
@@ -1,6 +1,6 @@
 import pytest
 from sqlmodel import SQLModel, Session, create_engine, select
-from app.models.film_models import Film, FilmCast, FilmProductionTeam
+from app.models.film_models import Film, FilmCast, FilmPlaceholder, FilmProductionTeam
 
 def test_film_model_creation():
     """Test that a Film model can be created with valid data."""
@@ -83,4 +83,22 @@ def test_film_production_team_model():
     assert production_team.name == "Test Crew"
     assert production_team.role == "Test Role"
     assert production_team.film_id == 1
-    assert production_team.id is None
\ No newline at end of file
+    assert production_team.id is None
+
+
+def test_film_placeholder_relationship(test_session):
+    """Test that a film has at most one placeholder."""
+    film = Film(
+        title="Placeholder Test Film",
+        length=90,
+        image_name="test.jpg",
+        file_name="test.mp4",
+        producer="Test Producer"
+    )
+    film.image_placeholder = FilmPlaceholder(image_etag='"1"', placeholder="data:image/jpeg;base64,AA==")
+    test_session.add(film)
+    test_session.commit()
+    test_session.refresh(film)
+
+    assert film.image_placeholder.film_id == film.id
+    assert film.image_placeholder.film is film
@@ -1,6 +1,7 @@
 import pytest
 import numpy as np
-from app.recommender.recommender import recommend, cosine_similarity, films
+from unittest.mock import patch
+from app.recommender.recommender import normalize_vectors, similarity_rows, top_k, recommend, recommend_batch, cosine_similarity, films
 
 def test_cosine_similarity_identical_vectors():
     """Test cosine similarity between identical vectors."""
@@ -36,3 +37,65 @@ def test_cosine_similarity_opposite_vectors():
     assert np.isclose(result, -1.0)
     # Or
     assert result == pytest.approx(-1.0)
+
+
+def test_recommend_never_returns_the_seed_film():
+    """Test that the seed film is left out even when another film ties with it."""
+    # A and B are the same film, C has a similarity of 0.5 with both
+    with patch("app.recommender.recommender.normalized_vectors", np.array([
+        [1.0, 0.0],
+        [1.0, 0.0],
+        [0.5, 0.75 ** 0.5],
+    ])), patch("app.recommender.recommender.film_names", ["A", "B", "C"]), \
+            patch("app.recommender.recommender.film_positions", {"A": 0, "B": 1, "C": 2}):
+        assert recommend("B", top_n=2) == ["A", "C"]
+        assert recommend("A", top_n=5) == ["B", "C"]
+        assert recommend_batch(["A", "B", "C"], top_n=1) == [["B"], ["A"], ["A"]]
+
+
+def test_ties_at_the_cut_give_the_lowest_positions():
+    """Test that films tied with the last recommendation are picked by position."""
+    scores = np.array([1.0, 0.5, 0.5, 0.5, 0.5])
+
+    assert top_k(scores, 2, exclude=4).tolist() == [0, 1]
+    assert top_k(scores, 3, exclude=0).tolist() == [1, 2, 3]
+
+
+def test_recommend_batch_matches_recommend():
+    """Test that the batch gives the recommendations of every seed in order."""
+    seeds = list(films)[:4]
+
+    assert recommend_batch(seeds) == [recommend(seed) for seed in seeds]
+    assert recommend_batch([]) == []
+
+
+def test_recommend_unknown_film():
+    """Test that an unknown film raises like the list lookup did."""
+    with pytest.raises(ValueError):
+        recommend("Not A Film")
+
+
+def test_similarity_rows_match_cosine_similarity():
+    """Test that the blockwise rows hold the cosine similarity of the asked films to every film."""
+    vectors = np.array(list(films.values()))
+    normalized = normalize_vectors(vectors)
+
+    rows = list(similarity_rows(normalized, [4, 0, 7, 2], block_size=3))
+
+    assert normalized.dtype == np.float32
+    assert [position for position, _ in rows] == [4, 0, 7, 2]
+    for position, row in rows:
+        expected = [cosine_similarity(vectors[position], b) for b in vectors]
+        assert np.allclose(row, expected, atol=1e-6)
+
+
+def test_zero_vectors_have_no_similarity():
+    """Test that a film without genres has a similarity of 0 instead of nan."""
+    normalized = normalize_vectors(np.array([[0, 0], [1, 1], [2, 0]]))
+
+    rows = dict(similarity_rows(normalized, [0, 1]))
+
+    assert not np.isnan(normalized).any()
+    assert rows[0].tolist() == [0, 0, 0]
+    assert rows[1][1] == pytest.approx(1.0)
+    assert cosine_similarity(np.array([0, 0]), np.array([1, 1])) == 0.0
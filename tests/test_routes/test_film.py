@@ -2,12 +2,13 @@
 import pytest
 from app.main import app
 from app.core.jwt import get_current_filmuser
-from starlette.responses import FileResponse
+from app.images.manifest import ImageManifest
+from app.images.memory_cache import ImageMemoryCache
+from app.streaming.film_index import FilmIndex
+from app.streaming.metadata import FilmMetadataCache
+from app.streaming.mmap_cache import MappedFilmCache
 from app.models.user_models import  Profile, WatchHistory
-from unittest.mock import patch, MagicMock
-from pathlib import Path
-import os
-import tempfile
+from unittest.mock import patch
 
 def test_get_films(client):
     """Test getting all films."""
@@ -20,6 +21,21 @@ def test_get_films(client):
     films = response.json()
     assert isinstance(films, list)
     
+def test_get_films_with_placeholders(client, test_session, test_film):
+    """Test that the placeholders only come with the films when they are asked for."""
+    from app.models.film_models import FilmPlaceholder
+
+    test_session.add(FilmPlaceholder(film_id=test_film.id, image_etag='"1"', placeholder="data:image/jpeg;base64,AA=="))
+    test_session.commit()
+
+    plain = client.get("/getfilms").json()
+    with_placeholders = client.get("/getfilms", params={"placeholders": True}).json()
+
+    assert "placeholder" not in plain[0]
+    assert with_placeholders[0]["placeholder"] == "data:image/jpeg;base64,AA=="
+    assert with_placeholders[0]["file_name"] == test_film.file_name
+
+
 def test_film_endpoint_authentication(client):
     """Test that protected film endpoints require authentication."""
     # Try to access recommendations without authentication
@@ -57,63 +73,219 @@ def test_mock_recommendations(client, test_session,test_film,test_user):
         # Clean up
         app.dependency_overrides.pop(get_current_filmuser, None)
 
-def test_film_streaming(client,test_film):
+@pytest.fixture
+def film_file(test_film, tmp_path):
+    """Create the file of the test film and serve films from its directory."""
+    films_dir = tmp_path / "films"
+    films_dir.mkdir()
+    path = films_dir / test_film.file_name
+    path.write_bytes(bytes(range(256)) * 4)
+    index = FilmIndex(films_dir)
+    index.refresh([test_film.file_name])
 
-    test_path = Path(f"/test/path/films/{test_film.file_name}")
+    with patch("app.main.film_metadata", FilmMetadataCache(films_dir)), patch("app.main.film_index", index):
+        yield path
+
+
+def test_film_streaming(client, test_film, film_file):
+    """Test that a range of a film is streamed with a partial content response."""
+    content = film_file.read_bytes()
+
+    # Test with range header
+    response = client.get(
+        f"/film/{test_film.file_name}",
+        headers={"Range": "bytes=0-99"}
+    )
+
+    # Check status
+    assert response.status_code == 206
+    assert response.content == content[0:100]
+    assert response.headers["content-range"] == f"bytes 0-99/{len(content)}"
+
+
+def test_film_streaming_without_range(client, test_film, film_file):
+    """Test that a request without a range gets the whole film."""
+    response = client.get(f"/film/{test_film.file_name}")
 
-    # Mock only the methods that would access the file system
-    with patch("builtins.open") as mock_open, \
-            patch.object(Path, "stat") as mock_stat, \
-            patch.object(Path, "resolve", return_value=test_path):
-        
-        # Configure file mock
-        mock_file = MagicMock()
-        mock_file.read.return_value = b"x" * 100
-        mock_open.return_value.__enter__.return_value = mock_file
-        
-        # Configure stat to return file size
-        mock_stat.return_value = MagicMock(st_size=1000)
-        
-        # Test with range header
-        response = client.get(
-            f"/film/{test_film.file_name}",
-            headers={"Range": "bytes=0-99"}
-        )
-        
-        # Check status
-        assert response.status_code == 206
-
-def test_image(client, test_film):
-   # Create a real temporary file that will exist for FileResponse
-    with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as temp_file:
-        temp_file.write(b"fake image content")
-        temp_file.flush()
-        temp_path = temp_file.name
-        
-        # Get the image name from the test film
-        image_name = test_film.image_name
-        
-        # Key patch: Replace FileResponse with our controlled version
-        from starlette.responses import FileResponse
-        
-        class MockFileResponse(FileResponse):
-            def __init__(self, path, **kwargs):
-                # Use our temp file instead of the requested path
-                super().__init__(temp_path, **kwargs)
-        
-        # Apply the patches
-        with patch("fastapi.responses.FileResponse", MockFileResponse), \
-                patch("app.main.FileResponse", MockFileResponse), \
-                patch("app.main.settings.images_dir", Path("/mocked/images/dir")), \
-                patch("pathlib.Path.exists", return_value=True), \
-                patch("pathlib.Path.resolve", return_value=Path(temp_path)):
-            
-            # Test the endpoint
-            response = client.get(f"/images/{image_name}") 
     assert response.status_code == 200
+    assert response.content == film_file.read_bytes()
+
+
+def test_film_streaming_unsatisfiable_range(client, test_film, film_file):
+    """Test that a range past the end of the film is rejected."""
+    response = client.get(
+        f"/film/{test_film.file_name}",
+        headers={"Range": "bytes=5000-"}
+    )
+
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */1024"
+
+
+def test_film_streaming_if_none_match(client, test_film, film_file):
+    """Test that a client with the current etag gets a not modified response."""
+    etag = client.get(f"/film/{test_film.file_name}", headers={"Range": "bytes=0-9"}).headers["etag"]
+
+    response = client.get(f"/film/{test_film.file_name}", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+
+
+def test_film_streaming_if_range(client, test_film, film_file):
+    """Test that a range is only served for the version of the film it was made for."""
+    etag = client.get(f"/film/{test_film.file_name}", headers={"Range": "bytes=0-9"}).headers["etag"]
+
+    current = client.get(f"/film/{test_film.file_name}", headers={"Range": "bytes=0-9", "If-Range": etag})
+    stale = client.get(f"/film/{test_film.file_name}", headers={"Range": "bytes=0-9", "If-Range": '"old"'})
+
+    assert current.status_code == 206
+    assert stale.status_code == 200
+    assert len(stale.content) == 1024
+
+
+def test_film_streaming_from_memory_map(client, test_film, film_file):
+    """Test that a hot film is served from its memory map."""
+    segments = MappedFilmCache(max_bytes=10000, min_requests=1)
+
+    with patch("app.main.settings.mmap_cache_enabled", True), \
+            patch("app.main.film_segments", segments):
+        response = client.get(f"/film/{test_film.file_name}", headers={"Range": "bytes=10-19"})
+
+    assert response.status_code == 206
+    assert response.content == film_file.read_bytes()[10:20]
+    assert segments.resident() == [{"film": test_film.file_name, "bytes": 1024}]
+
+
+@pytest.fixture
+def images_dir(tmp_path):
+    """Serve images from a temporary directory, the manifest is built when a test first asks for an image."""
+    images_dir = tmp_path / "images"
+    images_dir.mkdir()
+    with patch("app.main.image_manifest", ImageManifest(images_dir)), patch("app.main.image_cache", ImageMemoryCache()):
+        yield images_dir
+
+
+def test_image(client, test_film, images_dir):
+    """Test getting the poster of a film."""
+    (images_dir / test_film.image_name).write_bytes(b"fake image content")
+
+    response = client.get(f"/images/{test_film.image_name}")
+
+    assert response.status_code == 200
+    assert response.content == b"fake image content"
+    assert response.headers["content-type"] == "image/jpeg"
+
+
+def test_image_outside_the_images_directory(client, images_dir):
+    """Test that a sibling directory with the same prefix and paths are rejected."""
+    sibling = images_dir.parent / "images2"
+    sibling.mkdir()
+    (sibling / "secret.jpg").write_bytes(b"secret")
+    (images_dir / "poster.jpg").write_bytes(b"poster")
+
+    assert client.get("/images/..%2Fimages2%2Fsecret.jpg").status_code in (400, 404)
+    assert client.get("/images/secret.jpg").status_code == 400
+    assert client.get("/images/poster.jpg").status_code == 200
 
 
+def test_image_variant(client, tmp_path, images_dir):
+    """Test that a width and format give a resized and re-encoded variant with a strong etag."""
+    Image = pytest.importorskip("PIL.Image")
+    from app.images.variants import ImageVariantCache
 
+    Image.new("RGB", (800, 1200), (10, 20, 30)).save(images_dir / "poster.jpg", "JPEG")
+
+    with patch("app.main.image_variants", ImageVariantCache(tmp_path / "variants")):
+        response = client.get("/images/poster.jpg", params={"width": 300, "format": "webp"})
+        cached = client.get("/images/poster.jpg", params={"width": 300, "format": "webp"},
+                            headers={"If-None-Match": response.headers["etag"]})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/webp"
+    assert len(response.content) < (images_dir / "poster.jpg").stat().st_size
+    assert cached.status_code == 304
+
+
+def test_small_image_is_served_from_memory(client, images_dir):
+    """Test that a small image is answered from memory and a matching etag gets a 304."""
+    (images_dir / "poster.png").write_bytes(b"poster bytes")
+    cache = ImageMemoryCache(revalidate_after=60)
+
+    with patch("app.main.image_cache", cache):
+        first = client.get("/images/poster.png")
+        # the file is gone but the entry is still trusted
+        (images_dir / "poster.png").unlink()
+        second = client.get("/images/poster.png")
+        cached = client.get("/images/poster.png", headers={"If-None-Match": first.headers["etag"]})
+
+    assert first.content == second.content == b"poster bytes"
+    assert first.headers["content-type"] == "image/png"
+    assert "last-modified" in first.headers
+    assert cached.status_code == 304
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["not_modified"] == 1
+
+
+def test_replaced_image_gets_a_new_etag(client, images_dir):
+    """Test that a large image replaced without a manifest refresh is not answered with its old etag."""
+    (images_dir / "big.png").write_bytes(b"old poster")
+
+    with patch("app.main.image_cache", ImageMemoryCache(max_item_bytes=4)):
+        first = client.get("/images/big.png")
+        (images_dir / "big.png").write_bytes(b"the new poster")
+        second = client.get("/images/big.png", headers={"If-None-Match": first.headers["etag"]})
+
+    assert first.content == b"old poster"
+    assert second.status_code == 200
+    assert second.content == b"the new poster"
+    assert second.headers["etag"] != first.headers["etag"]
+
+
+def test_posters_bundle(client, images_dir):
+    """Test that several posters come in one zip bundle that is cached until an image changes."""
+    import io
+    import zipfile
+    from app.images.bundles import PosterBundleCache
+
+    (images_dir / "a.jpg").write_bytes(b"first")
+    (images_dir / "b.jpg").write_bytes(b"second")
+    bundles = PosterBundleCache()
+
+    with patch("app.main.poster_bundles", bundles):
+        response = client.get("/posters", params={"images": "a.jpg,b.jpg,missing.jpg"})
+        again = client.get("/posters", params={"images": "a.jpg,b.jpg,missing.jpg"})
+        cached = client.get("/posters", params={"images": "a.jpg,b.jpg,missing.jpg"},
+                            headers={"If-None-Match": response.headers["etag"]})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+    bundle = zipfile.ZipFile(io.BytesIO(response.content))
+    assert bundle.read("a.jpg") == b"first"
+    assert bundle.read("b.jpg") == b"second"
+    assert again.content == response.content
+    assert bundles.stats()["hits"] == 1
+    assert cached.status_code == 304
+    assert client.get("/posters", params={"images": ""}).status_code == 400
+
+
+def test_posters_bundle_picks_up_a_replaced_image(client, images_dir):
+    """Test that an image changed without a manifest refresh gives a bundle with a new etag and the new bytes."""
+    import io
+    import zipfile
+    from app.images.bundles import PosterBundleCache
+
+    (images_dir / "small.png").write_bytes(b"old")
+    (images_dir / "b.jpg").write_bytes(b"second")
+
+    with patch("app.main.poster_bundles", PosterBundleCache()):
+        first = client.get("/posters", params={"images": "small.png,b.jpg"})
+        (images_dir / "small.png").write_bytes(b"the new one")
+        second = client.get("/posters", params={"images": "small.png,b.jpg"},
+                            headers={"If-None-Match": first.headers["etag"]})
+
+    assert second.status_code == 200
+    assert second.headers["etag"] != first.headers["etag"]
+    assert zipfile.ZipFile(io.BytesIO(second.content)).read("small.png") == b"the new one"
 
 
 def test_invalid_image(client):
@@ -121,4 +293,81 @@ def test_invalid_image(client):
 
         # Verify response
     assert response.status_code == 400
-    assert response.json()["detail"] == "Invalid image request"
\ No newline at end of file
+    assert response.json()["detail"] == "Invalid image request"
+
+@pytest.fixture
+def segmented_film(tmp_path):
+    """Create a fragmented film with its segment index and serve it from the temporary directories."""
+    from app.streaming.segments import SegmentIndexStore, build_segment_index
+    from tests.test_streaming.test_segments import write_fragmented_film
+
+    (tmp_path / "films").mkdir()
+    path = write_fragmented_film(tmp_path / "films" / "film.mp4")
+    store = SegmentIndexStore(tmp_path / "segments")
+    store.write(path.name, build_segment_index(path, target_duration=2))
+
+    index = FilmIndex(path.parent)
+    index.refresh()
+
+    with patch("app.main.film_metadata", FilmMetadataCache(path.parent)), patch("app.main.segment_indexes", store), \
+            patch("app.main.film_index", index):
+        yield path
+
+
+def test_film_playlist(client, segmented_film):
+    """Test the hls playlist of a segmented film."""
+    response = client.get(f"/film/{segmented_film.name}/playlist.m3u8")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/vnd.apple.mpegurl"
+    assert response.text.count("#EXTINF:") == 4
+
+
+def test_film_segments(client, segmented_film):
+    """Test that the init section and the segments cover the film."""
+    init = client.get(f"/film/{segmented_film.name}/segment/init")
+    segments = [client.get(f"/film/{segmented_film.name}/segment/{number}") for number in range(4)]
+
+    assert init.status_code == 200
+    assert "immutable" in init.headers["cache-control"]
+    assert init.content + b"".join(segment.content for segment in segments) == segmented_film.read_bytes()
+
+    cached = client.get(f"/film/{segmented_film.name}/segment/1", headers={"If-None-Match": segments[1].headers["etag"]})
+    assert cached.status_code == 304
+
+
+def test_film_segment_not_found(client, segmented_film):
+    """Test the 404 responses of the segmented routes."""
+    assert client.get(f"/film/{segmented_film.name}/segment/4").status_code == 404
+    assert client.get(f"/film/{segmented_film.name}/segment/x").status_code == 404
+    assert client.get("/film/missing.mp4/playlist.m3u8").status_code == 404
+
+
+def test_missing_film_is_not_found(client, film_file):
+    """Test that a film that is not in the index gets a 404."""
+    assert client.get("/film/missing.mp4").status_code == 404
+    assert client.get("/film/..%2F..%2Fetc%2Fpasswd").status_code == 404
+
+
+def test_removed_film_is_not_found(client, test_film, film_file):
+    """Test that a film whose file went away after the index was built gets a 404."""
+    film_file.unlink()
+
+    assert client.get(f"/film/{test_film.file_name}").status_code == 404
+
+
+def test_refresh_film_index(client, test_film, film_file):
+    """Test that the admin route rebuilds the index and needs the admin token."""
+    (film_file.parent / "new.mp4").write_bytes(b"new")
+
+    with patch("app.main.settings.admin_token", "secret"):
+        assert client.post("/admin/films/refresh").status_code == 403
+        assert client.post("/admin/films/refresh", headers={"X-Admin-Token": "wrong"}).status_code == 403
+        response = client.post("/admin/films/refresh", headers={"X-Admin-Token": "secret"})
+
+    assert response.status_code == 200
+    assert response.json()["films"] == 2
+    assert response.json()["orphaned_files"] == 1
+    # a file without a film in the database is not streamed
+    assert client.get("/film/new.mp4").status_code == 404
+    assert client.get(f"/film/{test_film.file_name}").status_code == 200
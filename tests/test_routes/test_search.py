@@ -3,13 +3,15 @@ from unittest.mock import patch, MagicMock
 import datetime
 from sqlmodel import select
 
-from app.main import app
+from app.main import app, settings as app_settings
 from app.core.jwt import get_current_filmuser
 from app.core.config import Settings
 from app.core.jwt import create_jwt_token, get_current_filmuser
 from app.models.user_models import Profile, FilmUser, SearchHistory
 from app.models.film_models import Film
 from app.models.token_models import TokenModel
+from app.search.cache import SearchResultCache
+from app.search.history import SearchHistoryWriter
 
 # -------------------- Fixtures --------------------
 
@@ -146,6 +148,122 @@ def test_search_basic(client, test_session, test_user, test_profile, test_films,
         app.dependency_overrides.pop(get_current_filmuser, None)
 
 
+def test_search_forgives_typos(client, test_session, test_user, test_profile, test_films, auth_headers):
+    """Test that a mistyped title still finds the film."""
+    app.dependency_overrides[get_current_filmuser] = lambda: test_user.id
+
+    try:
+        response = client.post(
+            "/search",
+            data={
+                "profile_id": str(test_profile.id),
+                "query": "Acton Movei"
+            },
+            headers=auth_headers
+        )
+
+        assert response.status_code == 200
+        assert response.json()["results"][0] == test_films[0].id
+    finally:
+        app.dependency_overrides.pop(get_current_filmuser, None)
+
+
+def test_search_in_database_mode(client, test_session, test_user, test_profile, test_films, auth_headers):
+    """Test that the database search mode finds the films with the fts5 table."""
+    app.dependency_overrides[get_current_filmuser] = lambda: test_user.id
+
+    try:
+        with patch.object(app_settings, "search_mode", "database"):
+            response = client.post(
+                "/search",
+                data={
+                    "profile_id": str(test_profile.id),
+                    "query": "action"
+                },
+                headers=auth_headers
+            )
+
+        assert response.status_code == 200
+        assert response.json()["results"] == [test_films[0].id]
+    finally:
+        app.dependency_overrides.pop(get_current_filmuser, None)
+
+
+def test_search_pages(client, test_session, test_user, test_profile, test_films, auth_headers):
+    """Test that the results come in pages and only the first page is added to the history."""
+    app.dependency_overrides[get_current_filmuser] = lambda: test_user.id
+
+    sequel = Film(title="Action Movie Returns", length=100, image_name="sequel.jpg", file_name="sequel.mp4", producer="Producer")
+    test_session.add(sequel)
+    test_session.commit()
+
+    try:
+        data = {"profile_id": str(test_profile.id), "query": "action movie", "limit": "1"}
+        first = client.post("/search", data=data, headers=auth_headers).json()
+        second = client.post("/search", data={**data, "cursor": first["next_cursor"]}, headers=auth_headers).json()
+
+        assert len(first["results"]) == 1
+        assert first["results"] == [test_films[0].id]
+        assert second["results"] == [sequel.id]
+
+        history = test_session.exec(select(SearchHistory).where(SearchHistory.profileid == test_profile.id)).all()
+        assert [entry.search_query for entry in history] == ["action movie"]
+
+        response = client.post("/search", data={**data, "cursor": "bad"}, headers=auth_headers)
+        assert response.status_code == 400
+    finally:
+        app.dependency_overrides.pop(get_current_filmuser, None)
+
+
+def test_search_with_deferred_history(client, test_engine, test_session, test_user, test_profile, test_films, auth_headers):
+    """Test that the deferred history mode answers with the request token and queues the search."""
+    app.dependency_overrides[get_current_filmuser] = lambda: test_user.id
+    writer = SearchHistoryWriter(test_engine)
+
+    try:
+        with patch.object(app_settings, "search_history_mode", "deferred"), patch("app.main.search_history", writer):
+            response = client.post(
+                "/search",
+                data={"profile_id": str(test_profile.id), "query": "Action"},
+                headers=auth_headers
+            )
+
+        assert response.status_code == 200
+        assert response.json()["token"] == auth_headers["Authorization"].split()[1]
+        assert test_films[0].id in response.json()["results"]
+        assert writer.backlog() == 1
+
+        writer.flush()
+        history = test_session.exec(select(SearchHistory).where(SearchHistory.profileid == test_profile.id)).all()
+        assert [entry.search_query for entry in history] == ["Action"]
+    finally:
+        app.dependency_overrides.pop(get_current_filmuser, None)
+
+
+def test_search_results_are_cached(client, test_session, test_user, test_profile, test_films, auth_headers):
+    """Test that the same normalized query is answered from the cache until a film changes."""
+    app.dependency_overrides[get_current_filmuser] = lambda: test_user.id
+    cache = SearchResultCache(max_entries=10, ttl=60)
+
+    def search(query):
+        response = client.post("/search", data={"profile_id": str(test_profile.id), "query": query}, headers=auth_headers)
+        return response.json()["results"]
+
+    try:
+        with patch("app.main.search_cache", cache):
+            assert test_films[0].id in search("Action")
+            assert test_films[0].id in search(" action ")
+            assert cache.hits == 1
+
+            test_films[0].title = "Western Movie"
+            test_session.add(test_films[0])
+            test_session.commit()
+            assert test_films[0].id not in search("action")
+            assert cache.stale == 1
+    finally:
+        app.dependency_overrides.pop(get_current_filmuser, None)
+
+
 def test_search_no_results(client, test_profile, test_user, auth_headers):
     """Test search with no matching results."""
     # Override authentication dependency
@@ -261,4 +379,12 @@ def test_search_history_limit(client, test_session, test_profile, test_user, aut
         assert "OldQuery0" not in search_queries  # The oldest should be gone
     finally:
         # Clean up the override
-        app.dependency_overrides.pop(get_current_filmuser, None)
\ No newline at end of file
+        app.dependency_overrides.pop(get_current_filmuser, None)
+
+def test_autocomplete(client, test_session, test_films):
+    """Test that the autocomplete endpoint suggests titles without a token."""
+    response = client.get("/autocomplete", params={"q": "acti", "limit": 5})
+
+    assert response.status_code == 200
+    assert {"text": "Action Movie", "kind": "title", "film_id": test_films[0].id} in response.json()
+    assert client.get("/autocomplete", params={"q": "acti", "limit": 0}).status_code == 422
@@ -0,0 +1,48 @@
+import time
+from app.search.cache import SearchResultCache
+
+
+def test_hits_until_the_catalog_changes():
+    """Test that an entry is served for its catalog version only."""
+    cache = SearchResultCache(max_entries=10, ttl=60)
+    key = ("index", "alien")
+
+    assert cache.get(key, 1) is None
+    cache.put(key, 1, [(1, 2.5)])
+
+    assert cache.get(key, 1) == ((1, 2.5),)
+    assert cache.get(key, 2) is None
+    assert cache.stats() == {"hits": 1, "misses": 2, "stale": 1, "evictions": 0, "hit_ratio": 0.333, "entries": 0}
+
+
+def test_entries_expire():
+    """Test that an entry older than the ttl is not served."""
+    cache = SearchResultCache(max_entries=10, ttl=0.01)
+    cache.put("alien", 1, [(1, 2.5)])
+
+    time.sleep(0.02)
+
+    assert cache.get("alien", 1) is None
+    assert cache.stale == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    """Test that the cache keeps its bound and drops the entry used least recently."""
+    cache = SearchResultCache(max_entries=2, ttl=60)
+    cache.put("alien", 1, [])
+    cache.put("brazil", 1, [])
+    cache.get("alien", 1)
+
+    cache.put("casablanca", 1, [])
+
+    assert cache.get("brazil", 1) is None
+    assert cache.get("alien", 1) == ()
+    assert cache.evictions == 1
+
+
+def test_disabled_cache_keeps_nothing():
+    """Test that a cache without entries never hits."""
+    cache = SearchResultCache(max_entries=0)
+
+    assert cache.put("alien", 1, [(1, 1.0)]) == ((1, 1.0),)
+    assert cache.get("alien", 1) is None
@@ -0,0 +1,55 @@
+from sqlalchemy import text
+from sqlmodel import SQLModel
+from app.models.film_models import Film
+from app.search.database import database_search
+
+
+def add_film(session, title):
+    film = Film(title=title, length=90, image_name="film.jpg", file_name="film.mp4", producer="Producer")
+    session.add(film)
+    session.commit()
+    session.refresh(film)
+    return film
+
+
+def test_fts_table_follows_the_film_table(test_session):
+    """Test that the triggers keep the fts5 table in step with inserts, updates and deletes."""
+    alien = add_film(test_session, "Alien")
+    amelie = add_film(test_session, "Amélie")
+
+    results = database_search(test_session, "alien")
+    assert [film_id for film_id, _ in results] == [alien.id]
+    assert results[0][1] > 0
+    assert [film_id for film_id, _ in database_search(test_session, "AMELIE")] == [amelie.id]
+
+    alien.title = "Aliens"
+    test_session.add(alien)
+    test_session.commit()
+    assert [film_id for film_id, _ in database_search(test_session, "aliens")] == [alien.id]
+
+    test_session.delete(alien)
+    test_session.commit()
+    assert database_search(test_session, "aliens") == []
+
+
+def test_last_word_is_a_prefix_and_results_are_ranked(test_session):
+    """Test that the last word matches as a prefix and the better matches come first."""
+    add_film(test_session, "Star Trek Beyond The Final Frontier Of Space")
+    wars = add_film(test_session, "Star Wars")
+
+    results = database_search(test_session, "star wa")
+    assert [film_id for film_id, _ in results] == [wars.id]
+
+    results = database_search(test_session, "star", limit=1)
+    assert [film_id for film_id, _ in results] == [wars.id]
+    assert database_search(test_session, '" OR *') == []
+
+
+def test_fts_table_is_dropped_with_the_film_table(test_engine):
+    """Test that dropping the tables also drops the fts5 table."""
+    SQLModel.metadata.create_all(test_engine)
+    SQLModel.metadata.drop_all(test_engine)
+    with test_engine.connect() as connection:
+        tables = connection.execute(text("SELECT name FROM sqlite_master WHERE name = 'film_fts'")).all()
+
+    assert tables == []
@@ -0,0 +1,94 @@
+import asyncio
+import datetime
+import pytest
+from unittest.mock import patch
+from sqlmodel import select
+from app.models.user_models import FilmUser, Profile, SearchHistory
+from app.search.history import SearchHistoryWriter
+
+
+def add_profile(session, username):
+    user = FilmUser(username=username, password="password", date_registered=datetime.datetime.now(), profiles=[])
+    user.profiles.append(Profile(displayname="Profile"))
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    return user, user.profiles[0]
+
+
+def history(session, profile):
+    session.expire_all()
+    entries = session.exec(select(SearchHistory).where(SearchHistory.profileid == profile.id)).all()
+    return [entry.search_query for entry in entries]
+
+
+def test_flush_writes_and_trims_the_history(test_engine, test_session):
+    """Test that a batch is written at once and every profile keeps its newest searches."""
+    user, profile = add_profile(test_session, "writer@example.com")
+    test_session.add(SearchHistory(profileid=profile.id, search_query="old"))
+    test_session.commit()
+    writer = SearchHistoryWriter(test_engine)
+
+    for number in range(4):
+        writer.record(user.id, profile.id, f"query {number}")
+    assert writer.backlog() == 4
+
+    assert writer.flush() == 4
+    assert history(test_session, profile) == ["query 1", "query 2", "query 3"]
+    assert writer.stats()["backlog"] == 0
+    assert writer.stats()["flushes"] == 1
+    assert writer.flush() == 0
+
+
+def test_searches_for_other_profiles_are_dropped(test_engine, test_session):
+    """Test that a search is only written to a profile of the user who searched."""
+    owner, profile = add_profile(test_session, "owner@example.com")
+    other, _ = add_profile(test_session, "other@example.com")
+    writer = SearchHistoryWriter(test_engine)
+
+    writer.record(other.id, profile.id, "not mine")
+    writer.record(owner.id, profile.id, "mine")
+
+    assert writer.flush() == 1
+    assert history(test_session, profile) == ["mine"]
+    assert writer.dropped == 1
+
+
+def test_failed_batch_is_queued_again(test_engine, test_session):
+    """Test that a batch the database refused is written by the next flush and the overflow is counted."""
+    user, profile = add_profile(test_session, "retry@example.com")
+    writer = SearchHistoryWriter(test_engine, max_backlog=3)
+    writer.record(user.id, profile.id, "first")
+    writer.record(user.id, profile.id, "second")
+
+    with patch.object(writer, "_write", side_effect=RuntimeError("database is down")):
+        with pytest.raises(RuntimeError):
+            writer.flush()
+    writer.record(user.id, profile.id, "third")
+    writer.record(user.id, profile.id, "fourth")
+
+    assert writer.stats()["backlog"] == 3
+    assert writer.stats()["dropped"] == 1
+    assert writer.flush() == 3
+    assert history(test_session, profile) == ["second", "third", "fourth"]
+
+
+def test_full_queue_flushes_before_the_interval(test_engine, test_session):
+    """Test that reaching the batch size wakes the worker without waiting for the interval."""
+    user, profile = add_profile(test_session, "batch@example.com")
+    writer = SearchHistoryWriter(test_engine, batch_size=2, flush_interval=60)
+
+    async def main():
+        worker = asyncio.create_task(writer.run())
+        await asyncio.sleep(0)
+        writer.record(user.id, profile.id, "first")
+        writer.record(user.id, profile.id, "second")
+        for _ in range(100):
+            if writer.flushed == 2:
+                break
+            await asyncio.sleep(0.01)
+        worker.cancel()
+
+    asyncio.run(main())
+
+    assert history(test_session, profile) == ["first", "second"]
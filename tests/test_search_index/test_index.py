@@ -0,0 +1,133 @@
+from app.models.film_models import Film, FilmCast, FilmProductionTeam
+from app.search.index import SearchIndex, search_index
+from app.search.text import normalize, tokenize
+
+
+def add_film(session, title, cast=(), team=()):
+    film = Film(title=title, length=90, image_name="film.jpg", file_name="film.mp4", producer="Producer")
+    film.film_cast = [FilmCast(name=name, role="Actor") for name in cast]
+    film.production_team = [FilmProductionTeam(name=name, role="Director") for name in team]
+    session.add(film)
+    session.commit()
+    session.refresh(film)
+    return film
+
+
+def test_text_is_normalized():
+    """Test that accents and case are folded and punctuation splits words."""
+    assert normalize("Amélie") == "amelie"
+    assert tokenize("Léon: The PROFESSIONAL") == ["leon", "the", "professional"]
+    assert tokenize("  --  ") == []
+
+
+def test_search_matches_titles_and_names(test_session):
+    """Test that titles, cast and production team names are searchable."""
+    alien = add_film(test_session, "Alien", cast=["Sigourney Weaver"], team=["Ridley Scott"])
+    amelie = add_film(test_session, "Amélie", cast=["Audrey Tautou"])
+    index = SearchIndex()
+
+    index.build(test_session)
+
+    assert index.search("alien") == [alien.id]
+    assert index.search("WEAVER") == [alien.id]
+    assert index.search("ridley scott") == [alien.id]
+    assert index.search("amelie") == [amelie.id]
+    assert index.search("audrey weaver") == []
+    assert index.search("") == []
+    assert index.stats()["films"] == 2
+
+
+def test_last_word_matches_as_a_prefix(test_session):
+    """Test that the last word of the query is matched as a prefix and the others exactly."""
+    alien = add_film(test_session, "Alien")
+    aliens = add_film(test_session, "Aliens")
+    add_film(test_session, "Alligator")
+    index = SearchIndex()
+    index.build(test_session)
+
+    assert index.search("ali") == [alien.id, aliens.id]
+    assert index.search("al") == sorted(index.search("al"))
+    assert len(index.search("al")) == 3
+    assert index.search("ali movie") == []
+
+
+def test_applied_changes_update_the_index():
+    """Test that set, unset and drop changes move the postings."""
+    index = SearchIndex()
+    index.apply([("set", 1, "title", "Alien"), ("set", 1, "cast:1", "Sigourney Weaver")])
+    assert index.search("sigourney") == [1]
+
+    index.apply([("unset", 1, "cast:1", None), ("set", 1, "title", "Aliens")])
+    assert index.search("sigourney") == []
+    assert index.search("aliens") == [1]
+
+    index.apply([("drop", 1, None, None)])
+    assert index.search("alien") == []
+    assert index.stats()["terms"] == 0
+
+
+def test_committed_writes_reach_the_index(test_session):
+    """Test that the table events update the index when the transaction commits."""
+    search_index.build(test_session)
+    film = add_film(test_session, "Solaris", cast=["Natalya Bondarchuk"])
+    assert search_index.search("bondarchuk") == [film.id]
+
+    film.title = "Stalker"
+    test_session.add(film)
+    test_session.commit()
+    assert search_index.search("solaris") == []
+    assert search_index.search("stalker") == [film.id]
+
+    test_session.delete(film.film_cast[0])
+    test_session.commit()
+    assert search_index.search("bondarchuk") == []
+
+
+def test_rolled_back_writes_are_discarded(test_session):
+    """Test that changes of a rolled back transaction never reach the index."""
+    search_index.build(test_session)
+    test_session.add(Film(title="Nostalghia", length=90, image_name="film.jpg", file_name="film.mp4", producer="Producer"))
+    test_session.flush()
+    test_session.rollback()
+
+    assert search_index.search("nostalghia") == []
+
+
+def test_fuzzy_search_follows_title_changes():
+    """Test that the trigram index of the titles is kept in line with the changes."""
+    index = SearchIndex()
+    index.apply([("set", 1, "title", "Lusitania"), ("set", 1, "cast:1", "Jane Doe")])
+    assert index.fuzzy_search("Lusitainia")[0][0] == 1
+
+    index.apply([("set", 1, "title", "Titanic")])
+    assert index.fuzzy_search("Lusitainia") == []
+    assert index.fuzzy_search("Titanik")[0][0] == 1
+    assert index.stats()["fuzzy_searches"] == 3
+
+
+def test_title_matches_rank_before_credit_matches():
+    """Test that a word in the title scores more than a name in the credits and short titles win ties."""
+    index = SearchIndex()
+    index.apply([
+        ("set", 1, "title", "Nomad"), ("set", 1, "cast:1", "Anna Wolf"),
+        ("set", 2, "title", "Wolf"),
+        ("set", 3, "title", "The Wolf Of The North"),
+    ])
+
+    scores = dict(index.ranked_search("wolf"))
+
+    assert scores[2] > scores[3] > scores[1]
+    assert index.ranked_search("") == []
+
+
+def test_catalog_version_goes_up_with_changes(test_session):
+    """Test that builds and committed writes bump the catalog version and searches do not."""
+    search_index.build(test_session)
+    version = search_index.version
+
+    add_film(test_session, "Metropolis")
+    search_index.search("metropolis")
+
+    assert search_index.version == version + 1
+    search_index.apply([])
+    assert search_index.version == version + 1
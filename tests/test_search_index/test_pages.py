@@ -0,0 +1,30 @@
+import pytest
+from app.search.pages import decode_cursor, encode_cursor, page
+
+
+def test_cursor_round_trips():
+    """Test that a cursor gives back the score and film id it was made from."""
+    assert decode_cursor(encode_cursor(42, 2.5)) == (2.5, 42)
+    with pytest.raises(ValueError):
+        decode_cursor("not a cursor")
+
+
+def test_pages_walk_the_ranked_results():
+    """Test that following the cursors gives every result once in ranked order."""
+    results = [(film_id, float(film_id % 4)) for film_id in range(1, 11)]
+
+    pages = []
+    cursor = None
+    while True:
+        film_ids, cursor = page(iter(results), 3, cursor)
+        pages.append(film_ids)
+        if cursor is None:
+            break
+
+    assert pages == [[3, 7, 2], [6, 10, 1], [5, 9, 4], [8]]
+
+
+def test_exact_page_has_no_next_cursor():
+    """Test that the last page has no cursor when it is full."""
+    assert page([(1, 1.0), (2, 0.5)], 2) == ([1, 2], None)
+    assert page([], 2) == ([], None)
@@ -0,0 +1,46 @@
+from app.search.suggestions import Suggester
+
+
+def test_titles_and_cast_names_are_suggested_from_any_word():
+    """Test that every word of a title or cast name starts a suggestion, in key order."""
+    suggester = Suggester()
+    suggester.build([
+        (1, {"title": "Alien", "cast:1": "Sigourney Weaver", "team:1": "Ridley Scott"}),
+        (2, {"title": "Weaver Of Dreams"}),
+    ])
+
+    assert suggester.suggest("wea", 10) == [("Sigourney Weaver", "cast", 1), ("Weaver Of Dreams", "title", 2)]
+    assert suggester.suggest("weaver of", 10) == [("Weaver Of Dreams", "title", 2)]
+    assert suggester.suggest("SIG", 10) == [("Sigourney Weaver", "cast", 1)]
+    assert suggester.suggest("ridley", 10) == []
+    assert suggester.suggest("", 10) == []
+
+
+def test_titles_come_before_names_with_the_same_key():
+    """Test that a title and a cast name with the same words suggest the title first."""
+    suggester = Suggester()
+    suggester.build([(1, {"title": "Harvey", "cast:1": "Harvey"})])
+
+    assert suggester.suggest("harv", 10) == [("Harvey", "title", 1), ("Harvey", "cast", 1)]
+
+
+def test_limit_and_shared_texts():
+    """Test that a text shared by several films is suggested once and the limit holds."""
+    suggester = Suggester()
+    suggester.build([(film_id, {"title": "Hamlet"}) for film_id in range(1, 4)] + [(4, {"title": "Hamburg"})])
+
+    assert suggester.suggest("ham", 10) == [("Hamburg", "title", 4), ("Hamlet", "title", 1)]
+    assert suggester.suggest("ham", 1) == [("Hamburg", "title", 4)]
+
+
+def test_updates_move_the_entries():
+    """Test that changed and removed fields change the suggestions."""
+    suggester = Suggester()
+    suggester.build([(1, {"title": "Alien"})])
+
+    suggester.update(1, {"title": "Aliens", "cast:1": "Michael Biehn"})
+    assert suggester.suggest("alien", 10) == [("Aliens", "title", 1)]
+    assert suggester.suggest("bie", 10) == [("Michael Biehn", "cast", 1)]
+
+    suggester.update(1, {})
+    assert len(suggester) == 0
@@ -0,0 +1,44 @@
+from app.search.trigrams import TrigramIndex, trigrams
+
+
+def test_words_are_padded():
+    """Test that the trigrams of every word are padded like pg_trgm."""
+    assert trigrams("Up") == {"  u", " up", "up "}
+    assert trigrams("Up up") == trigrams("up")
+    assert trigrams("") == set()
+
+
+def test_mistyped_titles_are_found():
+    """Test that the most similar titles come first."""
+    index = TrigramIndex(threshold=0.3, limit=10)
+    index.build([(1, "Lusitania"), (2, "Lost in Translation"), (3, "Lucia")])
+
+    results = index.search("Lusitainia")
+
+    assert results[0][0] == 1
+    assert 0.3 <= results[0][1] < 1
+    assert index.search("Lusitania")[0] == (1, 1.0)
+    assert index.search("zzz") == []
+
+
+def test_limit_keeps_the_best_results():
+    """Test that the top k cutoff keeps the most similar titles in order."""
+    index = TrigramIndex(threshold=0.1, limit=2)
+    index.build([(1, "Star"), (2, "Star Wars"), (3, "Star Trek Wars"), (4, "Stardust")])
+
+    assert [film_id for film_id, _ in index.search("star wars")] == [2, 3]
+    assert len(index.search("star wars", limit=0)) == 4
+    assert len(index.search("star wars", limit=1)) == 1
+
+
+def test_removed_titles_are_not_found():
+    """Test that removing a film drops it from the postings."""
+    index = TrigramIndex()
+    index.add(1, "Solaris")
+    index.add(2, "Stalker")
+
+    index.remove(1)
+
+    assert index.search("Solaris") == []
+    assert index.title(1) is None
+    assert len(index) == 1
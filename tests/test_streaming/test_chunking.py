@@ -0,0 +1,47 @@
+from app.streaming.chunking import AdaptiveChunkPolicy
+
+
+def test_chunk_grows_while_playing_sequentially():
+    """Test that sequential requests get bigger chunks up to the maximum."""
+    policy = AdaptiveChunkPolicy(initial_size=100, max_size=350, growth_factor=2, max_clients=10)
+
+    sizes = []
+    start = 0
+    for _ in range(4):
+        size = policy.chunk_size("client", "film.mp4", start)
+        sizes.append(size)
+        start += size
+
+    assert sizes == [100, 200, 350, 350]
+
+
+def test_seek_starts_over():
+    """Test that a request that does not continue the previous one uses the initial size."""
+    policy = AdaptiveChunkPolicy(initial_size=100, max_size=1000, growth_factor=2, max_clients=10)
+
+    policy.chunk_size("client", "film.mp4", 0)
+    policy.chunk_size("client", "film.mp4", 100)
+
+    assert policy.chunk_size("client", "film.mp4", 5000) == 100
+
+
+def test_clients_and_films_are_tracked_separately():
+    """Test that one client does not grow the chunk of another."""
+    policy = AdaptiveChunkPolicy(initial_size=100, max_size=1000, growth_factor=2, max_clients=10)
+
+    policy.chunk_size("first", "film.mp4", 0)
+
+    assert policy.chunk_size("second", "film.mp4", 100) == 100
+    assert policy.chunk_size("first", "other.mp4", 100) == 100
+
+
+def test_client_state_is_bounded():
+    """Test that the least recently seen client is forgotten."""
+    policy = AdaptiveChunkPolicy(initial_size=100, max_size=1000, growth_factor=2, max_clients=2)
+
+    policy.chunk_size("first", "film.mp4", 0)
+    policy.chunk_size("second", "film.mp4", 0)
+    policy.chunk_size("third", "film.mp4", 0)
+
+    assert policy.stats() == {"clients": 2}
+    assert policy.chunk_size("first", "film.mp4", 100) == 100
@@ -0,0 +1,60 @@
+import asyncio
+import os
+from unittest.mock import patch
+from app.streaming.coalescing import BlockReadCoalescer
+from app.streaming.responses import FilmRangeResponse
+from tests.test_streaming.test_responses import run_response
+
+
+def test_concurrent_reads_of_a_block_share_one_read(tmp_path):
+    """Test that requests for the same block while it is read do not read it again."""
+    path = tmp_path / "film.mp4"
+    path.write_bytes(bytes(range(256)) * 64)
+    coalescer = BlockReadCoalescer(block_size=4096)
+
+    async def main():
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            return await asyncio.gather(*(coalescer.read(str(path), fd, 1) for _ in range(10)))
+        finally:
+            os.close(fd)
+
+    blocks = asyncio.run(main())
+
+    assert all(block == path.read_bytes()[4096:8192] for block in blocks)
+    assert coalescer.stats() == {"block_size": 4096, "reads": 1, "shared": 9, "in_flight": 0}
+
+
+def test_waiters_read_the_block_when_the_reader_fails(tmp_path):
+    """Test that the waiters read the block themselves when the first read fails."""
+    path = tmp_path / "film.mp4"
+    path.write_bytes(b"x" * 8192)
+    coalescer = BlockReadCoalescer(block_size=4096)
+
+    async def main():
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            first = asyncio.create_task(coalescer.read(str(path), -1, 0))
+            await asyncio.sleep(0)
+            second = asyncio.create_task(coalescer.read(str(path), fd, 0))
+            return await asyncio.gather(first, second, return_exceptions=True)
+        finally:
+            os.close(fd)
+
+    failed, block = asyncio.run(main())
+
+    assert isinstance(failed, OSError)
+    assert block == b"x" * 4096
+    assert coalescer.reads == 1
+
+
+def test_unaligned_ranges_are_cut_from_the_blocks(tmp_path):
+    """Test that a range that does not start on a block sends only its own bytes."""
+    path = tmp_path / "film.mp4"
+    path.write_bytes(os.urandom(20000))
+
+    with patch("app.streaming.responses.block_reads", BlockReadCoalescer(block_size=4096)):
+        messages = run_response(FilmRangeResponse(path, [(5000, 13000)], 20000))
+
+    body = b"".join(bytes(m["body"]) for m in messages if m["type"] == "http.response.body")
+    assert body == path.read_bytes()[5000:13000]
@@ -0,0 +1,44 @@
+from app.streaming.film_index import FilmIndex
+
+
+def test_index_lists_the_film_files(tmp_path):
+    """Test that the index holds the files of the directory and not its subdirectories."""
+    (tmp_path / "film.mp4").write_bytes(b"film")
+    (tmp_path / "extras").mkdir()
+    index = FilmIndex(tmp_path)
+
+    index.refresh()
+
+    assert index.lookup("film.mp4") == (tmp_path / "film.mp4").resolve()
+    assert index.lookup("extras") is None
+    assert index.lookup("../film.mp4") is None
+    assert index.stats()["films"] == 1
+
+
+def test_index_is_cross_checked_with_the_catalog(tmp_path):
+    """Test that films without a file and files without a film are counted."""
+    (tmp_path / "film.mp4").write_bytes(b"film")
+    (tmp_path / "trailer.mp4").write_bytes(b"trailer")
+    index = FilmIndex(tmp_path)
+
+    index.refresh(["film.mp4", "missing.mp4"])
+
+    assert index.mismatches() == ({"missing.mp4"}, {"trailer.mp4"})
+    # a file without a film is counted but not served
+    assert index.lookup("film.mp4") == (tmp_path / "film.mp4").resolve()
+    assert index.lookup("trailer.mp4") is None
+    # a refresh without a catalog keeps the last one
+    index.refresh()
+    assert index.stats()["missing_files"] == 1
+    assert index.lookup("trailer.mp4") is None
+    assert index.refreshes == 2
+
+
+def test_missing_directory_gives_an_empty_index(tmp_path):
+    """Test that a missing films directory does not raise."""
+    index = FilmIndex(tmp_path / "missing")
+
+    index.refresh()
+
+    assert index.ready
+    assert index.stats()["films"] == 0
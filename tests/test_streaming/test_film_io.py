@@ -0,0 +1,41 @@
+import asyncio
+import threading
+from app.streaming.film_io import FilmIO
+
+
+def test_blocking_work_runs_off_the_event_loop():
+    """Test that the function runs on a worker thread."""
+    film_io = FilmIO(concurrency=2)
+
+    async def main():
+        return await film_io.run(threading.get_ident)
+
+    assert asyncio.run(main()) != threading.get_ident()
+    assert film_io.calls == 1
+
+
+def test_concurrency_is_bounded():
+    """Test that no more than the configured number of operations run at once."""
+    film_io = FilmIO(concurrency=2)
+    running = 0
+    most_running = 0
+    lock = threading.Lock()
+
+    def work():
+        nonlocal running, most_running
+        with lock:
+            running += 1
+            most_running = max(most_running, running)
+        threading.Event().wait(0.02)
+        with lock:
+            running -= 1
+
+    async def main():
+        await asyncio.gather(*(film_io.run(work) for _ in range(8)))
+        return film_io.stats()
+
+    stats = asyncio.run(main())
+
+    assert most_running == 2
+    assert stats["running"] == 0
+    assert stats["calls"] == 8
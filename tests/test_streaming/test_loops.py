@@ -0,0 +1,17 @@
+import asyncio
+from app.streaming.loops import LoopLocal
+
+
+def test_every_event_loop_gets_its_own_value():
+    """Test that a loop gets the same value every time and another loop gets a new one."""
+    locks = LoopLocal(asyncio.Lock)
+
+    async def main():
+        return locks.get(), locks.get()
+
+    first, again = asyncio.run(main())
+    other, _ = asyncio.run(main())
+
+    assert first is again
+    assert other is not first
+    assert len(locks.values()) <= 2
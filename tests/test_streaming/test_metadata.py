@@ -0,0 +1,71 @@
+import os
+import struct
+import pytest
+from app.streaming.metadata import FilmMetadataCache, etag_matches, if_range_matches
+
+
+@pytest.fixture
+def films_dir(tmp_path):
+    """Create a films directory with a small mp4 file."""
+    ftyp = struct.pack(">I4s", 16, b"ftyp") + b"isom" + b"\x00" * 4
+    mdat = struct.pack(">I4s", 108, b"mdat") + b"\x00" * 100
+    moov = struct.pack(">I4s", 8, b"moov")
+    (tmp_path / "film.mp4").write_bytes(ftyp + mdat + moov)
+    return tmp_path
+
+
+def test_metadata_is_cached(films_dir):
+    """Test that a second lookup is a hit."""
+    cache = FilmMetadataCache(films_dir, revalidate_after=60)
+
+    first = cache.get("film.mp4")
+    second = cache.get("film.mp4")
+
+    assert first is second
+    assert first.size == 132
+    assert first.moov_offset == 124
+    assert first.etag.startswith('"')
+    assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1}
+
+
+def test_metadata_is_rebuilt_when_the_file_changes(films_dir):
+    """Test that a changed modification time invalidates the entry."""
+    cache = FilmMetadataCache(films_dir, revalidate_after=0)
+    first = cache.get("film.mp4")
+
+    path = films_dir / "film.mp4"
+    path.write_bytes(path.read_bytes() + b"more")
+    os.utime(path, ns=(first.mtime_ns + 10**9, first.mtime_ns + 10**9))
+    second = cache.get("film.mp4")
+
+    assert second.size == first.size + 4
+    assert second.etag != first.etag
+    assert cache.misses == 2
+
+
+def test_metadata_of_a_missing_film(films_dir):
+    """Test that a missing film raises."""
+    cache = FilmMetadataCache(films_dir)
+
+    with pytest.raises(FileNotFoundError):
+        cache.get("missing.mp4")
+
+
+def test_etag_matches():
+    """Test the if none match comparison."""
+    assert etag_matches('"a", "b"', '"b"')
+    assert etag_matches('W/"b"', '"b"')
+    assert etag_matches("*", '"b"')
+    assert not etag_matches('"a"', '"b"')
+    assert not etag_matches(None, '"b"')
+
+
+def test_if_range_matches(films_dir):
+    """Test the if range comparison."""
+    metadata = FilmMetadataCache(films_dir).get("film.mp4")
+
+    assert if_range_matches(None, metadata)
+    assert if_range_matches(metadata.etag, metadata)
+    assert if_range_matches(metadata.last_modified, metadata)
+    assert not if_range_matches('W/' + metadata.etag, metadata)
+    assert not if_range_matches('"other"', metadata)
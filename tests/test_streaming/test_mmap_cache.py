@@ -0,0 +1,62 @@
+import pytest
+from app.streaming.metadata import FilmMetadataCache
+from app.streaming.mmap_cache import MappedFilmCache
+
+
+@pytest.fixture
+def films(tmp_path):
+    """Create three films of 1000 bytes and return a metadata cache for them."""
+    for name in ["a.mp4", "b.mp4", "c.mp4"]:
+        (tmp_path / name).write_bytes(name.encode() * 200)
+    return FilmMetadataCache(tmp_path)
+
+
+def test_film_is_mapped_after_enough_requests(films):
+    """Test that a film is only mapped once it is hot."""
+    cache = MappedFilmCache(max_bytes=10000, min_requests=2)
+    metadata = films.get("a.mp4")
+
+    assert cache.view(metadata) is None
+    assert not cache.should_map(metadata)
+    assert cache.view(metadata) is None
+    assert cache.should_map(metadata)
+    view = cache.map(metadata)
+
+    assert bytes(view[0:5]) == b"a.mp4"
+    assert cache.view(metadata) is not None
+    assert cache.stats()["hits"] == 1
+    assert cache.resident() == [{"film": "a.mp4", "bytes": 1000}]
+
+
+def test_least_recently_used_film_is_unmapped(films):
+    """Test that the mapped bytes stay under the limit."""
+    cache = MappedFilmCache(max_bytes=2000, min_requests=1)
+
+    cache.map(films.get("a.mp4"))
+    cache.map(films.get("b.mp4"))
+    cache.view(films.get("a.mp4"))
+    cache.map(films.get("c.mp4"))
+
+    assert [film["film"] for film in cache.resident()] == ["a.mp4", "c.mp4"]
+    assert cache.mapped_bytes == 2000
+
+
+def test_unmapped_film_stays_readable_while_in_use(films):
+    """Test that evicting a film does not break a response that still uses it."""
+    cache = MappedFilmCache(max_bytes=1000, min_requests=1)
+
+    view = cache.map(films.get("a.mp4"))
+    cache.map(films.get("b.mp4"))
+
+    assert bytes(view[0:5]) == b"a.mp4"
+    assert [film["film"] for film in cache.resident()] == ["b.mp4"]
+
+
+def test_film_larger_than_the_cache_is_not_mapped(films):
+    """Test that a film that does not fit is served from the file."""
+    cache = MappedFilmCache(max_bytes=500, min_requests=1)
+
+    metadata = films.get("a.mp4")
+    cache.view(metadata)
+
+    assert not cache.should_map(metadata)
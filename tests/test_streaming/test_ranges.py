@@ -0,0 +1,62 @@
+import pytest
+from app.streaming.ranges import parse_range_header, open_ended_start, content_range, RangeNotSatisfiable
+
+
+def test_closed_range():
+    """Test that the last byte of a range is inclusive."""
+    assert parse_range_header("bytes=0-99", 1000) == [(0, 100)]
+
+
+def test_closed_range_is_clamped_to_the_file():
+    """Test that a range past the end of the file is clamped."""
+    assert parse_range_header("bytes=900-5000", 1000) == [(900, 1000)]
+
+
+def test_open_ended_range():
+    """Test that an open ended range goes to the end or is limited."""
+    assert parse_range_header("bytes=100-", 1000) == [(100, 1000)]
+    assert parse_range_header("bytes=100-", 1000, open_ended_size=50) == [(100, 150)]
+
+
+def test_suffix_range():
+    """Test that a suffix range selects the last bytes of the file."""
+    assert parse_range_header("bytes=-500", 1000) == [(500, 1000)]
+    assert parse_range_header("bytes=-5000", 1000) == [(0, 1000)]
+
+
+def test_multiple_ranges_are_sorted_and_coalesced():
+    """Test that overlapping and adjacent ranges are merged."""
+    assert parse_range_header("bytes=500-599, 0-99,100-199,550-700", 1000) == [(0, 200), (500, 701)]
+
+
+@pytest.mark.parametrize("header", [None, "", "items=0-1", "bytes=", "bytes=abc", "bytes=10-5", "bytes=-", "bytes=1-2-3"])
+def test_invalid_headers_send_the_whole_file(header):
+    """Test that invalid headers are ignored."""
+    assert parse_range_header(header, 1000) is None
+
+
+def test_too_many_ranges_send_the_whole_file():
+    """Test that a header with too many ranges is ignored."""
+    header = "bytes=" + ",".join(f"{i * 10}-{i * 10 + 1}" for i in range(50))
+    assert parse_range_header(header, 1000) is None
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=2000-3000", "bytes=-0"])
+def test_unsatisfiable_ranges(header):
+    """Test that ranges outside of the file raise."""
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range_header(header, 1000)
+
+
+def test_content_range():
+    """Test the content range header value."""
+    assert content_range(0, 100, 1000) == "bytes 0-99/1000"
+
+
+def test_open_ended_start():
+    """Test that only a single open ended range has a start."""
+    assert open_ended_start("bytes=100-") == 100
+    assert open_ended_start("bytes=0-99") is None
+    assert open_ended_start("bytes=-100") is None
+    assert open_ended_start("bytes=0-,100-") is None
+    assert open_ended_start(None) is None
@@ -0,0 +1,107 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from app.streaming.coalescing import BlockReadCoalescer
+from app.streaming.responses import FilmRangeResponse
+from app.streaming.shaping import EgressScheduler
+
+
+def run_response(response, method="GET", extensions=None):
+    """Run an asgi response and collect the messages it sends."""
+    messages = []
+    scope = {"type": "http", "method": method, "extensions": extensions or {}}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(response(scope, receive, send))
+    return messages
+
+
+@pytest.fixture
+def film_file(tmp_path):
+    """Create a film file with known content."""
+    path = tmp_path / "film.mp4"
+    path.write_bytes(bytes(range(256)) * 1024)
+    return path
+
+
+def test_range_is_streamed_in_bounded_chunks(film_file):
+    """Test that the range is sent in chunks no bigger than the block size."""
+    response = FilmRangeResponse(film_file, [(100, 10100)], 256 * 1024)
+
+    with patch("app.streaming.responses.block_reads", BlockReadCoalescer(block_size=4096)):
+        messages = run_response(response)
+    bodies = [m for m in messages if m["type"] == "http.response.body"]
+
+    assert messages[0]["status"] == 206
+    assert all(len(m["body"]) <= 4096 for m in bodies)
+    assert b"".join(m["body"] for m in bodies) == film_file.read_bytes()[100:10100]
+    assert bodies[-1]["more_body"] is False
+    assert (b"content-length", b"10000") in messages[0]["headers"]
+    assert (b"content-range", b"bytes 100-10099/262144") in messages[0]["headers"]
+
+
+def test_zerocopy_extension_hands_over_the_file(film_file):
+    """Test that the file is handed to the server when it supports sendfile."""
+    response = FilmRangeResponse(film_file, [(10, 500)], 256 * 1024)
+
+    messages = run_response(response, extensions={"http.response.zerocopysend": {}})
+
+    assert messages[1]["type"] == "http.response.zerocopysend"
+    assert messages[1]["offset"] == 10
+    assert messages[1]["count"] == 490
+
+
+def test_shaped_zerocopy_is_sent_in_chunks(film_file):
+    """Test that a rate limited response hands the file over chunk by chunk."""
+    scheduler = EgressScheduler(rate=10**9, stream_rate=0)
+    response = FilmRangeResponse(film_file, [(0, 200 * 1024)], 256 * 1024)
+
+    with patch("app.streaming.responses.egress", scheduler):
+        messages = run_response(response, extensions={"http.response.zerocopysend": {}})
+
+    counts = [message["count"] for message in messages if message["type"] == "http.response.zerocopysend"]
+    assert counts == [64 * 1024] * 3 + [8 * 1024]
+    assert scheduler.stats()["bytes_sent"] == 200 * 1024
+
+
+def test_head_request_sends_no_body(film_file):
+    """Test that a head request only sends the headers."""
+    messages = run_response(FilmRangeResponse(film_file, [(0, 1000)], 256 * 1024), method="HEAD")
+
+    assert messages[1]["body"] == b""
+    assert messages[1]["more_body"] is False
+
+
+def test_multiple_ranges_send_a_multipart_body(film_file):
+    """Test that several ranges are sent as multipart/byteranges."""
+    content = film_file.read_bytes()
+    response = FilmRangeResponse(film_file, [(0, 10), (100, 110)], len(content))
+
+    messages = run_response(response)
+    headers = dict(messages[0]["headers"])
+    body = b"".join(m["body"] for m in messages[1:])
+    boundary = headers[b"content-type"].decode().split("boundary=")[1]
+
+    assert headers[b"content-type"].startswith(b"multipart/byteranges")
+    assert int(headers[b"content-length"]) == len(body)
+    assert f"Content-Range: bytes 100-109/{len(content)}".encode() in body
+    assert content[100:110] in body
+    assert body.endswith(f"--{boundary}--\r\n".encode())
+
+
+def test_mapped_film_is_sent_as_memoryview_slices(film_file):
+    """Test that a memory mapped film is sent without reading the file."""
+    content = film_file.read_bytes()
+    response = FilmRangeResponse("/does/not/exist.mp4", [(10, 5000)], len(content), mapped=memoryview(content))
+    response.chunk_size = 1024
+
+    messages = run_response(response)
+    bodies = [m["body"] for m in messages[1:]]
+
+    assert isinstance(bodies[0], memoryview)
+    assert b"".join(bodies) == content[10:5000]
@@ -0,0 +1,137 @@
+import struct
+import pytest
+from app.streaming.metadata import FilmMetadataCache
+from app.streaming.segments import SegmentIndex, SegmentIndexStore, build_segment_index, render_playlist
+
+
+def box(box_type, *payloads):
+    """Build an mp4 box."""
+    payload = b"".join(payloads)
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+
+def full_box(box_type, payload, version=0, flags=0):
+    """Build an mp4 full box."""
+    return box(box_type, bytes([version]) + flags.to_bytes(3, "big"), payload)
+
+
+def movie(stbl=b"", mvex=b""):
+    """Build a moov box with one video track at a timescale of 1000."""
+    mvhd = full_box(b"mvhd", struct.pack(">IIII", 0, 0, 1000, 0) + b"\x00" * 80)
+    tkhd = full_box(b"tkhd", struct.pack(">IIII", 0, 0, 1, 0) + b"\x00" * 64)
+    mdhd = full_box(b"mdhd", struct.pack(">IIII", 0, 0, 1000, 8000) + b"\x00" * 4)
+    hdlr = full_box(b"hdlr", struct.pack(">I4s", 0, b"vide") + b"\x00" * 13)
+    mdia = box(b"mdia", mdhd, hdlr, box(b"minf", box(b"stbl", stbl)))
+    return box(b"moov", mvhd, box(b"trak", tkhd, mdia), mvex)
+
+
+def write_fragmented_film(path):
+    """Write a fragmented mp4 with four fragments of two seconds."""
+    trex = full_box(b"trex", struct.pack(">IIIII", 1, 1, 500, 0, 0))
+    data = box(b"ftyp", b"iso6", b"\x00" * 4) + movie(mvex=box(b"mvex", trex))
+    for number in range(4):
+        # the first two fragments use the trex default duration, the others list their samples
+        if number < 2:
+            trun = full_box(b"trun", struct.pack(">I", 4))
+        else:
+            trun = full_box(b"trun", struct.pack(">I", 2) + struct.pack(">II", 1000, 100) * 2, flags=0x300)
+        moof = box(b"moof", full_box(b"mfhd", struct.pack(">I", number + 1)),
+                   box(b"traf", full_box(b"tfhd", struct.pack(">I", 1)), trun))
+        data += moof + box(b"mdat", bytes([number]) * 200)
+    path.write_bytes(data)
+    return path
+
+
+@pytest.fixture
+def fragmented_film(tmp_path):
+    """Create a fragmented mp4 in a films directory."""
+    (tmp_path / "films").mkdir()
+    return write_fragmented_film(tmp_path / "films" / "film.mp4")
+
+
+@pytest.fixture
+def progressive_film(tmp_path):
+    """Create a progressive mp4 with eight samples of one second and a keyframe every second sample."""
+    ftyp = box(b"ftyp", b"isom", b"\x00" * 4)
+    # the mdat comes first so the chunk offset is known before the moov is built
+    mdat = box(b"mdat", b"\x01" * 800)
+    stbl = b"".join([
+        full_box(b"stsz", struct.pack(">II", 100, 8)),
+        full_box(b"stco", struct.pack(">II", 1, len(ftyp) + 8)),
+        full_box(b"stsc", struct.pack(">IIII", 1, 1, 8, 1)),
+        full_box(b"stts", struct.pack(">III", 1, 8, 1000)),
+        full_box(b"stss", struct.pack(">IIIII", 4, 1, 3, 5, 7)),
+    ])
+    path = tmp_path / "progressive.mp4"
+    path.write_bytes(ftyp + mdat + movie(stbl=stbl))
+    return path
+
+
+def test_fragmented_film_is_grouped_by_target_duration(fragmented_film):
+    """Test that fragments are merged until they reach the target duration."""
+    index = build_segment_index(fragmented_film, target_duration=4)
+    data = fragmented_film.read_bytes()
+
+    assert index.fragmented
+    assert index.timescale == 1000
+    assert len(index.segments) == 2
+    assert [duration for _, _, duration in index.segments] == [4000, 4000]
+    # the init section ends where the first fragment starts and the segments cover the rest of the file
+    assert data[index.init[1] + 4:index.init[1] + 8] == b"moof"
+    assert index.segments[0][0] == index.init[1]
+    assert index.segments[1][0] == index.segments[0][0] + index.segments[0][1]
+    assert index.segments[1][0] + index.segments[1][1] == len(data)
+
+
+def test_progressive_film_is_split_at_keyframes(progressive_film):
+    """Test that a progressive film gets keyframe aligned segments."""
+    index = build_segment_index(progressive_film, target_duration=2)
+
+    assert not index.fragmented
+    assert [(offset - 24, size, duration) for offset, size, duration in index.segments] == [
+        (0, 200, 2000), (200, 200, 2000), (400, 200, 2000), (600, 200, 2000)
+    ]
+
+
+def test_film_without_moov_is_rejected(tmp_path):
+    """Test that a file that is not an mp4 cannot be indexed."""
+    path = tmp_path / "film.mp4"
+    path.write_bytes(box(b"mdat", b"\x00" * 10))
+
+    with pytest.raises(ValueError):
+        build_segment_index(path)
+
+
+def test_index_round_trips_through_bytes(fragmented_film):
+    """Test the compact index file format."""
+    index = build_segment_index(fragmented_film, target_duration=2)
+
+    data = index.to_bytes()
+
+    assert len(data) == 44 + 16 * len(index.segments)
+    assert SegmentIndex.from_bytes(data) == index
+    with pytest.raises(ValueError):
+        SegmentIndex.from_bytes(data[:-1])
+
+
+def test_store_ignores_an_index_of_another_version(fragmented_film, tmp_path):
+    """Test that an index built from an older film file is not used."""
+    store = SegmentIndexStore(tmp_path / "segments")
+    metadata = FilmMetadataCache(fragmented_film.parent).get("film.mp4")
+    store.write("film.mp4", build_segment_index(fragmented_film))
+
+    assert store.get("film.mp4", metadata) is not None
+    assert store.cached("film.mp4", metadata) is not None
+    assert store.get("film.mp4", metadata.model_copy(update={"mtime_ns": metadata.mtime_ns + 1})) is None
+    assert store.get("other.mp4", metadata) is None
+
+
+def test_playlist(fragmented_film):
+    """Test the hls playlist of a fragmented film."""
+    playlist = render_playlist(build_segment_index(fragmented_film, target_duration=2))
+
+    assert playlist.startswith("#EXTM3U\n")
+    assert '#EXT-X-MAP:URI="segment/init"' in playlist
+    assert "#EXT-X-TARGETDURATION:2" in playlist
+    assert playlist.count("#EXTINF:2.000,") == 4
+    assert "segment/3\n#EXT-X-ENDLIST\n" in playlist
@@ -0,0 +1,85 @@
+import asyncio
+import time
+from app.streaming.shaping import EgressScheduler, TokenBucket
+
+
+def collect(scheduler, chunks, size, sent, name, client=None):
+    """Send chunks through a shaped stream and record the order they got through."""
+    async def send(message):
+        sent.append(name)
+
+    async def run():
+        with scheduler.stream(send, client) as shaped_send:
+            for _ in range(chunks):
+                await shaped_send({"type": "http.response.body", "body": b"x" * size, "more_body": True})
+
+    return run()
+
+
+def test_bucket_goes_into_debt():
+    """Test that a take over the tokens left gives the time to pay the debt back."""
+    bucket = TokenBucket(rate=1000, burst=1000)
+
+    assert bucket.take(1000) == 0
+    assert 0.4 < bucket.take(500) <= 0.5
+
+
+def test_disabled_scheduler_does_not_wrap_send():
+    """Test that no limit leaves the send channel untouched."""
+    scheduler = EgressScheduler(rate=0, stream_rate=0)
+
+    async def send(message):
+        pass
+
+    with scheduler.stream(send) as shaped_send:
+        assert shaped_send is send
+    assert scheduler.stats()["active"] == 0
+
+
+def test_stream_rate_is_limited():
+    """Test that one stream is held to its rate once its burst is spent."""
+    scheduler = EgressScheduler(rate=0, stream_rate=100_000, burst=10_000)
+    sent = []
+
+    began = time.monotonic()
+    asyncio.run(collect(scheduler, 3, 10_000, sent, "a"))
+
+    assert time.monotonic() - began >= 0.19
+    assert scheduler.stats()["throttled"] == 2
+    assert scheduler.stats()["bytes_sent"] == 30_000
+
+
+def test_stream_rate_is_kept_across_the_responses_of_a_client():
+    """Test that a new response of a client does not get a new burst and another client does."""
+    scheduler = EgressScheduler(rate=0, stream_rate=100_000, burst=10_000, max_clients=1)
+    sent = []
+
+    asyncio.run(collect(scheduler, 1, 10_000, sent, "a", client="player"))
+    began = time.monotonic()
+    asyncio.run(collect(scheduler, 1, 10_000, sent, "a", client="player"))
+
+    assert time.monotonic() - began >= 0.09
+    assert scheduler.stats()["throttled"] == 1
+
+    asyncio.run(collect(scheduler, 1, 10_000, sent, "b", client="other player"))
+    assert scheduler.stats()["throttled"] == 1
+    assert scheduler.stats()["clients"] == 1
+
+
+def test_streams_take_turns():
+    """Test that a stream with many chunks does not starve a stream that starts later."""
+    scheduler = EgressScheduler(rate=1_000_000, stream_rate=0, burst=10_000)
+    sent = []
+
+    async def main():
+        greedy = asyncio.create_task(collect(scheduler, 10, 10_000, sent, "greedy"))
+        await asyncio.sleep(0)
+        polite = asyncio.create_task(collect(scheduler, 2, 10_000, sent, "polite"))
+        await asyncio.gather(greedy, polite)
+
+    asyncio.run(main())
+
+    # the later stream finishes long before the greedy one
+    assert max(i for i, name in enumerate(sent) if name == "polite") < 6
+    assert scheduler.stats()["most_waiting"] == 2
+    assert scheduler.stats()["waiting"] == 0